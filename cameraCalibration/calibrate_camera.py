@@ -1,5 +1,8 @@
 # cameraCalibration/calibrate_camera.py
 
+import argparse
+import time
+
 import cv2 as cv
 import numpy as np
 import sys
@@ -8,8 +11,15 @@ import os
 # Agregar el directorio raíz al sys.path para poder importar módulos
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 from modules.CameraModule import Camera
+from modules.PreviewModule import PreviewServer
 
 def main():
+    parser = argparse.ArgumentParser(description="Calibración de la cámara con un tablero de ajedrez.")
+    parser.add_argument("--camera", type=int, default=2, help="Índice de la cámara (por defecto: 2)")
+    parser.add_argument("--preview", type=int, default=None, metavar="PORT",
+                        help="Sin pantalla: vista previa MJPEG en http://localhost:PORT/ y captura automática")
+    args = parser.parse_args()
+
     # Configuración del patrón de calibración
     pattern_size = (9, 6)  # Número de esquinas internas (columnas, filas) del tablero de ajedrez
     square_size = 30       # Tamaño real de cada cuadrado (por ejemplo, 30 mm)
@@ -28,15 +38,22 @@ def main():
     imgpoints = []  # Puntos en la imagen
 
     # Inicializar la cámara usando el módulo Camera
-    camera = Camera(2)  # Cambiar el índice según tu dispositivo
+    camera = Camera(args.camera)
+
+    # En equipos sin pantalla no hay teclado: se captura automáticamente cada segundo que se detecta el patrón
+    preview = PreviewServer(args.preview) if args.preview is not None else None
+    last_capture = 0.0
     
     captured_count = 0
     minimum_required = 10  # Se requiere al menos 10 imágenes válidas para calibrar
 
     print("Iniciando calibración de la cámara.")
     print("Alinea el tablero de ajedrez en el campo de visión.")
-    print("Presiona 'c' para capturar una imagen cuando el patrón sea detectado.")
-    print("Presiona 'q' para finalizar la captura (mínimo requerido:", minimum_required, "imágenes).")
+    if preview is None:
+        print("Presiona 'c' para capturar una imagen cuando el patrón sea detectado.")
+        print("Presiona 'q' para finalizar la captura (mínimo requerido:", minimum_required, "imágenes).")
+    else:
+        print(f"Vista previa en http://localhost:{preview.port}/, se capturarán {minimum_required} imágenes automáticamente.")
     
     while True:
         ret, frame = camera.read()
@@ -61,6 +78,17 @@ def main():
         # Mostrar la imagen con la información
         cv.putText(frame, f"Capturadas: {captured_count}", (30, 60),
                    cv.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
+        if preview is not None:
+            preview.publish(frame)
+            if ret_corners and time.perf_counter() - last_capture >= 1.0:
+                last_capture = time.perf_counter()
+                objpoints.append(objp)
+                imgpoints.append(corners2)
+                captured_count += 1
+                print(f"Capturada imagen {captured_count}.")
+            if captured_count >= minimum_required:
+                break
+            continue
         cv.imshow("Calibracion", frame)
         
         # Leer la tecla presionada
@@ -79,6 +107,8 @@ def main():
                 break
 
     # Liberar la cámara y cierra las ventanas de OpenCV
+    if preview is not None:
+        preview.close()
     camera.release()
     cv.destroyAllWindows()
     
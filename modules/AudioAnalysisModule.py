@@ -0,0 +1,289 @@
+"""
+Audio Analysis Module
+Offline analysis of rendered or recorded theremin audio (WAV files), vectorized with NumPy.
+Run as a script to check a rendering for glitches (clicks, dropouts and pitch jumps):
+    python3 -m modules.AudioAnalysisModule renders/clip.wav --trace renders/clip.landmarks.jsonl --report glitches.json
+By: agarnung
+"""
+
+import argparse
+import json
+import wave
+
+import numpy as np
+
+def read_wav(path):
+    """
+    Reads a PCM WAV file as mono floating point samples.
+
+    :param path: Path of the WAV file (8, 16, 24 or 32 bit PCM).
+    :return: A tuple (samples, sample_rate) with samples in [-1, 1] (channels are averaged).
+    """
+    with wave.open(path, "rb") as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        sample_rate = wav.getframerate()
+        raw = wav.readframes(wav.getnframes())
+
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 2**15
+    elif width == 3:
+        # Sign-extend the 24 bit little endian samples into int32
+        bytes3 = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = bytes3[:, 0] | (bytes3[:, 1] << 8) | (bytes3[:, 2] << 16)
+        values = np.where(values >= 2**23, values - 2**24, values)
+        samples = values.astype(np.float32) / 2**23
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2**31
+    else:
+        raise ValueError(f"Unsupported sample width: {width} bytes")
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, sample_rate
+
+def frequency_track(samples, sample_rate):
+    """
+    Estimates the instantaneous frequency of a (mostly) periodic signal from its rising zero crossings.
+
+    :param samples: Mono samples.
+    :param sample_rate: Sampling rate in Hz.
+    :return: A tuple (times, frequencies): one estimate per period, stamped at the end of the period (s).
+    """
+    previous, current = samples[:-1], samples[1:]
+    rising = np.flatnonzero((previous < 0) & (current >= 0))
+    if len(rising) < 2:
+        return np.empty(0), np.empty(0)
+
+    # Interpolate linearly between the two samples around each crossing for sub-sample precision
+    fraction = -previous[rising] / (current[rising] - previous[rising])
+    crossings = (rising + fraction) / sample_rate
+    periods = np.diff(crossings)
+    return crossings[1:], 1.0 / periods
+
+def first_settled_time(times, frequencies, after, target, tolerance=0.02):
+    """
+    Finds when the frequency first reaches a target value after a given time.
+
+    :param times: Times of the frequency track (see frequency_track).
+    :param frequencies: Frequencies of the frequency track.
+    :param after: Only consider estimates after this time (s).
+    :param target: Expected frequency in Hz.
+    :param tolerance: Relative tolerance around the target.
+    :return: Time of the first estimate within tolerance, or None if the target is never reached.
+    """
+    candidates = np.flatnonzero((times > after) & (np.abs(frequencies - target) <= tolerance * target))
+    if len(candidates) == 0:
+        return None
+    return float(times[candidates[0]])
+
+def group_events(indices, max_separation):
+    """
+    Groups sorted indices closer than max_separation into events.
+
+    :return: A tuple (starts, ends) with the first and last index of each event.
+    """
+    if len(indices) == 0:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    breaks = np.flatnonzero(np.diff(indices) > max_separation)
+    starts = indices[np.concatenate(([0], breaks + 1))]
+    ends = indices[np.concatenate((breaks, [len(indices) - 1]))]
+    return starts, ends
+
+def moving_average(values, length):
+    """
+    Centered moving average in O(N) with a cumulative sum, same as
+    np.convolve(values, np.ones(length) / length, mode="same") (zeros outside the signal).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    index = np.arange(len(values)) + (length - 1) // 2 + 1 # end (exclusive) of each window
+    return (cumulative[np.minimum(index, len(values))] - cumulative[np.maximum(index - length, 0)]) / length
+
+def discontinuities(samples, sample_rate, threshold=8.0, min_step=1e-3, window=0.01):
+    """
+    Finds sample-level discontinuities (clicks, zipper steps) as spikes of the second difference of
+    the signal, which stays proportional to the signal itself for the smooth tones of the theremin.
+
+    :param samples: Mono samples.
+    :param sample_rate: Sampling rate in Hz.
+    :param threshold: A spike must exceed this many times the local RMS of the second difference.
+    :param min_step: Absolute minimum size of a spike, so quantization noise is not reported.
+    :param window: Length of the local RMS window in seconds.
+    :return: List of (time in s, magnitude) per discontinuity.
+    """
+    if len(samples) < 3:
+        return []
+    second = np.abs(samples[2:] - 2 * samples[1:-1] + samples[:-2])
+    length = max(1, int(window * sample_rate))
+    local_rms = np.sqrt(np.maximum(moving_average(second.astype(np.float64) ** 2, length), 0)) # no negative rounding
+    spikes = np.flatnonzero((second > threshold * local_rms) & (second > min_step))
+    starts, ends = group_events(spikes, length // 10)
+    events = []
+    for start, end in zip(starts, ends):
+        peak = start + int(np.argmax(second[start:end + 1]))
+        events.append(((peak + 1) / sample_rate, float(second[peak])))
+    return events
+
+def silent_gaps(samples, sample_rate, threshold_db=-60.0, min_duration=0.01, window=0.005):
+    """
+    Finds the stretches where the signal level stays below a threshold (dropouts or muting).
+
+    :param samples: Mono samples.
+    :param sample_rate: Sampling rate in Hz.
+    :param threshold_db: Level below which a window is silent (dB relative to full scale).
+    :param min_duration: Shortest gap reported in seconds.
+    :param window: Length of the level measurement windows in seconds.
+    :return: List of (start, end) times in seconds.
+    """
+    length = max(1, int(window * sample_rate))
+    count = len(samples) // length
+    if count == 0:
+        return []
+    rms = np.sqrt(np.mean(samples[:count * length].astype(np.float64).reshape(count, length) ** 2, axis=1))
+    silent = np.flatnonzero(20 * np.log10(np.maximum(rms, 1e-12)) < threshold_db)
+    starts, ends = group_events(silent, 1)
+    return [(start * length / sample_rate, (end + 1) * length / sample_rate)
+            for start, end in zip(starts, ends) if (end + 1 - start) * length / sample_rate >= min_duration]
+
+def frequency_jumps(times, frequencies, semitones=2.0, min_frequency=20.0):
+    """
+    Finds sudden pitch changes between consecutive periods of a frequency track.
+
+    :param times: Times of the frequency track (see frequency_track).
+    :param frequencies: Frequencies of the frequency track.
+    :param semitones: Smallest pitch change between two periods reported as a jump.
+    :param min_frequency: Estimates below it (periods spanning a silence) are ignored.
+    :return: List of (time in s, frequency before, frequency after).
+    """
+    valid = frequencies >= min_frequency
+    times, frequencies = times[valid], frequencies[valid]
+    if len(times) < 2:
+        return []
+    # Only compare adjacent periods (no silence in between)
+    adjacent = np.diff(times) < 1.5 / frequencies[1:]
+    steps = np.abs(12 * np.log2(frequencies[1:] / frequencies[:-1]))
+    jumps = np.flatnonzero(adjacent & (steps >= semitones))
+    return [(float(times[i + 1]), float(frequencies[i]), float(frequencies[i + 1])) for i in jumps]
+
+def control_updates(records):
+    """
+    :param records: Records of a landmark trace (see transcode.py), with the time, frequency and volume.
+    :return: Times (s) at which the frequency or the volume sent to Audio changed.
+    """
+    times = np.array([record["t"] for record in records], dtype=float)
+    controls = np.array([(record["frequency"], record["volume"]) for record in records], dtype=float)
+    if len(times) == 0:
+        return times
+    changed = np.concatenate(([True], np.any(np.diff(controls, axis=0) != 0, axis=1)))
+    return times[changed]
+
+def nearest_update(event_times, update_times):
+    """
+    :return: A tuple (update times, offsets in s) with the closest control update to each event (NaN without updates).
+    """
+    event_times = np.asarray(event_times, dtype=float)
+    if len(update_times) == 0:
+        return np.full(len(event_times), np.nan), np.full(len(event_times), np.nan)
+    right = np.clip(np.searchsorted(update_times, event_times), 0, len(update_times) - 1)
+    left = np.clip(right - 1, 0, len(update_times) - 1)
+    closest = np.where(np.abs(update_times[left] - event_times) <= np.abs(update_times[right] - event_times), left, right)
+    return update_times[closest], event_times - update_times[closest]
+
+def glitch_report(wav_path, records=None, tolerance=0.03, **options):
+    """
+    Checks a rendered or recorded session for clicks, silent gaps and pitch jumps, and lines them up
+    with the control updates of its landmark trace.
+
+    :param wav_path: WAV file to check.
+    :param records: Records of the landmark trace of the session (optional).
+    :param tolerance: An event within this time (s) of a control update is attributed to it
+                      (e.g. zipper noise of an unsmoothed update), otherwise it is unexplained.
+    :param options: Thresholds of the detectors: click_threshold, gap_db, gap_duration, jump_semitones.
+    :return: Report with the events and a summary of their counts.
+    """
+    samples, sample_rate = read_wav(wav_path)
+    updates = control_updates(records) if records else np.empty(0)
+
+    clicks = discontinuities(samples, sample_rate, threshold=options.get("click_threshold", 8.0))
+    gaps = silent_gaps(samples, sample_rate, threshold_db=options.get("gap_db", -60.0),
+                       min_duration=options.get("gap_duration", 0.01))
+    jumps = frequency_jumps(*frequency_track(samples, sample_rate), semitones=options.get("jump_semitones", 2.0))
+
+    def annotate(events, times):
+        update_times, offsets = nearest_update(times, updates)
+        for event, update_time, offset in zip(events, update_times, offsets):
+            if not np.isnan(offset):
+                event["update_t"] = float(update_time)
+                event["offset_ms"] = float(offset * 1000)
+                event["at_update"] = bool(abs(offset) <= tolerance)
+        return events
+
+    if records:
+        # Silence is expected while the controls mute the tone
+        times = np.array([record["t"] for record in records], dtype=float)
+        volumes = np.array([record["volume"] for record in records], dtype=float)
+
+    gap_events = []
+    for start, end in gaps:
+        event = {"start": start, "end": end, "duration_ms": (end - start) * 1000}
+        if records:
+            inside = (times >= start - tolerance) & (times <= end)
+            before = np.flatnonzero(times <= start)
+            muted = volumes[inside]
+            if len(before):
+                muted = np.append(muted, volumes[before[-1]])
+            event["muted"] = bool(len(muted) and np.all(muted == 0))
+        gap_events.append(event)
+
+    report = {"file": wav_path, "sample_rate": sample_rate, "duration": len(samples) / sample_rate,
+              "control_updates": len(updates),
+              "clicks": annotate([{"t": t, "magnitude": magnitude} for t, magnitude in clicks],
+                                 [t for t, _ in clicks]),
+              "gaps": annotate(gap_events, [event["start"] for event in gap_events]),
+              "jumps": annotate([{"t": t, "from_hz": before, "to_hz": after} for t, before, after in jumps],
+                                [t for t, _, _ in jumps])}
+    report["summary"] = {"clicks": len(report["clicks"]),
+                         "clicks_at_updates": sum(event.get("at_update", False) for event in report["clicks"]),
+                         "gaps": len(report["gaps"]),
+                         "unmuted_gaps": sum(not event.get("muted", False) for event in report["gaps"]),
+                         "jumps": len(report["jumps"]),
+                         "jumps_at_updates": sum(event.get("at_update", False) for event in report["jumps"])}
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find clicks, dropouts and pitch jumps in rendered theremin audio.")
+    parser.add_argument("wav", nargs="+", help="Rendered or recorded WAV files")
+    parser.add_argument("--trace", nargs="*", default=[], help="Landmark traces of the WAV files, in the same order")
+    parser.add_argument("--click-threshold", type=float, default=8.0)
+    parser.add_argument("--gap-db", type=float, default=-60.0)
+    parser.add_argument("--jump-semitones", type=float, default=2.0)
+    parser.add_argument("--report", default=None, help="Path of the JSON report (default: print the summaries)")
+    parser.add_argument("--fail", action="store_true", help="Exit with an error on clicks or gaps not caused by the controls")
+    args = parser.parse_args(argv)
+    if args.trace and len(args.trace) != len(args.wav):
+        parser.error("Give one trace per WAV file")
+
+    reports = []
+    for index, wav_path in enumerate(args.wav):
+        records = None
+        if args.trace:
+            with open(args.trace[index]) as trace:
+                records = [json.loads(line) for line in trace if line.strip()]
+        report = glitch_report(wav_path, records, click_threshold=args.click_threshold, gap_db=args.gap_db,
+                               jump_semitones=args.jump_semitones)
+        reports.append(report)
+        print(f"{wav_path}: {report['summary']}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(reports, f, indent=2)
+    if args.fail and any(report["summary"]["clicks"] > report["summary"]["clicks_at_updates"]
+                         or report["summary"]["unmuted_gaps"] for report in reports):
+        raise SystemExit(1)
+    return reports
+
+if __name__ == "__main__":
+    main()
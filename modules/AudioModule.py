@@ -7,39 +7,115 @@ By: agarnung
 
 from pyo import *
 
+class Voice:
+    """
+    Plain sine voice with its own frequency and volume, sent to one output channel of an Audio's server
+    (see Audio.add_voice).
+    """
+
+    def __init__(self, channel, frequency, volume, fader) -> None:
+        self.channel = channel
+        self.frequency = frequency
+        self.volume = volume
+        self.oscillator = Sine(freq=frequency, mul=volume)
+        self.output = Sig(self.oscillator, mul=fader) # shares the master fader of the Audio
+
+    def update_frequency(self, value):
+        self.frequency = float(value)
+        self.oscillator.freq = self.frequency
+
+    def update_volume(self, value):
+        """Updates the volume, given in [0, 100] as for Audio."""
+        self.volume = float(value) / 100
+        self.oscillator.mul = self.volume
+
 class Audio:
     """
     Class representing an audio proxy for audio signals managment
     """
 
-    def __init__(self, initial_frequency=440, initial_volume = 0.5) -> None:
+    def __init__(self, initial_frequency=440, initial_volume = 0.5, offline=False, expressive=False, nchnls=None) -> None:
         """
         Initialize the audio.
 
-        :param source: Index of the camera device (default is 0) or a path to a local video file.
+        :param initial_frequency: Initial frequency of the oscillator in Hz.
+        :param initial_volume: Initial volume of the oscillator in [0, 1].
+        :param offline: Boot an offline server that renders to a file instead of the sound card (see render()).
+        :param expressive: Add the modulation targets: vibrato, sine to saw waveform blend and low pass filter
+                           (see update_modulation).
+        :param nchnls: Number of output channels (default is mono offline and stereo live), see add_voice.
         """
         self.frequency = initial_frequency
         self.volume = initial_volume
+        self.offline = offline
 
-        self.server = Server() # create the pyo server object but don't boot it yet
+        # create the pyo server object but don't boot it yet
+        self.server = Server(audio="offline", nchnls=nchnls or 1) if offline else Server(nchnls=nchnls or 2)
 
         self.server.boot() # boot the pyo server
 
-        # Initialize oscillator with no server yet (it will be done later)
-        self.oscillator = Sine(freq=initial_frequency, mul=initial_volume)
+        self.expressive = expressive
+        if expressive:
+            # Vibrato: an LFO added to the frequency of the oscillator and the saw, so all their partials
+            # follow the pitch. Then waveform blend -> low pass filter
+            self.pitch = Sig(initial_frequency)
+            self.lfo = Sine(freq=5, mul=0)
+            self.oscillator = Sine(freq=self.pitch + self.lfo, mul=initial_volume)
+            self.saw = Phasor(freq=self.pitch + self.lfo, mul=2 * initial_volume, add=-initial_volume)
+            self.blend = Interp(self.oscillator, self.saw, interp=0)
+            self.filter = ButLP(self.blend, freq=20000)
+            self.output = self.filter
+        else:
+            # Initialize oscillator with no server yet (it will be done later)
+            self.oscillator = Sine(freq=initial_frequency, mul=initial_volume)
+            self.output = self.oscillator # last object of the chain, sent to the output
+
+        # Master gain, ramped to fade the output in and out without clicks (see fade_out)
+        self.fader = SigTo(value=1, time=0.05, init=1)
+        self.output = Sig(self.output, mul=self.fader)
+
+        # Functions called by the server before computing each buffer (see add_callback)
+        self.callbacks = []
+        self.voices = [] # extra voices on other output channels (see add_voice)
 
     def start(self):
-        self.oscillator.out() # Start sending the signal to the output
+        self.output.out()     # Start sending the signal to the output
+        for voice in self.voices:
+            voice.output.out(voice.channel)
         self.server.start()   # Start the server to process the audio
 
     def stop(self):
         """Stop the server gracefully."""
         try:
-            self.server.stop()     # stop audio processing
+            if self.server.getIsStarted():
+                self.server.stop() # stop audio processing (an offline server stops by itself)
             self.server.shutdown() # shutdown the server to release resources
         except Exception as e:
             print(f"Error while stopping the server: {e}")
 
+    def fade_out(self, time=0.05):
+        """Ramps the output down to silence in the given time (s), keeping the controls as they are."""
+        self.fader.time = time
+        self.fader.value = 0
+
+    def fade_in(self, time=0.05):
+        """Ramps the output back up to the level set by the controls."""
+        self.fader.time = time
+        self.fader.value = 1
+
+    def start_recording(self, filename):
+        """
+        Records the output of the running server to a 16 bit WAV file. The samples are written by
+        the server itself, nothing is added to the control loop.
+        """
+        if self.offline:
+            raise RuntimeError("An offline Audio records through render()")
+        self.server.recordOptions(filename=filename, fileformat=0, sampletype=0)
+        self.server.recstart(filename)
+
+    def stop_recording(self):
+        self.server.recstop()
+
     def showGUI(self):
         """Show the server's graphical interface."""
         self.server.gui(locals()) # show GUI and wait for user input
@@ -47,13 +123,110 @@ class Audio:
     def update_frequency(self, value):
         """Updates the oscillator's frequency."""
         self.frequency = float(value)
-        self.oscillator.freq = self.frequency
+        if self.expressive:
+            self.pitch.value = self.frequency # modulated by the vibrato LFO
+        else:
+            self.oscillator.freq = self.frequency
 
     def update_volume(self, value):
         """Updates the oscillator's volume."""
         self.volume = float(value) / 100  # convert to a range of [0, 1]
         self.oscillator.mul = self.volume # adjust the volume
-        
+        if self.expressive:
+            self.saw.mul, self.saw.add = 2 * self.volume, -self.volume # centered saw with the same peak
+
+    def update_modulation(self, vibrato_depth=None, vibrato_rate=None, blend=None, cutoff=None):
+        """
+        Updates the modulation targets of an expressive Audio (arguments left to None are kept).
+
+        :param vibrato_depth: Vibrato depth in Hz.
+        :param vibrato_rate: Vibrato rate in Hz.
+        :param blend: Waveform blend in [0, 1], from sine (0) to saw (1).
+        :param cutoff: Cutoff frequency of the low pass filter in Hz.
+        """
+        if not self.expressive:
+            raise RuntimeError("update_modulation() requires an Audio created with expressive=True")
+        if vibrato_depth is not None:
+            self.lfo.mul = float(vibrato_depth)
+        if vibrato_rate is not None:
+            self.lfo.freq = float(vibrato_rate)
+        if blend is not None:
+            self.blend.interp = float(blend)
+        if cutoff is not None:
+            self.filter.freq = float(cutoff)
+
+    def add_voice(self, channel):
+        """
+        Adds a sine voice with its own controls on another output channel, e.g. to listen to
+        several mappings of the same hands side by side. The main output stays on channel 0.
+
+        :param channel: Output channel of the voice, below nchnls.
+        :return: The Voice (update_frequency and update_volume as for the Audio).
+        """
+        if not 0 < channel < self.server.getNchnls():
+            raise ValueError(f"Channel {channel} is not an extra channel of a {self.server.getNchnls()} channel server")
+        voice = Voice(channel, self.frequency, self.volume, self.fader)
+        self.voices.append(voice)
+        return voice
+
+    def add_callback(self, function):
+        """
+        Adds a function called (without arguments) by the server before computing each buffer.
+        The server accepts a single callback, so all of them are run from one.
+        """
+        if not self.callbacks:
+            self.server.setCallback(self.run_callbacks)
+        self.callbacks.append(function)
+
+    def remove_callback(self, function):
+        self.callbacks.remove(function)
+
+    def run_callbacks(self):
+        for function in self.callbacks:
+            function()
+
+    def render(self, filename, timeline, duration=None):
+        """
+        Render a control timeline to a WAV file as fast as possible (offline server only).
+
+        :param filename: Path of the WAV file to write.
+        :param timeline: List of (time, frequency, volume) points, time in seconds and volume in [0, 1],
+                         sorted by time. Each point is held until the next one, as in the live loop.
+                         An expressive Audio also takes a fourth item with the update_modulation arguments.
+        :param duration: Length of the rendering in seconds (default is the time of the last point).
+        """
+        if not self.offline:
+            raise RuntimeError("render() requires an Audio created with offline=True")
+        if duration is None:
+            duration = timeline[-1][0] if timeline else 0
+        if duration <= 0:
+            raise ValueError("Nothing to render: the timeline is empty or has zero duration")
+
+        buffer_duration = self.server.getBufferSize() / self.server.getSamplingRate()
+        state = {"buffer": 0, "index": 0}
+
+        def apply_controls():
+            # Called by the server before computing each buffer
+            now = state["buffer"] * buffer_duration
+            while state["index"] < len(timeline) and timeline[state["index"]][0] <= now:
+                _, frequency, volume, *modulation = timeline[state["index"]]
+                self.update_frequency(frequency)
+                self.update_volume(volume * 100)
+                if modulation:
+                    self.update_modulation(**modulation[0])
+                state["index"] += 1
+            state["buffer"] += 1
+
+        self.server.recordOptions(dur=duration, filename=filename, fileformat=0, sampletype=0) # 16 bit WAV
+        self.add_callback(apply_controls)
+        self.output.out()
+        for voice in self.voices:
+            voice.output.out(voice.channel)
+        try:
+            self.server.start() # blocks until the whole file is rendered
+        finally:
+            self.remove_callback(apply_controls)
+
 def main():
     audio = Audio(initial_frequency=440, initial_volume=0.5)
     audio.start()
@@ -3,36 +3,323 @@ Camera Module
 Based on https://github.com/AnodeGrindYo/AI-Theremin
 """
 
+import os
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
 import cv2
-from typing import Tuple, Union
+import numpy as np
+from typing import Optional, Tuple, Union
+
+class PipeCapture:
+    """
+    Reads raw BGR frames of a known geometry from a named pipe, a file or stdin ('-'), with the
+    interface of cv2.VideoCapture used by Camera.
+
+    Frames are numpy views (np.frombuffer, no copy) over a small ring of reusable buffers: a frame
+    stays valid until `buffers` more frames have been read.
+    """
+
+    def __init__(self, path: str, width: int, height: int, fps: float = 0, buffers: int = 3) -> None:
+        if width is None or height is None:
+            raise ValueError("Raw pipe sources need the width and height of the frames")
+        self.width, self.height, self.fps = width, height, fps
+        self.frame_size = width * height * 3
+        self.buffers = [bytearray(self.frame_size) for _ in range(buffers)]
+        self.views = [memoryview(buffer) for buffer in self.buffers]
+        self.index = 0
+        self.stream = sys.stdin.buffer if path == "-" else open(path, "rb", buffering=0)
+
+    def isOpened(self) -> bool:
+        return self.stream is not None and not self.stream.closed
+
+    def read(self):
+        if not self.isOpened():
+            return False, None
+        view = self.views[self.index]
+        filled = 0
+        while filled < self.frame_size: # a pipe may deliver a frame in several chunks
+            count = self.stream.readinto(view[filled:])
+            if not count:
+                return False, None # end of stream (or truncated frame)
+            filled += count
+        frame = np.frombuffer(self.buffers[self.index], dtype=np.uint8).reshape(self.height, self.width, 3)
+        self.index = (self.index + 1) % len(self.buffers)
+        return True, frame
+
+    def get(self, prop) -> float:
+        return {cv2.CAP_PROP_FRAME_WIDTH: self.width, cv2.CAP_PROP_FRAME_HEIGHT: self.height,
+                cv2.CAP_PROP_FPS: self.fps, cv2.CAP_PROP_BUFFERSIZE: len(self.buffers)}.get(prop, 0)
+
+    def set(self, prop, value) -> bool:
+        return False # the geometry is fixed by the producer
+
+    def release(self) -> None:
+        if self.stream is not None and self.stream is not sys.stdin.buffer:
+            self.stream.close()
+        self.stream = None
+
+# Rings created by this process, whose blocks stay registered for clean up when they are attached again
+_created_rings = set()
+
+class SharedMemoryFrameRing:
+    """
+    Ring of BGR frame slots in a multiprocessing.shared_memory block, written by a producer process
+    (e.g. a capture daemon) and read by Camera('shm:<name>').
+
+    Layout: a header of 8 uint64 (magic, slots, width, height, channels, frames written, 2 reserved)
+    followed by the slots. The producer fills a slot and then increments the frame counter.
+    """
+
+    MAGIC = 0x54484552454D494E # "THEREMIN"
+    HEADER = 64                 # bytes
+
+    def __init__(self, name: str, width: int = None, height: int = None, channels: int = 3,
+                 slots: int = 4, create: bool = False) -> None:
+        """
+        :param name: Name of the shared memory block.
+        :param width: Frame width (only needed to create the ring).
+        :param height: Frame height (only needed to create the ring).
+        :param slots: Number of frames kept in the ring (only needed to create the ring).
+        :param create: Create the block (producer) instead of attaching to an existing one (reader).
+        """
+        if create:
+            size = self.HEADER + slots * width * height * channels
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            _created_rings.add(self.shm.name)
+            self.header = np.ndarray((8,), dtype=np.uint64, buffer=self.shm.buf)
+            self.header[:] = [self.MAGIC, slots, width, height, channels, 0, 0, 0]
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # Only the creator must unlink the block when it exits (attaching registers it as well)
+            # (POSIX only: the tracker knows the block by its name with the leading "/" of shm_open)
+            if os.name == "posix" and self.shm.name not in _created_rings:
+                resource_tracker.unregister("/" + self.shm.name.lstrip("/"), "shared_memory")
+            self.header = np.ndarray((8,), dtype=np.uint64, buffer=self.shm.buf)
+            if int(self.header[0]) != self.MAGIC:
+                self.header = None
+                self.shm.close()
+                raise ValueError(f"Shared memory block '{name}' is not a frame ring")
+        self.created = create
+        self.slots, self.width, self.height, self.channels = (int(value) for value in self.header[1:5])
+        self.frame_size = self.width * self.height * self.channels
+        frames = np.ndarray((self.slots, self.height, self.width, self.channels), dtype=np.uint8,
+                            buffer=self.shm.buf, offset=self.HEADER)
+        self.frames = list(frames) # one view per slot
+
+    @property
+    def written(self) -> int:
+        """Number of frames written so far."""
+        return int(self.header[5])
+
+    def write(self, frame) -> None:
+        """Copies a frame into the next slot and publishes it (producer side)."""
+        written = self.written
+        self.frames[written % self.slots][...] = frame
+        self.header[5] = written + 1
+
+    def frame(self, number):
+        """:return: View (no copy) of a frame by its number, valid until `slots` - 1 newer frames are written."""
+        return self.frames[number % self.slots]
+
+    def close(self) -> None:
+        self.frames = []
+        self.header = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass # frames returned to the caller still reference the block, it is unmapped when they are freed
+        if self.created:
+            self.shm.unlink()
+            _created_rings.discard(self.shm.name)
+
+class SharedMemoryCapture:
+    """
+    Reads the most recent frame of a SharedMemoryFrameRing, with the interface of cv2.VideoCapture used
+    by Camera. read() waits for a frame newer than the last one returned, up to `timeout` seconds.
+    """
+
+    def __init__(self, name: str, timeout: float = 1.0, fps: float = 0) -> None:
+        self.ring = SharedMemoryFrameRing(name)
+        self.timeout = timeout
+        self.fps = fps
+        self.last = self.ring.written # only frames written from now on are delivered
+
+    def isOpened(self) -> bool:
+        return self.ring is not None
+
+    def read(self):
+        if self.ring is None:
+            return False, None
+        deadline = time.perf_counter() + self.timeout
+        while self.ring.written == self.last:
+            if time.perf_counter() > deadline:
+                return False, None
+            time.sleep(0.0005)
+        self.last = self.ring.written
+        return True, self.ring.frame(self.last - 1)
+
+    def get(self, prop) -> float:
+        return {cv2.CAP_PROP_FRAME_WIDTH: self.ring.width, cv2.CAP_PROP_FRAME_HEIGHT: self.ring.height,
+                cv2.CAP_PROP_FPS: self.fps, cv2.CAP_PROP_BUFFERSIZE: self.ring.slots}.get(prop, 0)
+
+    def set(self, prop, value) -> bool:
+        return False # the geometry is fixed by the producer
+
+    def release(self) -> None:
+        if self.ring is not None:
+            self.ring.close()
+        self.ring = None
 
 class Camera:
     """
     Class representing a camera to capture frames.
     """
 
-    def __init__(self, source: Union[int, str] = 0) -> None:
+    def __init__(self, source: Union[int, str] = 0,
+                 fourcc: Optional[str] = None,
+                 buffer_size: Optional[int] = None,
+                 fps: Optional[float] = None,
+                 width: Optional[int] = None,
+                 height: Optional[int] = None,
+                 realtime: bool = False) -> None:
         """
         Initialize the camera.
 
-        :param source: Index of the camera device (default is 0) or a path to a local video file.
+        Capture settings left to None keep the driver defaults. The values the driver actually applied
+        are read back into self.settings, and a warning is printed for every request it did not honour.
+
+        :param source: Index of the camera device (default is 0), a path to a local video file,
+                       'pipe:<path>' for raw BGR frames from a named pipe or file ('pipe:-' for stdin,
+                       needs width and height) or 'shm:<name>' for a SharedMemoryFrameRing.
+        :param fourcc: Pixel format requested to the device, e.g. 'MJPG' or 'YUYV'.
+        :param buffer_size: Number of frames buffered by the driver (1 keeps only the most recent frame).
+        :param fps: Frame rate requested to the device.
+        :param width: Frame width requested to the device.
+        :param height: Frame height requested to the device.
+        :param realtime: For video files, deliver frames at the file's frame rate instead of as fast as
+                         they can be decoded.
         """
         self.source = source
-        self.cap = cv2.VideoCapture(source)
+        self.is_file = isinstance(source, str) and os.path.isfile(source)
+        # Camera devices (indices or /dev paths) can come back after a failure, streams and files just end
+        self.is_device = isinstance(source, int) or (isinstance(source, str) and source.startswith("/dev/"))
+        self.realtime = realtime and self.is_file
+        self.requested = {"fourcc": fourcc, "buffer_size": buffer_size, "fps": fps,
+                          "width": width, "height": height}
+        self.open()
+
+    def open(self) -> None:
+        """
+        Open the capture of the source and apply the requested settings.
+        """
+        source, requested = self.source, self.requested
+        if isinstance(source, str) and source.startswith("pipe:"):
+            self.cap = PipeCapture(source[len("pipe:"):], requested["width"], requested["height"], requested["fps"] or 0)
+        elif isinstance(source, str) and source.startswith("shm:"):
+            self.cap = SharedMemoryCapture(source[len("shm:"):], fps=requested["fps"] or 0)
+        else:
+            self.cap = cv2.VideoCapture(source)
         if not self.cap.isOpened():
             raise ValueError(f"Cannot open camera or video source: {source}")
 
+        if not self.is_file:
+            self.configure(**requested)
+        self.settings = self.get_settings()
+        if self.is_device: # files and streams report their own settings, not the requested ones
+            self.verify_settings()
+
+        self.frame_index = 0     # frames delivered so far
+        self.start_time = None   # time of the first frame, for real-time pacing of files
+
+    def reopen(self) -> None:
+        """
+        Release the capture and open the source again with the same settings (e.g. after a USB
+        disconnection). Raises ValueError while the device is not available.
+        """
+        self.cap.release()
+        self.open()
+
+    def configure(self, fourcc=None, buffer_size=None, fps=None, width=None, height=None) -> None:
+        """
+        Apply capture settings to the device. The FOURCC goes first since some drivers only
+        expose the higher resolutions and frame rates for compressed formats.
+        """
+        if fourcc is not None:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        if width is not None:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        if height is not None:
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps is not None:
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
+        if buffer_size is not None:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+
+    def get_settings(self) -> dict:
+        """
+        Read back the capture settings in use.
+
+        :return: Dictionary with the fourcc, buffer_size, fps, width and height reported by the backend.
+        """
+        code = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+        fourcc = "".join(chr((code >> 8 * i) & 0xFF) for i in range(4)) if code > 0 else None
+        return {"fourcc": fourcc,
+                "buffer_size": int(self.cap.get(cv2.CAP_PROP_BUFFERSIZE)),
+                "fps": self.cap.get(cv2.CAP_PROP_FPS),
+                "width": int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                "height": int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))}
+
+    def verify_settings(self) -> bool:
+        """
+        Compare the requested capture settings with the applied ones.
+
+        :return: True if the driver applied every requested setting.
+        """
+        honoured = True
+        for name, requested in self.requested.items():
+            if requested is None:
+                continue
+            applied = self.settings[name]
+            if name == "fps":
+                ok = abs(applied - requested) < 0.5
+            elif name == "fourcc":
+                ok = applied is not None and applied.upper() == requested.upper()
+            else:
+                ok = applied == requested
+            if not ok:
+                print(f"Camera {self.source}: requested {name}={requested} but the driver applied {applied}")
+                honoured = False
+        return honoured
+
     def read(self) -> Tuple[bool, Union[None, cv2.Mat]]:
         """
         Read a frame from the camera.
 
         :return: A tuple (success, frame), where success is a boolean and frame is the captured image or None.
         """
+        if self.realtime:
+            self.wait_for_next_frame()
         ret, frame = self.cap.read()
         if not ret:
             return False, None
+        self.frame_index += 1
         return True, frame
 
+    def wait_for_next_frame(self) -> None:
+        """
+        Sleep until the presentation time of the next frame of a video file (no-op when running late).
+        """
+        now = time.perf_counter()
+        if self.start_time is None:
+            self.start_time = now
+            return
+        fps = self.settings["fps"] or 30.0
+        delay = self.start_time + self.frame_index / fps - now
+        if delay > 0:
+            time.sleep(delay)
+
     def flip_horizontal(self, image: cv2.Mat) -> cv2.Mat:
         """
         Flip the image horizontally.
@@ -0,0 +1,204 @@
+"""
+Detector Pool Module
+Spreads consecutive frames across several worker processes, each with its own mediapipe Hands
+instance, and delivers the results in capture order through a reorder buffer.
+Meant for 60-120 fps cameras, where a single HandDetector cannot keep up.
+By: agarnung
+"""
+
+import multiprocessing
+import queue
+import time
+from collections import deque
+
+import cv2
+
+from modules.HandTrackingModule import HandDetector, drawHandLandmarks
+
+def detectorWorker(detectorArgs, inbox, outbox):
+    """
+    Worker process: detects the hands of every frame it receives until it gets None.
+    A frame that fails is delivered with no hands, so its sequence number is never missing.
+    """
+    detector = HandDetector(**detectorArgs)
+    while True:
+        item = inbox.get()
+        if item is None:
+            break
+        seq, imgRGB, (w, h), flipType = item
+        start = time.perf_counter()
+        try:
+            results = detector.hands.process(imgRGB)
+            hands = detector.handsFromResults(results, w, h, flipType)
+        except Exception as e:
+            print(f"Detector pool worker: frame {seq} failed: {e}")
+            hands = []
+        outbox.put((seq, hands, time.perf_counter() - start))
+
+class ReorderBuffer:
+    """
+    Holds results that arrive out of order and releases them in sequence order.
+    """
+
+    def __init__(self, first=0) -> None:
+        self.next = first   # sequence number of the next result to release
+        self.pending = {}   # seq -> (item, arrival time)
+        self.delays = deque(maxlen=1000) # time the last released results waited in the buffer (s)
+
+    def push(self, seq, item, arrival=None) -> None:
+        self.pending[seq] = (item, time.perf_counter() if arrival is None else arrival)
+
+    def pop(self, now=None) -> list:
+        """
+        :return: List of (seq, item) that can be released in order.
+        """
+        now = time.perf_counter() if now is None else now
+        ready = []
+        while self.next in self.pending:
+            item, arrival = self.pending.pop(self.next)
+            self.delays.append(now - arrival)
+            ready.append((self.next, item))
+            self.next += 1
+        return ready
+
+class HandDetectorPool:
+    """
+    Pool of hand detector processes with the findHands contract of HandDetector.
+
+    Frame n goes to worker n % workers, so each worker sees a fixed stride of frames and its
+    mediapipe tracker keeps continuity (with a motion between its frames `workers` times larger).
+    findHands is pipelined: it submits the frame and returns the most recent result delivered in
+    order, which lags behind the submitted frame by up to `maxInFlight` frames.
+    """
+
+    def __init__(self, workers=2, staticMode=False, maxHands=2, modelComplexity=1, detectionCon=0.5,
+                 minTrackCon=0.5, maxInFlight=None):
+        """
+        :param workers: Number of worker processes.
+        :param maxInFlight: Maximum number of frames submitted and not yet delivered (default is 2 per worker).
+                            findHands waits for results when the limit is reached.
+        The remaining parameters are those of HandDetector.
+        """
+        self.workers = workers
+        self.maxInFlight = maxInFlight if maxInFlight is not None else 2 * workers
+        detectorArgs = dict(staticMode=staticMode, maxHands=maxHands, modelComplexity=modelComplexity,
+                            detectionCon=detectionCon, minTrackCon=minTrackCon)
+
+        # 'spawn' so that every worker builds its own mediapipe graph from scratch
+        context = multiprocessing.get_context("spawn")
+        self.inboxes = [context.Queue() for _ in range(workers)]
+        self.outbox = context.Queue()
+        self.processes = [context.Process(target=detectorWorker, args=(detectorArgs, inbox, self.outbox), daemon=True)
+                          for inbox in self.inboxes]
+        for process in self.processes:
+            process.start()
+
+        self.nextSeq = 0                  # sequence number of the next submitted frame
+        self.reorder = ReorderBuffer()
+        self.submitTimes = {}             # seq -> submission time
+        self.latencies = deque(maxlen=1000)      # submission to in-order delivery (s)
+        self.inferenceTimes = deque(maxlen=1000) # time spent in hands.process by the workers (s)
+        self.delivered = 0
+        self.startTime = None
+        self.lastHands = []
+
+    def submit(self, imgRGB, size, flipType=True) -> int:
+        """
+        Sends a frame to its worker.
+        :param imgRGB: RGB image to run the inference on.
+        :param size: (w, h) of the image the landmarks must refer to.
+        :return: Sequence number of the frame.
+        """
+        seq = self.nextSeq
+        if self.startTime is None:
+            self.startTime = time.perf_counter()
+        self.submitTimes[seq] = time.perf_counter()
+        self.inboxes[seq % self.workers].put((seq, imgRGB, size, flipType))
+        self.nextSeq += 1
+        return seq
+
+    def collect(self, block=False, timeout=None) -> list:
+        """
+        Gathers the finished results and releases those that are in order.
+        :param block: Wait until at least one result arrives.
+        :return: List of (seq, hands) in capture order.
+        """
+        try:
+            if block:
+                self.addResult(*self.outbox.get(timeout=timeout))
+            while True:
+                self.addResult(*self.outbox.get_nowait())
+        except queue.Empty:
+            pass
+
+        now = time.perf_counter()
+        ready = self.reorder.pop(now)
+        for seq, _ in ready:
+            self.latencies.append(now - self.submitTimes.pop(seq))
+        self.delivered += len(ready)
+        if ready:
+            self.lastHands = ready[-1][1]
+        return ready
+
+    def addResult(self, seq, hands, inferenceTime):
+        self.inferenceTimes.append(inferenceTime)
+        self.reorder.push(seq, hands)
+
+    def inFlight(self) -> int:
+        return self.nextSeq - self.reorder.next
+
+    def findHands(self, img, draw=True, flipType=True, inferenceImg=None):
+        """
+        Submits a BGR frame and returns the latest hands delivered in order (see the class notes).
+        :param inferenceImg: Optional RGB copy of img to run the inference on, as in HandDetector.
+        :return: Detected hands and the processed image.
+        """
+        imgRGB = inferenceImg if inferenceImg is not None else cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        h, w = img.shape[:2]
+        self.submit(imgRGB, (w, h), flipType)
+        self.collect()
+        while self.inFlight() > self.maxInFlight:
+            # A dead worker never delivers its frames, the ones in flight would be waited for forever
+            stopped = [index for index, process in enumerate(self.processes) if not process.is_alive()]
+            if stopped:
+                raise RuntimeError(f"Detector pool workers {stopped} have stopped")
+            self.collect(block=True, timeout=1.0) # backpressure: the workers cannot keep up
+
+        if draw:
+            for hand in self.lastHands:
+                drawHandLandmarks(img, hand)
+        return self.lastHands, img
+
+    def drawHand(self, img, myHand, color=(255, 0, 255)):
+        return drawHandLandmarks(img, myHand, color)
+
+    def metrics(self) -> dict:
+        """
+        :return: Throughput (delivered frames per second) and, over the last 1000 frames, the ordering
+                 delay (time results wait in the reorder buffer), end-to-end latency and worker
+                 inference time, in ms.
+        """
+        elapsed = time.perf_counter() - self.startTime if self.startTime else 0
+
+        def stats(values):
+            if not values:
+                return {"mean": 0.0, "max": 0.0}
+            return {"mean": 1000 * sum(values) / len(values), "max": 1000 * max(values)}
+
+        return {"workers": self.workers,
+                "delivered": self.delivered,
+                "throughput": self.delivered / elapsed if elapsed > 0 else 0.0,
+                "ordering_delay_ms": stats(self.reorder.delays),
+                "latency_ms": stats(self.latencies),
+                "inference_ms": stats(self.inferenceTimes)}
+
+    def close(self) -> None:
+        """Stops the worker processes."""
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for process, inbox in zip(self.processes, self.inboxes):
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+            # Frames left for a dead worker must not keep this process from exiting, flushing its queue
+            inbox.cancel_join_thread()
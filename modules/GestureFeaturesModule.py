@@ -0,0 +1,73 @@
+"""
+Gesture Features Module
+Extracts all the gesture features of a hand in a single vectorized pass over its landmark array:
+pinch distances, finger-up states, palm orientation and openness. The mappers and the modulation
+targets share the result instead of each one walking lmList again.
+By: agarnung
+"""
+
+import math
+
+import numpy as np
+
+from modules.HandTrackingModule import TIP_IDS
+
+TIPS = np.array(TIP_IDS)
+FINGER_TIPS = TIPS[1:]  # index, middle, ring, pinky
+WRIST, INDEX_MCP, MIDDLE_MCP, PINKY_MCP = 0, 5, 9, 17
+
+def handOpenness(lmList) -> float:
+    """
+    Hand spread as the geometric mean of the distances between consecutive fingertips (pixels).
+    Scalar code: for five points it is faster than building an array (see handFeatures for the full pass).
+    :param lmList: The 21 landmarks of the hand, as a list or an array.
+    """
+    if len(lmList) == 0:
+        return 0.0
+    tips = [lmList[i] for i in TIP_IDS]
+    product = 1.0
+    for a, b in zip(tips, tips[1:]):
+        product *= math.hypot(b[0] - a[0], b[1] - a[1])
+    return float(product ** 0.25) # 0 when two fingertips touch, as exp(mean(log)) gives
+
+def handFeatures(myHand) -> dict:
+    """
+    Computes the gesture features of a hand.
+    :param myHand: Hand dictionary as returned by findHands.
+    :return: Dictionary with:
+             "pinch": distances from the thumb tip to the other four fingertips (pixels),
+             "palmSize": distance from the wrist to the middle finger knuckle (pixels),
+             "pinchNorm": pinch distances relative to the palm size,
+             "fingers": finger-up states as in fingersUp (1 for up, 0 for down),
+             "palmNormal": unit normal of the palm plane (its z component is close to +-1 when the palm faces the camera),
+             "roll": tilt of the hand in degrees (0 upright, positive leaning to the right of the image),
+             "openness": geometric mean of the distances between consecutive fingertips (pixels),
+             "opennessNorm": openness relative to the palm size.
+    """
+    lm = np.asarray(myHand["lmList"], dtype=float)
+    xy = lm[:, :2]
+
+    palm = xy[MIDDLE_MCP] - xy[WRIST]
+    palmSize = float(np.hypot(*palm))
+    pinch = np.hypot(*(xy[FINGER_TIPS] - xy[TIPS[0]]).T)
+
+    # Finger-up states: the thumb by the side of its tip, the others by the height of their tips
+    thumb = xy[TIPS[0], 0] > xy[TIPS[0] - 1, 0] if myHand["type"] == "Right" else xy[TIPS[0], 0] < xy[TIPS[0] - 1, 0]
+    fingers = np.concatenate(([thumb], xy[FINGER_TIPS, 1] < xy[FINGER_TIPS - 2, 1])).astype(int)
+
+    normal = np.cross(lm[INDEX_MCP] - lm[WRIST], lm[PINKY_MCP] - lm[WRIST])
+    length = np.linalg.norm(normal)
+    normal = normal / length if length > 0 else np.array([0.0, 0.0, 1.0])
+
+    spread = np.hypot(*np.diff(xy[TIPS], axis=0).T)
+    openness = float(np.prod(spread)) ** 0.25 # geometric mean of the four distances
+
+    scale = palmSize if palmSize > 0 else 1.0
+    return {"pinch": pinch,
+            "palmSize": palmSize,
+            "pinchNorm": pinch / scale,
+            "fingers": fingers,
+            "palmNormal": normal,
+            "roll": float(np.degrees(np.arctan2(palm[0], -palm[1]))),
+            "openness": openness,
+            "opennessNorm": openness / scale}
@@ -0,0 +1,157 @@
+"""
+Governor Module
+Splits the CPU between vision and audio: OpenCV's thread pool is capped, the threads doing vision
+work (the loop, mediapipe/XNNPACK and the detector worker processes, which inherit the affinity of
+the thread creating them) are pinned to one set of cores and the audio server threads to another,
+so that the inference cannot starve the audio callback.
+Audio dropouts (xruns) are estimated from the gaps between the server's buffer callbacks.
+see https://man7.org/linux/man-pages/man2/sched_setaffinity.2.html
+By: agarnung
+"""
+
+import os
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+def thread_ids() -> set:
+    """
+    :return: Ids of the threads of this process (empty where /proc is not available).
+    """
+    try:
+        return {int(tid) for tid in os.listdir("/proc/self/task")}
+    except OSError:
+        return set()
+
+def pin(tid, cores) -> bool:
+    """
+    Sets the CPU affinity of a thread (0 is the calling thread).
+    :return: False if the platform does not support it or the thread is gone.
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        return False
+    try:
+        os.sched_setaffinity(tid, cores)
+        return True
+    except OSError:
+        return False
+
+class ResourceGovernor:
+    """
+    Thread budget and core split between vision and audio, with the xrun and frame time report
+    needed to tune it.
+    """
+
+    def __init__(self, vision_cores=None, audio_cores=None, cv_threads=None, xrun_factor=1.5) -> None:
+        """
+        :param vision_cores: Cores for the capture, preprocessing, inference and mapping (default is all
+                             the cores available but the audio ones).
+        :param audio_cores: Cores for the audio server threads (default is the last core available, when
+                            there are at least two).
+        :param cv_threads: Threads of OpenCV's pool (default is the number of vision cores).
+        :param xrun_factor: A gap between two buffer callbacks longer than this many buffer durations
+                            is counted as an xrun.
+        """
+        available = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+        if audio_cores is None:
+            audio_cores = available[-1:] if len(available) > 1 else available
+        if vision_cores is None:
+            vision_cores = [core for core in available if core not in audio_cores] or available
+        self.vision_cores = set(vision_cores)
+        self.audio_cores = set(audio_cores)
+        self.cv_threads = cv_threads if cv_threads is not None else len(self.vision_cores)
+        self.xrun_factor = xrun_factor
+
+        self.original_cores = None       # affinity and OpenCV threads before apply, see restore
+        self.original_cv_threads = None
+        self.audio_threads = set()       # thread ids pinned to the audio cores
+        self.buffer_duration = None
+        self.last_callback = None
+        self.callbacks = 0
+        self.xruns = 0
+        self.gaps = deque(maxlen=10000)  # time between buffer callbacks (s)
+        self.frame_times = deque(maxlen=10000)
+
+    def apply(self) -> bool:
+        """
+        Caps OpenCV's threads and pins the threads of the process to the vision cores. Call it before
+        creating the hand detector, so that its threads and worker processes inherit the affinity.
+        :return: False if the core split is not supported on this platform.
+        """
+        self.original_cv_threads = cv2.getNumThreads()
+        if hasattr(os, "sched_getaffinity"):
+            self.original_cores = os.sched_getaffinity(0)
+        cv2.setNumThreads(self.cv_threads)
+        pinned = pin(0, self.vision_cores)
+        for tid in thread_ids() - self.audio_threads:
+            pin(tid, self.vision_cores)
+        if not pinned:
+            print("CPU affinity is not supported on this platform, only the thread count is limited")
+        return pinned
+
+    def restore(self) -> None:
+        """
+        Gives the threads of the process back the affinity and OpenCV the thread count they had before apply.
+        """
+        if self.original_cv_threads is not None:
+            cv2.setNumThreads(self.original_cv_threads)
+        if self.original_cores is not None:
+            for tid in thread_ids():
+                pin(tid, self.original_cores)
+        self.original_cores = self.original_cv_threads = None
+        self.audio_threads = set()
+
+    def start_audio(self, audio) -> None:
+        """
+        Starts the audio server, pins the threads it creates to the audio cores and installs the
+        xrun monitor on its buffer callback.
+        :param audio: Audio (not offline: an offline server renders in the calling thread).
+        """
+        self.buffer_duration = audio.server.getBufferSize() / audio.server.getSamplingRate()
+        audio.add_callback(self.on_buffer)
+        before = thread_ids()
+        audio.start()
+        for tid in thread_ids() - before:
+            if pin(tid, self.audio_cores):
+                self.audio_threads.add(tid)
+
+    def on_buffer(self) -> None:
+        """
+        Called by the audio server before computing each buffer.
+        """
+        now = time.perf_counter()
+        if self.last_callback is not None:
+            gap = now - self.last_callback
+            self.gaps.append(gap)
+            if gap > self.xrun_factor * self.buffer_duration:
+                self.xruns += 1
+        self.last_callback = now
+        self.callbacks += 1
+
+    def frame(self, duration) -> None:
+        """
+        Records the processing time of a frame of the vision loop (s).
+        """
+        self.frame_times.append(duration)
+
+    def report(self) -> dict:
+        """
+        :return: Core split, thread budget, xruns and frame and callback gap percentiles in ms.
+        """
+        def percentiles(values):
+            if not values:
+                return {}
+            values = np.asarray(values) * 1000
+            return {"p50": float(np.percentile(values, 50)), "p95": float(np.percentile(values, 95)),
+                    "max": float(values.max())}
+
+        return {"vision_cores": sorted(self.vision_cores),
+                "audio_cores": sorted(self.audio_cores),
+                "cv_threads": cv2.getNumThreads(),
+                "audio_threads": len(self.audio_threads),
+                "callbacks": self.callbacks,
+                "xruns": self.xruns,
+                "callback_gap_ms": percentiles(self.gaps),
+                "frame_ms": percentiles(self.frame_times)}
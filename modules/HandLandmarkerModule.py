@@ -0,0 +1,141 @@
+"""
+Hand Landmarker Module
+Alternative hand detection backend on the mediapipe Tasks HandLandmarker in LIVE_STREAM mode.
+Frames are submitted with a timestamp and the results arrive through a callback, so findHands
+returns immediately with the latest result instead of blocking for the whole inference.
+see https://ai.google.dev/edge/mediapipe/solutions/vision/hand_landmarker/python
+By: agarnung
+"""
+
+import os
+import threading
+import time
+
+import cv2
+import mediapipe as mp
+import numpy as np
+from mediapipe.tasks.python import BaseOptions, vision
+
+from modules.HandTrackingModule import handFromLandmarks, drawHandLandmarks
+
+# Default location of the model bundle, download it from MODEL_URL
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "hand_landmarker.task")
+MODEL_URL = "https://storage.googleapis.com/mediapipe-models/hand_landmarker/hand_landmarker/float16/1/hand_landmarker.task"
+
+class HandLandmarkerDetector:
+    """
+    Asynchronous hand detector with the findHands contract of HandDetector.
+    The hands returned for a frame are those of the most recent result available, usually
+    computed on a previous frame; frames submitted while the model is busy may be skipped.
+    """
+
+    def __init__(self, modelPath=None, maxHands=2, detectionCon=0.5, presenceCon=0.5, minTrackCon=0.5):
+        """
+        :param modelPath: Path of the hand_landmarker.task bundle (default is models/hand_landmarker.task).
+        :param maxHands: Maximum number of hands to detect.
+        :param detectionCon: Minimum palm detection confidence threshold.
+        :param presenceCon: Minimum hand presence confidence threshold.
+        :param minTrackCon: Minimum tracking confidence threshold.
+        """
+        modelPath = modelPath or MODEL_PATH
+        if not os.path.isfile(modelPath):
+            raise FileNotFoundError(f"Hand landmarker model not found at {modelPath}, download it from {MODEL_URL}")
+
+        self.maxHands = maxHands
+        self.lock = threading.Lock()
+        self.latest = None          # (result, timestamp in ms) of the last callback
+        self.lastTimestamp = -1     # timestamps given to mediapipe must increase
+        self.submitTimes = {}       # timestamp -> submission time, to measure the latency
+        self.latencies = []         # submission to result (s), last 1000 results
+        self.submitted = 0
+        self.received = 0
+
+        options = vision.HandLandmarkerOptions(base_options=BaseOptions(model_asset_path=modelPath),
+                                               running_mode=vision.RunningMode.LIVE_STREAM,
+                                               num_hands=maxHands,
+                                               min_hand_detection_confidence=detectionCon,
+                                               min_hand_presence_confidence=presenceCon,
+                                               min_tracking_confidence=minTrackCon,
+                                               result_callback=self.onResult)
+        self.landmarker = vision.HandLandmarker.create_from_options(options)
+
+    def onResult(self, result, outputImage, timestampMs):
+        """
+        Called from a mediapipe thread with the result of a submitted frame.
+        """
+        now = time.perf_counter()
+        with self.lock:
+            self.latest = (result, timestampMs)
+            self.received += 1
+            submitted = self.submitTimes.pop(timestampMs, None)
+            # results come in order, older pending frames were skipped by the landmarker
+            for timestamp in [t for t in self.submitTimes if t < timestampMs]:
+                del self.submitTimes[timestamp]
+            if submitted is not None:
+                self.latencies.append(now - submitted)
+                del self.latencies[:-1000]
+
+    def submit(self, imgRGB, timestampMs=None) -> int:
+        """
+        Sends an RGB frame to the landmarker without waiting for the result.
+        :param timestampMs: Capture timestamp in ms (default is the current time).
+        :return: The timestamp used, made strictly increasing as mediapipe requires.
+        """
+        if timestampMs is None:
+            timestampMs = int(time.perf_counter() * 1000)
+        timestampMs = max(int(timestampMs), self.lastTimestamp + 1)
+        self.lastTimestamp = timestampMs
+
+        image = mp.Image(image_format=mp.ImageFormat.SRGB, data=np.ascontiguousarray(imgRGB))
+        with self.lock:
+            self.submitTimes[timestampMs] = time.perf_counter()
+        self.landmarker.detect_async(image, timestampMs)
+        self.submitted += 1
+        return timestampMs
+
+    def findHands(self, img, draw=True, flipType=True, inferenceImg=None, timestampMs=None):
+        """
+        Submits a BGR image and returns the hands of the latest result available.
+        :param img: Image in which to detect hands.
+        :param draw: Flag to draw landmarks and hand outline on the image.
+        :param inferenceImg: Optional RGB copy of img to run the inference on, as in HandDetector.
+        :param timestampMs: Capture timestamp of the frame in ms (default is the current time).
+        :return: Detected hands and the processed image.
+        """
+        imgRGB = inferenceImg if inferenceImg is not None else cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        self.submit(imgRGB, timestampMs)
+
+        with self.lock:
+            latest = self.latest
+        allHands = []
+        if latest is not None:
+            result, _ = latest
+            h, w = img.shape[:2]
+            for landmarks, handedness in zip(result.hand_landmarks, result.handedness):
+                allHands.append(handFromLandmarks(landmarks, handedness[0].category_name, w, h, flipType))
+
+        if draw:
+            for myHand in allHands:
+                drawHandLandmarks(img, myHand)
+        return allHands, img
+
+    def drawHand(self, img, myHand, color=(255, 0, 255)):
+        return drawHandLandmarks(img, myHand, color)
+
+    def metrics(self) -> dict:
+        """
+        :return: Frames submitted, results received and submission-to-result latency in ms.
+        """
+        with self.lock:
+            latencies = list(self.latencies)
+        return {"submitted": self.submitted,
+                "received": self.received,
+                "skipped": self.submitted - self.received,
+                "latency_ms": {"mean": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+                               "max": 1000 * max(latencies) if latencies else 0.0}}
+
+    def close(self):
+        """
+        Releases the landmarker.
+        """
+        self.landmarker.close()
@@ -10,6 +10,8 @@ import mediapipe as mp
 import random
 import time 
 
+TIP_IDS = [4, 8, 12, 16, 20] # tip identifiers for the fingers
+
 class HandDetector:
     """
     Detects hands using the mediapipe library. Exports the landmarks in pixel format.
@@ -38,97 +40,80 @@ class HandDetector:
                                         min_tracking_confidence=self.minTrackCon)
 
         self.mpDraw = mp.solutions.drawing_utils
-        self.tipIds = [4, 8, 12, 16, 20] # tip identifiers for the fingers
+        self.tipIds = TIP_IDS # tip identifiers for the fingers
         self.fingers = [] # list to store the finger states (up or down)
         self.lmList = []  # list to store the hand landmark coordinates
 
-    def findHands(self, img, draw=True, flipType=True):
+    def findHands(self, img, draw=True, flipType=True, inferenceImg=None):
         """
         Detects hands in a BGR image.
         :param img: Image in which to detect hands.
         :param draw: Flag to draw landmarks and hand outline on the image.
+        :param inferenceImg: Optional RGB copy of img (e.g. downscaled and filtered) to run the inference on.
+                             Landmarks are still given in the pixel coordinates of img.
         :return: Detected hands and the processed image.
         """
-        imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB) # convert image to RGB for mediapipe
+        if inferenceImg is not None:
+            imgRGB = inferenceImg # already converted by the caller
+        else:
+            imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB) # convert image to RGB for mediapipe
         self.results = self.hands.process(imgRGB)
-        allHands = [] # list to store all detected hands
         h, w, c = img.shape # get image dimensions
-
-        if self.results.multi_hand_landmarks:  # if hands are detected
-            for handType, handLms in zip(self.results.multi_handedness, self.results.multi_hand_landmarks):
-                myHand = {} # dictionary to store information about the hand
-
-                # lmList: list of 21 landmarks for the hand
-                mylmList = []  # list to store the landmarks
-                xList = [] # list for x-coordinates
-                yList = [] # list for y-coordinates
-                for id, lm in enumerate(handLms.landmark): # enumerate through each landmark
-                    px, py, pz = int(lm.x * w), int(lm.y * h), int(lm.z * w)  # calculate pixel positions
-                    mylmList.append([px, py, pz])  # add to landmarks list
-                    xList.append(px) # add x-coordinate to xList
-                    yList.append(py) # add y-coordinate to yList
-
-                # bbox: Bounding box around the hand
-                xmin, xmax = min(xList), max(xList) # min and max x coordinates
-                ymin, ymax = min(yList), max(yList) # min and max y coordinates
-                boxW, boxH = xmax - xmin, ymax - ymin # width and height of the bounding box
-                bbox = xmin, ymin, boxW, boxH # bounding box coordinates
-                cx, cy = bbox[0] + (bbox[2] // 2), \
-                         bbox[1] + (bbox[3] // 2) # center of the bounding box
-
-                myHand["lmList"] = mylmList # store landmarks in dictionary
-                myHand["bbox"] = bbox # store bounding box
-                myHand["center"] = (cx, cy) # store center coordinates
-
-                if flipType: # if flipType is True, adjust hand type
-                    if handType.classification[0].label == "Right":
-                        myHand["type"] = "Left" # flip to "Left" if right hand
-                    else:
-                        myHand["type"] = "Right" # flip to "Right" if left hand
-                else:
-                    myHand["type"] = handType.classification[0].label # set hand type as per the mediapipe result
-                allHands.append(myHand) # add hand to allHands list
-
-                # draw landmarks and bounding box on image if draw is True
-                if draw:
-                    self.mpDraw.draw_landmarks(img, handLms,
-                                               self.mpHands.HAND_CONNECTIONS) # draw hand landmarks
-                    cv2.rectangle(img, (bbox[0] - 20, bbox[1] - 20),
-                                  (bbox[0] + bbox[2] + 20, bbox[1] + bbox[3] + 20),
-                                  (255, 0, 255), 2) # draw bounding box around hand
-                    cv2.putText(img, myHand["type"], (bbox[0] - 30, bbox[1] - 30), cv2.FONT_HERSHEY_PLAIN,
-                                2, (255, 0, 255), 2) # label hand type
+        allHands = self.handsFromResults(self.results, w, h, flipType) # list of all detected hands
+
+        # draw landmarks and bounding box on image if draw is True
+        if draw and self.results.multi_hand_landmarks:
+            for myHand, handLms in zip(allHands, self.results.multi_hand_landmarks):
+                bbox = myHand["bbox"]
+                self.mpDraw.draw_landmarks(img, handLms,
+                                           self.mpHands.HAND_CONNECTIONS) # draw hand landmarks
+                cv2.rectangle(img, (bbox[0] - 20, bbox[1] - 20),
+                              (bbox[0] + bbox[2] + 20, bbox[1] + bbox[3] + 20),
+                              (255, 0, 255), 2) # draw bounding box around hand
+                cv2.putText(img, myHand["type"], (bbox[0] - 30, bbox[1] - 30), cv2.FONT_HERSHEY_PLAIN,
+                            2, (255, 0, 255), 2) # label hand type
 
         return allHands, img # return detected hands and image with markings
 
+    def handsFromResults(self, results, w, h, flipType=True):
+        """
+        Converts the mediapipe results to hand dictionaries in pixel coordinates.
+        :param results: Output of mediapipe's Hands.process.
+        :param w: Width of the image the landmarks refer to.
+        :param h: Height of the image the landmarks refer to.
+        :param flipType: Flag to swap the "Left" and "Right" labels (for mirrored images).
+        :return: List of hands with their "lmList", "bbox", "center" and "type".
+        """
+        allHands = [] # list to store all detected hands
+
+        if results.multi_hand_landmarks:  # if hands are detected
+            for handType, handLms in zip(results.multi_handedness, results.multi_hand_landmarks):
+                allHands.append(handFromLandmarks(handLms.landmark, handType.classification[0].label,
+                                                  w, h, flipType)) # add hand to allHands list
+
+        return allHands
+
+    def close(self):
+        """
+        Releases the mediapipe graph.
+        """
+        self.hands.close()
+
+    def drawHand(self, img, myHand, color=(255, 0, 255)):
+        """
+        Draws a hand from its landmark list (e.g. landmarks that were not produced on this image).
+        :param img: Image to draw on.
+        :param myHand: Hand dictionary as returned by findHands.
+        :return: Image with the drawing.
+        """
+        return drawHandLandmarks(img, myHand, color)
+
     def fingersUp(self, myHand):
         """
         Detects how many fingers are up and returns them in a list.
         :return: List of fingers that are up (1 for up, 0 for down).
         """
-        fingers = [] # list to store which fingers are up
-        myHandType = myHand["type"] # get hand type (left or right)
-        myLmList = myHand["lmList"] # get the landmarks list
-
-        # Thumb
-        if myHandType == "Right":
-            if myLmList[self.tipIds[0]][0] > myLmList[self.tipIds[0] - 1][0]:
-                fingers.append(1) # thumb is up if x-coordinate of tip is greater
-            else:
-                fingers.append(0) # thumb is down if not
-        else:
-            if myLmList[self.tipIds[0]][0] < myLmList[self.tipIds[0] - 1][0]:
-                fingers.append(1) # thumb is up if x-coordinate of tip is less
-            else:
-                fingers.append(0) # thumb is down if not
-
-        # 4 Fingers
-        for id in range(1, 5): # loop through the remaining fingers
-            if myLmList[self.tipIds[id]][1] < myLmList[self.tipIds[id] - 2][1]:
-                fingers.append(1) # finger is up if y-coordinate of tip is smaller
-            else:
-                fingers.append(0) # finger is down if not
-        return fingers
+        return fingersUp(myHand, self.tipIds)
 
     def findDistance(self, p1, p2, img=None, color=(255, 0, 255), scale=5):
         """
@@ -153,6 +138,99 @@ class HandDetector:
 
         return length, info, img # return distance, line information, and updated image
 
+def fingersUp(myHand, tipIds=TIP_IDS):
+    """
+    Detects how many fingers are up and returns them in a list (usable with any detector backend).
+    :param myHand: Hand dictionary as returned by findHands.
+    :param tipIds: Landmark identifiers of the finger tips.
+    :return: List of fingers that are up (1 for up, 0 for down).
+    """
+    fingers = [] # list to store which fingers are up
+    myHandType = myHand["type"] # get hand type (left or right)
+    myLmList = myHand["lmList"] # get the landmarks list
+
+    # Thumb
+    if myHandType == "Right":
+        if myLmList[tipIds[0]][0] > myLmList[tipIds[0] - 1][0]:
+            fingers.append(1) # thumb is up if x-coordinate of tip is greater
+        else:
+            fingers.append(0) # thumb is down if not
+    else:
+        if myLmList[tipIds[0]][0] < myLmList[tipIds[0] - 1][0]:
+            fingers.append(1) # thumb is up if x-coordinate of tip is less
+        else:
+            fingers.append(0) # thumb is down if not
+
+    # 4 Fingers
+    for id in range(1, 5): # loop through the remaining fingers
+        if myLmList[tipIds[id]][1] < myLmList[tipIds[id] - 2][1]:
+            fingers.append(1) # finger is up if y-coordinate of tip is smaller
+        else:
+            fingers.append(0) # finger is down if not
+    return fingers
+
+def handFromLandmarks(landmarks, label, w, h, flipType=True):
+    """
+    Builds the hand dictionary of one detected hand.
+    :param landmarks: The 21 normalized landmarks of the hand (objects with x, y and z).
+    :param label: Handedness label given by mediapipe ("Left" or "Right").
+    :param w: Width of the image the landmarks refer to.
+    :param h: Height of the image the landmarks refer to.
+    :param flipType: Flag to swap the "Left" and "Right" labels (for mirrored images).
+    :return: Dictionary with the "lmList", "bbox", "center" and "type" of the hand.
+    """
+    myHand = {} # dictionary to store information about the hand
+
+    # lmList: list of 21 landmarks for the hand
+    mylmList = []  # list to store the landmarks
+    xList = [] # list for x-coordinates
+    yList = [] # list for y-coordinates
+    for id, lm in enumerate(landmarks): # enumerate through each landmark
+        px, py, pz = int(lm.x * w), int(lm.y * h), int(lm.z * w)  # calculate pixel positions
+        mylmList.append([px, py, pz])  # add to landmarks list
+        xList.append(px) # add x-coordinate to xList
+        yList.append(py) # add y-coordinate to yList
+
+    # bbox: Bounding box around the hand
+    xmin, xmax = min(xList), max(xList) # min and max x coordinates
+    ymin, ymax = min(yList), max(yList) # min and max y coordinates
+    boxW, boxH = xmax - xmin, ymax - ymin # width and height of the bounding box
+    bbox = xmin, ymin, boxW, boxH # bounding box coordinates
+    cx, cy = bbox[0] + (bbox[2] // 2), \
+             bbox[1] + (bbox[3] // 2) # center of the bounding box
+
+    myHand["lmList"] = mylmList # store landmarks in dictionary
+    myHand["bbox"] = bbox # store bounding box
+    myHand["center"] = (cx, cy) # store center coordinates
+
+    if flipType: # if flipType is True, adjust hand type
+        if label == "Right":
+            myHand["type"] = "Left" # flip to "Left" if right hand
+        else:
+            myHand["type"] = "Right" # flip to "Right" if left hand
+    else:
+        myHand["type"] = label # set hand type as per the mediapipe result
+    return myHand
+
+def drawHandLandmarks(img, myHand, color=(255, 0, 255)):
+    """
+    Draws a hand dictionary (landmarks, skeleton, bounding box and type) with OpenCV only.
+    :param img: Image to draw on.
+    :param myHand: Hand dictionary as returned by HandDetector.findHands.
+    :return: Image with the drawing.
+    """
+    lmList = myHand["lmList"]
+    for start, end in mp.solutions.hands.HAND_CONNECTIONS: # skeleton
+        cv2.line(img, tuple(lmList[start][0:2]), tuple(lmList[end][0:2]), (255, 255, 255), 2)
+    for lm in lmList: # joints
+        cv2.circle(img, tuple(lm[0:2]), 4, (0, 0, 255), cv2.FILLED)
+    bbox = myHand["bbox"]
+    cv2.rectangle(img, (bbox[0] - 20, bbox[1] - 20),
+                  (bbox[0] + bbox[2] + 20, bbox[1] + bbox[3] + 20), color, 2) # bounding box
+    cv2.putText(img, myHand["type"], (bbox[0] - 30, bbox[1] - 30), cv2.FONT_HERSHEY_PLAIN,
+                2, color, 2) # hand type
+    return img
+
 # Principal program for testing the module
 def main():
     start_time = 0
@@ -0,0 +1,124 @@
+"""
+Landmark Cache Module
+On-disk cache of the hands detected in every frame of a video file, so that reruns over the same
+clips (e.g. trying other mappers) skip the decoding and the inference.
+Entries are content addressed: the key is the hash of the video bytes together with the detector
+parameters, so renaming a clip still hits and changing a parameter misses. The cache is bounded in
+size and evicts the least recently used entries.
+By: agarnung
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+def videoHash(path, chunkSize=1 << 20) -> str:
+    """
+    :return: SHA-256 of the contents of a file, in hexadecimal.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunkSize), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class LandmarkCache:
+    """
+    Directory of cache entries, one JSON file per (video, detector parameters) with the hands of
+    each frame, indexed by frame number.
+    """
+
+    def __init__(self, directory, maxBytes=512 * 2**20) -> None:
+        """
+        :param directory: Directory of the cache (created if needed).
+        :param maxBytes: Maximum size of the cache on disk.
+        """
+        self.directory = directory
+        self.maxBytes = maxBytes
+        os.makedirs(directory, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, videoDigest, params) -> str:
+        """
+        :param videoDigest: Content hash of the video (see videoHash).
+        :param params: Detector parameters (JSON serializable), e.g. staticMode, modelComplexity and confidences.
+        :return: Key of the entry.
+        """
+        description = json.dumps({"video": videoDigest, "params": params}, sort_keys=True)
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def path(self, key) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, videoDigest, params):
+        """
+        :return: The cached entry ({"fps", "width", "height", "frames": hands per frame}) or None.
+        """
+        path = self.path(self.key(videoDigest, params))
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError): # missing, or a truncated file from an interrupted run
+            self.misses += 1
+            return None
+        os.utime(path) # most recently used
+        self.hits += 1
+        return entry
+
+    def put(self, videoDigest, params, entry) -> None:
+        """
+        Stores the entry of a whole video and evicts the least recently used ones above the size limit.
+        """
+        path = self.path(self.key(videoDigest, params))
+        # Written aside and renamed, so readers (other workers) never see a partial entry
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w") as f:
+                json.dump(entry, f, separators=(",", ":"))
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary) # no orphan temporary files on a full disk or an unserializable entry
+            raise
+        self.evict(keep=path)
+
+    def entries(self) -> list:
+        """
+        :return: (last use, size, path) of the entries, least recently used first.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue # evicted by another process
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None) -> int:
+        """
+        Removes the least recently used entries until the cache fits in maxBytes.
+        :param keep: Entry never evicted (the one just stored).
+        :return: Number of entries removed.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.maxBytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,119 @@
+"""
+Mosaic Module
+Batches the frames of several cameras into one hand detection call: the frames are downsized into
+the tiles of a mosaic image, a single findHands runs on it with room for the hands of every camera,
+and each detected hand is assigned back to its tile and rescaled to its camera's coordinates.
+This trades resolution (the hands get smaller in the mosaic) for the fixed per-call overhead of
+hands.process, see tests/mosaic_test.py to measure which serves more cameras per core.
+By: agarnung
+"""
+
+import math
+
+import cv2
+import numpy as np
+
+from modules.HandTrackingModule import HandDetector, drawHandLandmarks
+
+class MosaicDetector:
+    """
+    Hand detector for several frames at once, through one inference on a mosaic of them.
+    """
+
+    def __init__(self, cameras, tileSize=(320, 240), gap=16, handsPerCamera=2, detector=None, **detectorArgs) -> None:
+        """
+        :param cameras: Number of frames (cameras) per call.
+        :param tileSize: (width, height) of each tile; frames are resized to it (keep the cameras' aspect ratio).
+        :param gap: Black pixels between tiles, so a hand is not seen across two tiles.
+        :param handsPerCamera: Maximum number of hands per camera.
+        :param detector: Detector with the findHands contract of HandDetector (default is a HandDetector
+                         for cameras * handsPerCamera hands built with detectorArgs).
+        """
+        self.cameras = cameras
+        self.tileWidth, self.tileHeight = tileSize
+        self.gap = gap
+        self.columns = math.ceil(math.sqrt(cameras))
+        self.rows = math.ceil(cameras / self.columns)
+        self.hd = detector if detector is not None else HandDetector(maxHands=cameras * handsPerCamera, **detectorArgs)
+        # Mosaic allocated once, the tiles are resized into it in place
+        self.mosaic = np.zeros((self.rows * (self.tileHeight + gap) - gap,
+                                self.columns * (self.tileWidth + gap) - gap, 3), dtype=np.uint8)
+
+    def tileOrigin(self, index):
+        """
+        :return: (x, y) of the top left corner of a tile in the mosaic.
+        """
+        row, column = divmod(index, self.columns)
+        return column * (self.tileWidth + self.gap), row * (self.tileHeight + self.gap)
+
+    def tileAt(self, x, y):
+        """
+        :return: Index of the tile containing a mosaic point, or None for the gaps and the empty tiles.
+        """
+        column, dx = divmod(int(x), self.tileWidth + self.gap)
+        row, dy = divmod(int(y), self.tileHeight + self.gap)
+        if dx >= self.tileWidth or dy >= self.tileHeight or column >= self.columns:
+            return None
+        index = row * self.columns + column
+        return index if 0 <= index < self.cameras else None
+
+    def build(self, frames) -> np.ndarray:
+        """
+        Resizes the frames into their tiles of the mosaic.
+        """
+        for index, frame in enumerate(frames):
+            x, y = self.tileOrigin(index)
+            cv2.resize(frame, (self.tileWidth, self.tileHeight),
+                       dst=self.mosaic[y:y + self.tileHeight, x:x + self.tileWidth], interpolation=cv2.INTER_AREA)
+        for index in range(len(frames), self.cameras): # cameras missing in this call
+            x, y = self.tileOrigin(index)
+            self.mosaic[y:y + self.tileHeight, x:x + self.tileWidth] = 0
+        return self.mosaic
+
+    def toCamera(self, myHand, index, width, height):
+        """
+        Rescales a hand from mosaic coordinates to the coordinates of its camera.
+        :return: Hand dictionary as returned by findHands for that camera.
+        """
+        x0, y0 = self.tileOrigin(index)
+        sx, sy = width / self.tileWidth, height / self.tileHeight
+        lm = np.asarray(myHand["lmList"], dtype=float)
+        lm[:, 0] = (lm[:, 0] - x0) * sx
+        lm[:, 1] = (lm[:, 1] - y0) * sy
+        lm[:, 2] *= sx # z has the scale of x
+        lmList = lm.astype(int).tolist()
+        xmin, ymin = lm[:, :2].min(axis=0).astype(int)
+        xmax, ymax = lm[:, :2].max(axis=0).astype(int)
+        bbox = (int(xmin), int(ymin), int(xmax - xmin), int(ymax - ymin))
+        return {"lmList": lmList, "bbox": bbox, "center": (bbox[0] + bbox[2] // 2, bbox[1] + bbox[3] // 2),
+                "type": myHand["type"]}
+
+    def findHands(self, frames, draw=True, flipType=True):
+        """
+        Detects the hands in several BGR frames with one inference.
+        :param frames: One frame per camera (at most the number of cameras given at construction).
+        :param draw: Draw the hands on their frames.
+        :return: List with the detected hands of each frame, in the coordinates of that frame.
+        """
+        if len(frames) > self.cameras:
+            raise ValueError(f"The mosaic has room for {self.cameras} frames, got {len(frames)}")
+        mosaic = self.build(frames)
+        hands, _ = self.hd.findHands(mosaic, draw=False, flipType=flipType)
+
+        allHands = [[] for _ in frames]
+        for myHand in hands:
+            index = self.tileAt(*myHand["center"])
+            if index is None or index >= len(frames):
+                continue # detection in a gap or an empty tile
+            height, width = frames[index].shape[:2]
+            allHands[index].append(self.toCamera(myHand, index, width, height))
+
+        if draw:
+            for frame, frameHands in zip(frames, allHands):
+                for myHand in frameHands:
+                    drawHandLandmarks(frame, myHand)
+        return allHands
+
+    def close(self):
+        if hasattr(self.hd, "close"):
+            self.hd.close()
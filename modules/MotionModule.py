@@ -0,0 +1,57 @@
+"""
+Motion Module
+Cheap frame-differencing motion detector on a downscaled grayscale copy of the frames.
+Used to wake the theremin from standby and to skip hand inference when the scene is static.
+By: agarnung
+"""
+
+import cv2
+import numpy as np
+
+class MotionDetector:
+    """
+    Measures how much a frame differs from a reference frame as the mean absolute difference
+    (0-255) between downscaled grayscale versions of both.
+    """
+
+    def __init__(self, size=(64, 48)) -> None:
+        """
+        :param size: (width, height) of the downscaled grayscale images that are compared.
+        """
+        self.size = size
+        self.reference = None # downscaled grayscale reference frame
+        self.current = None   # downscaled grayscale version of the last frame passed to update()
+
+    def prepare(self, frame) -> np.ndarray:
+        """
+        Downscale first (cheap on a small image) and then convert to grayscale.
+        """
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def update(self, frame, keep_reference=False) -> float:
+        """
+        Compare a frame with the reference frame.
+
+        :param frame: BGR (or grayscale) frame of any size.
+        :param keep_reference: Keep the current reference instead of replacing it with this frame,
+                               to measure the accumulated change since the reference was taken.
+        :return: Motion score, infinite when there is no reference yet.
+        """
+        small = self.current = self.prepare(frame)
+        if self.reference is None:
+            score = float("inf")
+        else:
+            score = float(cv2.absdiff(small, self.reference).mean())
+        if not keep_reference or self.reference is None:
+            self.reference = small
+        return score
+
+    def set_reference(self) -> None:
+        """Use the last frame passed to update() as the reference frame."""
+        self.reference = self.current
+
+    def reset(self) -> None:
+        """Forget the reference frame."""
+        self.reference = None
+        self.current = None
@@ -0,0 +1,97 @@
+"""
+Preprocessing Module
+Declarative chain of image operations applied to the copy of the frame used for hand inference.
+The displayed frame is left untouched, and the chain runs at inference resolution.
+By: agarnung
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+def resize(img, width=None, height=None, interpolation=cv2.INTER_AREA):
+    """
+    Downscale keeping the aspect ratio when only one side is given. Never upscales.
+    """
+    h, w = img.shape[:2]
+    if width is None and height is None:
+        return img
+    scale = min(width / w if width else 1, height / h if height else 1)
+    if scale >= 1:
+        return img
+    return cv2.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=interpolation)
+
+def median(img, ksize=5):
+    return cv2.medianBlur(img, ksize)
+
+def gaussian(img, ksize=5, sigma=0):
+    return cv2.GaussianBlur(img, (ksize, ksize), sigma)
+
+def bilateral(img, d=15, sigmaColor=75, sigmaSpace=75):
+    return cv2.bilateralFilter(img, d, sigmaColor, sigmaSpace)
+
+def rgb(img):
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+# Available stages, by name
+STAGES = {
+    "resize": resize,
+    "median": median,
+    "gaussian": gaussian,
+    "bilateral": bilateral,
+    "rgb": rgb,
+}
+
+# Stages swapping the red and blue channels (BGR <-> RGB)
+COLOR_STAGES = {"rgb"}
+
+class PreprocessingChain:
+    """
+    Runs a list of stages such as [("resize", {"width": 320}), ("median", {"ksize": 5}), ("rgb", {})]
+    and keeps the time spent in each of them, keyed by position and name (e.g. "1:median") so that a
+    stage used twice is timed twice.
+
+    Put "resize" first so that the other stages run on the small image, and "rgb" last so that the
+    detector receives the image in the color order mediapipe expects and does not convert it again.
+    """
+
+    def __init__(self, stages=(("resize", {"width": 640}), ("median", {"ksize": 5}), ("rgb", {}))) -> None:
+        """
+        :param stages: Sequence of (name, parameters) with name in STAGES.
+        """
+        for name, _ in stages:
+            if name not in STAGES:
+                raise ValueError(f"Unknown preprocessing stage '{name}', expected one of {list(STAGES)}")
+        self.stages = [(name, dict(params)) for name, params in stages]
+        self.is_rgb = False # output is RGB instead of BGR, after the colour stages in order
+        for name, _ in self.stages:
+            if name in COLOR_STAGES:
+                self.is_rgb = not self.is_rgb
+        self.keys = [f"{i}:{name}" for i, (name, _) in enumerate(self.stages)]
+        self.timings = {}                               # ms spent by stage in the last frame
+        self.totals = {key: 0.0 for key in self.keys}   # accumulated ms by stage
+        self.count = 0                                  # frames processed
+
+    def __call__(self, frame) -> np.ndarray:
+        """
+        Apply the chain to a frame.
+
+        :param frame: BGR frame (not modified).
+        :return: The processed copy.
+        """
+        img = frame
+        for key, (name, params) in zip(self.keys, self.stages):
+            start = time.perf_counter()
+            img = STAGES[name](img, **params)
+            elapsed = (time.perf_counter() - start) * 1000
+            self.timings[key] = elapsed
+            self.totals[key] += elapsed
+        self.count += 1
+        return img
+
+    def report(self) -> dict:
+        """
+        :return: Mean ms per frame spent by each stage.
+        """
+        return {key: total / self.count if self.count else 0.0 for key, total in self.totals.items()}
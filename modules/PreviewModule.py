@@ -0,0 +1,174 @@
+"""
+Preview Module
+MJPEG preview of the annotated frames over HTTP, to monitor headless nodes from a browser
+(http://localhost:8080/) instead of a cv2.imshow window.
+publish() never blocks the control loop: frames are dropped when no client is connected, above the
+preview frame rate or while the encoder is busy, and slow clients just skip to the latest frame.
+see https://docs.python.org/3/library/http.server.html
+By: agarnung
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+BOUNDARY = "frame"
+PAGE = b"<html><head><title>Theremin View</title></head><body style='margin:0;background:#000'>" \
+       b"<img src='/stream' style='width:100%'></body></html>"
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    """
+    Serves the page (/), the MJPEG stream (/stream) and the latest frame (/snapshot.jpg).
+    """
+
+    def do_GET(self):
+        preview = self.server.preview
+        if self.path == "/":
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+        elif self.path == "/snapshot.jpg":
+            # A waiting snapshot counts as a client, so the loop publishes a fresh frame for it
+            preview.add_client(1)
+            try:
+                jpeg, _ = preview.wait_for_frame(preview.sequence, timeout=1.0)
+            finally:
+                preview.add_client(-1)
+            if jpeg is None:
+                self.send_error(503, "No frame available yet")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(jpeg)))
+            self.end_headers()
+            self.wfile.write(jpeg)
+        elif self.path == "/stream":
+            self.send_response(200)
+            self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            preview.add_client(1)
+            try:
+                sequence = 0
+                while preview.running:
+                    jpeg, new_sequence = preview.wait_for_frame(sequence, timeout=1.0)
+                    if jpeg is None or new_sequence == sequence:
+                        continue
+                    sequence = new_sequence # frames encoded meanwhile are skipped
+                    self.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                                     f"Content-Length: {len(jpeg)}\r\n\r\n".encode() + jpeg + b"\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass # client disconnected
+            finally:
+                preview.add_client(-1)
+        else:
+            self.send_error(404)
+
+    def log_message(self, format, *args):
+        pass # no log line per request
+
+class PreviewServer:
+    """
+    HTTP server streaming the published frames as MJPEG, encoded on a separate thread.
+    """
+
+    def __init__(self, port=8080, host="127.0.0.1", fps=10, quality=70, width=None) -> None:
+        """
+        :param port: HTTP port (0 picks a free one, see self.port).
+        :param host: Interface to listen on (default is localhost only).
+        :param fps: Maximum frame rate of the preview.
+        :param quality: JPEG quality (0-100).
+        :param width: Downscale the preview to this width (default is the frame width).
+        """
+        self.fps = fps
+        self.quality = quality
+        self.width = width
+        self.running = True
+
+        self.condition = threading.Condition()
+        self.pending = None         # frame waiting for the encoder
+        self.jpeg = None            # latest encoded frame
+        self.sequence = 0           # frames encoded so far
+        self.clients = 0
+        self.last_publish = 0.0
+        self.published = 0
+        self.dropped = 0
+
+        self.httpd = ThreadingHTTPServer((host, port), PreviewHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.preview = self
+        self.port = self.httpd.server_address[1]
+        self.server_thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.server_thread.start()
+        self.encoder_thread = threading.Thread(target=self.encode_loop, daemon=True)
+        self.encoder_thread.start()
+
+    def add_client(self, count) -> None:
+        with self.condition:
+            self.clients += count
+
+    def publish(self, frame) -> bool:
+        """
+        Offers a BGR frame to the preview without waiting.
+        :return: False if the frame was dropped.
+        """
+        now = time.perf_counter()
+        if not self.clients or now - self.last_publish < 1 / self.fps:
+            self.dropped += 1
+            return False
+        with self.condition:
+            if self.pending is not None: # the encoder has not taken the previous frame yet
+                self.dropped += 1
+                return False
+            self.pending = frame.copy() # the loop keeps drawing on its frames
+            self.condition.notify_all()
+        self.last_publish = now
+        self.published += 1
+        return True
+
+    def encode_loop(self) -> None:
+        while True:
+            with self.condition:
+                while self.running and self.pending is None:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                frame = self.pending
+            if self.width is not None and frame.shape[1] > self.width:
+                height = frame.shape[0] * self.width // frame.shape[1]
+                frame = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+            success, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            with self.condition:
+                self.pending = None
+                if success:
+                    self.jpeg = encoded.tobytes()
+                    self.sequence += 1
+                self.condition.notify_all()
+
+    def wait_for_frame(self, sequence, timeout=1.0):
+        """
+        Waits for a frame newer than the given sequence number (used by the client threads).
+        :return: A tuple (latest JPEG or None, its sequence number).
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.sequence > sequence or not self.running, timeout=timeout)
+            return self.jpeg, self.sequence
+
+    def metrics(self) -> dict:
+        return {"clients": self.clients, "published": self.published, "encoded": self.sequence,
+                "dropped": self.dropped}
+
+    def close(self) -> None:
+        """
+        Stops the encoder and the HTTP server.
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.encoder_thread.join()
@@ -0,0 +1,99 @@
+"""
+Recorder Module
+Archives the timestamped control and landmark stream of a session as JSON lines, in the landmark
+trace format of transcode.py. record() only enqueues the record: serialization and disk writes run
+on a background thread, in large chunks, and records are dropped (and counted) when the queue is full
+instead of making the control loop wait.
+By: agarnung
+"""
+
+import json
+import queue
+import threading
+import time
+
+class SessionRecorder:
+    """
+    Background writer of JSON line records with a bounded queue.
+    """
+
+    def __init__(self, path, max_queue=1024, chunk_size=256) -> None:
+        """
+        :param path: Path of the JSON lines file (overwritten).
+        :param max_queue: Maximum number of records waiting to be written.
+        :param chunk_size: Maximum number of records written at once.
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.file = open(path, "w")
+        self.dropped = 0   # records lost because the queue was full
+        self.written = 0
+        self.chunks = 0
+        self.closed = False
+        self.error = None  # exception that stopped the writer, if any
+        self.thread = threading.Thread(target=self.write_loop, daemon=True)
+        self.thread.start()
+
+    def record(self, record) -> bool:
+        """
+        Enqueues a record (a JSON serializable dictionary) without waiting.
+        The record must not be modified afterwards, it is serialized later on the writer thread.
+        :return: False if it was dropped.
+        """
+        if self.closed or self.error is not None:
+            return False
+        try:
+            self.queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def write_loop(self) -> None:
+        try:
+            self.write_records()
+        except Exception as e: # e.g. a record that is not JSON serializable, or a full disk
+            self.error = e
+            print(f"Session recorder stopped: {e}")
+
+    def write_records(self) -> None:
+        done = False
+        while not done:
+            chunk = [self.queue.get()] # wait for the first record
+            while len(chunk) < self.chunk_size:
+                try:
+                    chunk.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if chunk[-1] is None: # end of the session (nothing is queued after it)
+                chunk.pop()
+                done = True
+            if chunk:
+                self.file.write("".join(json.dumps(record) + "\n" for record in chunk))
+                self.written += len(chunk)
+                self.chunks += 1
+        self.file.flush()
+
+    def metrics(self) -> dict:
+        return {"written": self.written, "dropped": self.dropped, "chunks": self.chunks,
+                "queued": self.queue.qsize(), "error": None if self.error is None else str(self.error)}
+
+    def close(self, timeout=5.0) -> None:
+        """
+        Writes the records still queued and closes the file. Gives up on the records left after
+        the timeout (s), or at once if the writer has stopped on an error (see metrics).
+        """
+        if self.closed:
+            return
+        self.closed = True
+        deadline = time.perf_counter() + timeout
+        while self.thread.is_alive() and time.perf_counter() < deadline:
+            try:
+                self.queue.put(None, timeout=0.1) # waits for room while the writer drains the queue
+                break
+            except queue.Full:
+                pass
+        self.thread.join(max(deadline - time.perf_counter(), 0))
+        if not self.thread.is_alive():
+            self.file.close() # otherwise the stalled writer still owns it
@@ -0,0 +1,93 @@
+"""
+Sampler Module
+Drum or effect samples triggered by hand gestures, layered over the theremin tone.
+Samples are decoded once into in-memory tables and their players are built up front, so a trigger
+only sets a flag on the audio server: it never touches the disk nor creates objects.
+see https://belangeo.github.io/pyo/api/objects/tables.html#sndtable
+By: agarnung
+"""
+
+import os
+import time
+
+from pyo import SndTable, Trig, TrigEnv
+
+class GestureDebouncer:
+    """
+    Turns a per-frame gesture stream into single events: a gesture fires once it has been seen in
+    hold_frames consecutive frames, and does not fire again until it is released (a different
+    gesture or no gesture becomes stable) and the refractory time has passed.
+    """
+
+    def __init__(self, hold_frames=3, refractory=0.3) -> None:
+        """
+        :param hold_frames: Consecutive frames a gesture must be held to be recognized.
+        :param refractory: Minimum time between two events, in seconds.
+        """
+        self.hold_frames = hold_frames
+        self.refractory = refractory
+        self.candidate = None   # gesture seen in the last frames
+        self.count = 0          # consecutive frames the candidate has been seen
+        self.current = None     # last stable gesture
+        self.last_fired = -float("inf")
+
+    def update(self, gesture, now=None):
+        """
+        :param gesture: Gesture seen in this frame (any hashable value), or None.
+        :param now: Current time in seconds (default is time.perf_counter()).
+        :return: The gesture when it fires in this frame, None otherwise.
+        """
+        now = time.perf_counter() if now is None else now
+        if gesture == self.candidate:
+            self.count += 1
+        else:
+            self.candidate, self.count = gesture, 1
+
+        if self.count < self.hold_frames or self.candidate == self.current:
+            return None
+        if self.candidate is None: # released
+            self.current = None
+            return None
+        if now - self.last_fired < self.refractory:
+            return None # not consumed, it fires once the refractory time has passed if still held
+        self.current = self.candidate
+        self.last_fired = now
+        return self.current
+
+class Sampler:
+    """
+    Set of preloaded samples, each one played from the start when triggered.
+    The pyo server must be booted (e.g. by Audio) before creating the sampler.
+    """
+
+    def __init__(self, samples, volume=1.0) -> None:
+        """
+        :param samples: Dictionary {key: path of a sound file}, e.g. {1: "kick.wav", 2: "snare.wav"}.
+        :param volume: Volume of the samples in [0, 1].
+        """
+        self.tables = {}
+        self.triggers = {}
+        self.players = {}
+        for key, path in samples.items():
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"Sample not found: {path}")
+            table = SndTable(path) # decoded into memory once
+            trigger = Trig()
+            self.tables[key] = table
+            self.triggers[key] = trigger
+            self.players[key] = TrigEnv(trigger, table=table, dur=table.getDur(), mul=volume).out()
+
+    def trigger(self, key) -> bool:
+        """
+        Plays a sample from its start (retriggering it if it is already playing).
+        :return: False if there is no sample for the key.
+        """
+        trigger = self.triggers.get(key)
+        if trigger is None:
+            return False
+        trigger.play()
+        return True
+
+    def set_volume(self, volume) -> None:
+        for player in self.players.values():
+            player.mul = volume
@@ -0,0 +1,131 @@
+"""
+Scheduler Module
+Jitter buffer for the theremin controls: every control point is stamped with the capture time of
+its frame and played out by the audio server, buffer by buffer, at capture time plus a fixed delay,
+interpolating between points. The variable inference time becomes a small constant latency and
+the pitch glides follow the hand evenly. Modulation targets (expressive mode) travel with their
+point and are applied, as steps, at the same playout time.
+By: agarnung
+"""
+
+import threading
+import time
+from collections import deque
+
+class ControlScheduler:
+    """
+    Plays timestamped (frequency, volume) points out to an Audio at a constant delay.
+    """
+
+    def __init__(self, audio, delay=0.1, clock=time.perf_counter, target=None) -> None:
+        """
+        :param audio: Audio whose server plays the points out (and whose controls are scheduled by default).
+        :param delay: Playout delay after the capture time (s); it should cover the slowest frames.
+        :param clock: Clock of the capture timestamps.
+        :param target: Object whose controls are scheduled instead, e.g. a Voice of the audio (A/B mode).
+        """
+        self.audio = audio
+        self.target = target if target is not None else audio
+        self.delay = delay
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.points = deque()   # (capture time, frequency, volume, modulation) not played out completely yet
+        self.modulation = {}    # modulation targets due and not applied yet
+        self.last_time = None   # capture time of the last point pushed
+        self.attached = False
+        self.pushed = 0         # points accepted
+        self.late = 0           # accepted points that arrived after their playout time
+        self.dropped = 0        # points older than the previous one, discarded
+        self.underruns = 0      # buffers with no newer point to glide to (the controls are held)
+        self.buffers = 0
+
+    def attach(self) -> None:
+        """
+        Starts playing the points out from the audio server's buffer callback.
+        """
+        if not self.attached:
+            self.audio.add_callback(self.on_buffer)
+            self.attached = True
+
+    def detach(self) -> None:
+        if self.attached:
+            self.audio.remove_callback(self.on_buffer)
+            self.attached = False
+
+    def push(self, capture_time, frequency, volume, modulation=None) -> bool:
+        """
+        Queues a control point.
+        :param capture_time: Capture time of the frame the point was computed from (clock time). When it
+                             is taken as the frame is read, the time the frame waited in the camera
+                             buffers is not included in the delay (keep the camera buffer_size small).
+        :param frequency: Frequency in Hz, or None to keep the frequency of the previous point.
+        :param volume: Volume in [0, 1].
+        :param modulation: Arguments for Audio.update_modulation, applied at the playout time of the point.
+        :return: False if the point arrived too late to be played at its time (it is still used as
+                 the latest value) or is older than the previous one (dropped).
+        """
+        with self.lock:
+            if self.last_time is not None and capture_time <= self.last_time:
+                self.dropped += 1
+                return False
+            self.last_time = capture_time
+            if frequency is None:
+                frequency = self.points[-1][1] if self.points else self.target.frequency
+            self.points.append((capture_time, float(frequency), float(volume), modulation or None))
+            self.pushed += 1
+            if capture_time + self.delay < self.clock():
+                self.late += 1
+                return False
+        return True
+
+    def due(self, point) -> None:
+        """
+        Collects the modulation of a point whose playout time has come (merged, so none is lost
+        when several points are due in the same buffer).
+        """
+        if point[3]:
+            self.modulation.update(point[3])
+
+    def value_at(self, playout_time):
+        """
+        Drops the points already played and interpolates the controls at a playout time. The
+        modulations that became due are left in self.modulation.
+        :return: (frequency, volume), or None before the first point.
+        """
+        with self.lock:
+            points = self.points
+            while len(points) > 1 and points[1][0] <= playout_time:
+                self.due(points.popleft()) # keep the last point at or before the playout time
+            if not points:
+                return None
+            t0, f0, v0, m0 = points[0]
+            if m0 and playout_time >= t0:
+                self.due(points[0])
+                points[0] = (t0, f0, v0, None) # applied once
+            if len(points) == 1 or playout_time <= t0:
+                if len(points) == 1 and playout_time > t0:
+                    self.underruns += 1
+                return f0, v0
+            t1, f1, v1, _ = points[1]
+        alpha = (playout_time - t0) / (t1 - t0)
+        return f0 + alpha * (f1 - f0), v0 + alpha * (v1 - v0)
+
+    def on_buffer(self, now=None) -> None:
+        """
+        Called by the audio server before computing each buffer: applies the controls due now.
+        """
+        self.buffers += 1
+        value = self.value_at((self.clock() if now is None else now) - self.delay)
+        if value is not None:
+            frequency, volume = value
+            self.target.update_frequency(frequency)
+            self.target.update_volume(volume * 100)
+        if self.modulation:
+            with self.lock:
+                modulation, self.modulation = self.modulation, {}
+            self.target.update_modulation(**modulation)
+
+    def metrics(self) -> dict:
+        return {"delay_ms": self.delay * 1000, "pushed": self.pushed, "late": self.late, "dropped": self.dropped,
+                "late_ratio": self.late / self.pushed if self.pushed else 0.0,
+                "underruns": self.underruns, "buffers": self.buffers, "buffered": len(self.points)}
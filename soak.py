@@ -0,0 +1,208 @@
+"""
+Soak test harness
+Replays a looping clip or a landmark trace (see transcode.py) through Theremin for hours, without
+display, sampling the process RSS, the tracemalloc top allocators and the frame-time percentiles.
+The report flags memory growth and frame-time drift trends.
+
+Usage: python3 soak.py --trace renders/clip.landmarks.jsonl --hours 8 --report soak.json
+       python3 soak.py --clip clip.mp4 --hours 8 --report soak.json
+"""
+
+import argparse
+import json
+import os
+import resource
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from theremin import Theremin, MAPPERS
+
+def rss_mb() -> float:
+    """
+    :return: Resident set size of this process in MB (peak RSS where /proc is not available).
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def load_trace(path) -> list:
+    """
+    :return: The records of a landmark trace (one JSON object per line).
+    """
+    with open(path) as trace:
+        return [json.loads(line) for line in trace if line.strip()]
+
+def trend(times, values) -> float:
+    """
+    :return: Slope of the least squares line through the points, per hour.
+    """
+    if len(times) < 2:
+        return 0.0
+    return float(np.polyfit(np.asarray(times) / 3600, np.asarray(values), 1)[0])
+
+def analyze(samples, warmup=0.1, rss_limit=10.0, traced_limit=5.0, frame_limit=2.0) -> dict:
+    """
+    Fits the growth of the sampled metrics, ignoring the warm-up part of the run.
+
+    :param samples: Samples taken by soak().
+    :param warmup: Fraction of the samples to ignore at the start (caches, JIT-like warm-up, allocator).
+    :param rss_limit: RSS growth (MB/hour) above which a trend is flagged.
+    :param traced_limit: Python heap (tracemalloc) growth (MB/hour) above which a trend is flagged.
+    :param frame_limit: Drift of the p95 frame time (ms/hour) above which a trend is flagged.
+    :return: Trends per hour and the list of flags.
+    """
+    steady = samples[int(len(samples) * warmup):]
+    times = [sample["t"] for sample in steady]
+    trends = {"rss_mb_per_hour": trend(times, [sample["rss_mb"] for sample in steady]),
+              "frame_p95_ms_per_hour": trend(times, [sample["frame_ms"]["p95"] for sample in steady])}
+    limits = {"rss_mb_per_hour": rss_limit, "frame_p95_ms_per_hour": frame_limit}
+    if steady and "traced_mb" in steady[0]:
+        trends["traced_mb_per_hour"] = trend(times, [sample["traced_mb"] for sample in steady])
+        limits["traced_mb_per_hour"] = traced_limit
+
+    flags = [f"{name} = {value:.2f} (limit {limits[name]})" for name, value in trends.items() if value > limits[name]]
+    return {"trends": trends, "flags": flags}
+
+def frames_from_clip(theremin):
+    """
+    Endless generator of (width, height, hands) from the Theremin's camera, rewinding the clip at its end.
+    """
+    while True:
+        success, frame = theremin.camera.read()
+        if not success:
+            theremin.camera.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            success, frame = theremin.camera.read()
+            if not success:
+                raise RuntimeError(f"Cannot read frames from {theremin.camera.source}")
+        hands, _ = theremin.detect(frame, draw=False)
+        height, width = frame.shape[:2]
+        yield width, height, hands
+
+def frames_from_trace(records):
+    """
+    Endless generator of (width, height, hands) looping over the records of a landmark trace.
+    """
+    if not records:
+        raise ValueError("The landmark trace is empty")
+    while True:
+        for record in records:
+            yield record["width"], record["height"], record["hands"]
+
+def soak(duration, clip=None, trace=None, interval=60.0, fps=None, mapper="crisp", audio=False,
+         trace_malloc=True, top=10) -> dict:
+    """
+    Runs the theremin for the given time and samples its resource usage.
+
+    :param duration: Length of the run in seconds.
+    :param clip: Video to loop through the detector (slower, includes mediapipe and OpenCV).
+    :param trace: Landmark trace to replay through the mappers and the audio controls.
+    :param interval: Seconds between samples.
+    :param fps: Pace the frames at this rate (default is as fast as possible).
+    :param mapper: Tone mapping method: 'crisp', 'fuzzy' or 'depth'.
+    :param audio: Play through the sound card instead of an offline (not running) pyo server.
+    :param trace_malloc: Track the Python allocations with tracemalloc (slows the loop down).
+    :param top: Number of top allocators reported in every sample.
+    :return: Report with the samples and the analysis of their trends.
+    """
+    if (clip is None) == (trace is None):
+        raise ValueError("Give either a clip or a landmark trace to replay")
+
+    theremin = Theremin(use_fuzzy=(mapper == "fuzzy"), use_depth=(mapper == "depth"),
+                        camera_id=clip, offline=not audio, verbose=False)
+    frames = frames_from_clip(theremin) if clip is not None else frames_from_trace(load_trace(trace))
+
+    if trace_malloc:
+        tracemalloc.start()
+        baseline = tracemalloc.take_snapshot()
+
+    samples = []
+    # Preallocated ring with the frame times of the current interval (the most recent ones if it fills
+    # up), so the measurement itself does not allocate per frame
+    frame_times = np.empty(100000)
+    window_count = 0
+    frame_count = 0
+    start = last_sample = time.perf_counter()
+    if audio:
+        theremin.audio.start()
+    try:
+        while True:
+            frame_start = time.perf_counter()
+            width, height, hands = next(frames)
+            new_frequency, new_volume = theremin.map_hands(hands, width, height)
+            if new_frequency is not None:
+                theremin.audio.update_frequency(new_frequency)
+            theremin.audio.update_volume(new_volume * 100)
+            now = time.perf_counter()
+            frame_times[window_count % len(frame_times)] = now - frame_start
+            window_count += 1
+            frame_count += 1
+
+            if now - last_sample >= interval or now - start >= duration:
+                times = frame_times[:min(window_count, len(frame_times))] * 1000
+                sample = {"t": now - start, "frames": frame_count, "rss_mb": rss_mb(),
+                          "frame_ms": {"p50": float(np.percentile(times, 50)),
+                                       "p95": float(np.percentile(times, 95)),
+                                       "p99": float(np.percentile(times, 99)),
+                                       "max": float(times.max())}}
+                if trace_malloc:
+                    current, peak = tracemalloc.get_traced_memory()
+                    sample["traced_mb"] = current / 2**20
+                    sample["top_allocators"] = [
+                        {"where": str(stat.traceback[0]), "size_kb": stat.size / 1024, "growth_kb": stat.size_diff / 1024}
+                        for stat in tracemalloc.take_snapshot().compare_to(baseline, "lineno")[:top]]
+                samples.append(sample)
+                print(f"[{sample['t'] / 60:7.1f} min] {frame_count} frames, RSS {sample['rss_mb']:.1f} MB, "
+                      f"frame p95 {sample['frame_ms']['p95']:.2f} ms")
+                window_count = 0
+                last_sample = now
+                if now - start >= duration:
+                    break
+
+            if fps:
+                delay = frame_start + 1 / fps - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+    finally:
+        if trace_malloc:
+            tracemalloc.stop()
+        theremin.stop()
+
+    report = {"source": clip or trace, "mapper": mapper, "duration": duration, "interval": interval,
+              "samples": samples}
+    report.update(analyze(samples))
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Soak test the theremin and report resource usage trends.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--clip", help="Video to loop through the hand detector")
+    source.add_argument("--trace", help="Landmark trace (.landmarks.jsonl) to replay")
+    parser.add_argument("--hours", type=float, default=1.0, help="Length of the run (default: 1 hour)")
+    parser.add_argument("--interval", type=float, default=60.0, help="Seconds between samples (default: 60)")
+    parser.add_argument("--fps", type=float, default=None, help="Pace the frames (default: as fast as possible)")
+    parser.add_argument("--mapper", choices=MAPPERS, default="crisp")
+    parser.add_argument("--audio", action="store_true", help="Play through the sound card")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Do not track the Python allocations")
+    parser.add_argument("--report", default="soak.json", help="Path of the JSON report (default: soak.json)")
+    args = parser.parse_args(argv)
+
+    report = soak(args.hours * 3600, clip=args.clip, trace=args.trace, interval=args.interval, fps=args.fps,
+                  mapper=args.mapper, audio=args.audio, trace_malloc=not args.no_tracemalloc)
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, value in report["trends"].items():
+        print(f"{name}: {value:.3f}")
+    if report["flags"]:
+        print("Growth trends found:\n  " + "\n  ".join(report["flags"]))
+    else:
+        print("No growth trends found.")
+    return report
+
+if __name__ == "__main__":
+    main()
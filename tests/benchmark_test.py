@@ -0,0 +1,105 @@
+# Microbenchmarks of the tone mapping functions, on synthetic hands (no camera or speakers needed).
+# The mean time per call is compared with the baseline stored in tests/benchmarks/baselines.json.
+# The baselines depend on the machine, so the benchmarks only run when asked for:
+#   pytest tests/benchmark_test.py --benchmark                          # fail if a function got too much slower
+#   pytest tests/benchmark_test.py --benchmark --benchmark-threshold 0.5 # allow at most a 50% slowdown
+#   pytest tests/benchmark_test.py --benchmark-save                     # store the results as the new baselines
+
+import sys
+import os
+import json
+import time
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT) # to include ../theremin and ../modules
+from theremin import Theremin
+from modules.DepthThereminModule import DepthTheremin
+from modules.HandTrackingModule import HandDetector
+from modules.GestureFeaturesModule import handFeatures
+from helpers import synthetic_hand
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "baselines.json")
+WIDTH, HEIGHT = 640, 480
+
+def measure(function, hands, repeats=5, min_time=0.05):
+    """
+    :return: Mean time per call in microseconds (best of several repeats, to filter out noise).
+    """
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_time / 10: # calibrate the number of calls per repeat
+        function(hands[calls % len(hands)])
+        calls += 1
+    number = max(1, int(calls / (time.perf_counter() - start) * min_time))
+
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for i in range(number):
+            function(hands[i % len(hands)])
+        best = min(best, (time.perf_counter() - start) / number)
+    return best * 1e6
+
+@pytest.fixture(scope="module")
+def hands():
+    rng = np.random.default_rng(0)
+    return [synthetic_hand(rng, "Right" if i % 2 else "Left") for i in range(64)]
+
+@pytest.fixture(scope="module")
+def theremin():
+    theremin = Theremin(use_fuzzy=True, camera_id=None, offline=True, verbose=False)
+    yield theremin
+    theremin.stop()
+
+@pytest.fixture(scope="module")
+def depth():
+    return DepthTheremin()
+
+@pytest.fixture(scope="module")
+def detector():
+    return HandDetector()
+
+@pytest.fixture(scope="module")
+def baselines(request):
+    """Stored baselines and the results of this run, saved at the end with --benchmark-save."""
+    stored = {}
+    if os.path.exists(BASELINES):
+        with open(BASELINES) as f:
+            stored = json.load(f)
+    results = {}
+    yield stored, results
+    if request.config.getoption("--benchmark-save") and results:
+        stored.update(results)
+        os.makedirs(os.path.dirname(BASELINES), exist_ok=True)
+        with open(BASELINES, "w") as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+
+BENCHMARKS = {
+    "compute_tone_crisp": lambda ctx, hand: ctx["theremin"].compute_tone_crisp(WIDTH, HEIGHT, hand),
+    "compute_tone_fuzzy": lambda ctx, hand: ctx["theremin"].compute_tone_fuzzy(WIDTH, HEIGHT, hand),
+    "compute_volume": lambda ctx, hand: ctx["theremin"].compute_volume(HEIGHT, hand),
+    "compute_tone_depth": lambda ctx, hand: ctx["depth"].compute_tone_depth(hand["bbox"]),
+    "fingersUp": lambda ctx, hand: ctx["detector"].fingersUp(hand),
+    "handFeatures": lambda ctx, hand: handFeatures(hand),
+    "findDistance": lambda ctx, hand: ctx["detector"].findDistance(hand["lmList"][4][0:2], hand["lmList"][8][0:2]),
+}
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("name", list(BENCHMARKS))
+def test_benchmark(name, request, hands, theremin, depth, detector, baselines):
+    """Test if a tone mapping function is not slower than its baseline (beyond the threshold)."""
+    stored, results = baselines
+    context = {"theremin": theremin, "depth": depth, "detector": detector}
+    elapsed = measure(lambda hand: BENCHMARKS[name](context, hand), hands)
+    results[name] = elapsed
+
+    if request.config.getoption("--benchmark-save"):
+        return
+    if name not in stored:
+        pytest.skip(f"No baseline for {name} ({elapsed:.2f} us/call), store one with --benchmark-save")
+    threshold = request.config.getoption("--benchmark-threshold")
+    limit = stored[name] * (1 + threshold)
+    assert elapsed <= limit, f"{name}: {elapsed:.2f} us/call, baseline {stored[name]:.2f} us/call (limit {limit:.2f})"
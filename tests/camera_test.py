@@ -2,10 +2,16 @@
 
 import sys
 import os
+import threading
+import time
+import uuid
+
+import cv2
+import numpy as np
 import pytest
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))+'/modules') # to include ../modules/CameraModule
-from CameraModule import Camera
+from CameraModule import Camera, SharedMemoryFrameRing
 
 # Fixture to read the camera index from pytest options
 @pytest.fixture
@@ -42,4 +48,125 @@ def test_camera_release(camera_source):
     """Test if the camera releases correctly."""
     camera = Camera(camera_source)
     camera.release()
-    assert not camera.cap.isOpened(), "Failed to release the camera"
\ No newline at end of file
+    assert not camera.cap.isOpened(), "Failed to release the camera"
+
+# Tests with a synthetic video file, they do not need a camera
+@pytest.fixture
+def video_file(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 20, (160, 120))
+    for i in range(10):
+        writer.write(np.full((120, 160, 3), 20 * i, dtype=np.uint8))
+    writer.release()
+    return path
+
+def test_camera_file_settings(video_file):
+    """Test if the settings of a video file are read back."""
+    camera = Camera(video_file)
+    assert camera.settings["width"] == 160 and camera.settings["height"] == 120
+    assert camera.settings["fps"] == pytest.approx(20)
+    camera.release()
+
+def test_camera_file_settings_not_verified(video_file, capsys):
+    """Test if the requested settings are only checked against camera devices."""
+    camera = Camera(video_file, fps=60, buffer_size=1)
+    assert capsys.readouterr().out == ""
+    camera.release()
+
+def test_camera_file_realtime_pacing(video_file):
+    """Test if a video file is delivered at its frame rate in realtime mode and as fast as possible otherwise."""
+    for realtime in (True, False):
+        camera = Camera(video_file, realtime=realtime)
+        start = time.perf_counter()
+        while camera.read()[0]:
+            pass
+        elapsed = time.perf_counter() - start
+        camera.release()
+        if realtime:
+            assert elapsed >= 9 / 20, "Frames were delivered faster than the file's frame rate"
+        else:
+            assert elapsed < 9 / 20, "Frames were paced without realtime mode"
+
+# Tests with raw frame sources (pipes and shared memory), they do not need a camera
+def raw_frames(count, width=32, height=24):
+    return [np.full((height, width, 3), 10 * i, dtype=np.uint8) for i in range(count)]
+
+def test_camera_pipe_file(tmp_path):
+    """Test if raw BGR frames are read from a file as views over reused buffers."""
+    path = tmp_path / "frames.raw"
+    path.write_bytes(b"".join(frame.tobytes() for frame in raw_frames(4)))
+    camera = Camera(f"pipe:{path}", width=32, height=24)
+    assert camera.settings["width"] == 32 and camera.settings["height"] == 24
+    values = []
+    while True:
+        success, frame = camera.read()
+        if not success:
+            break
+        assert frame.shape == (24, 32, 3) and not frame.flags.owndata # no copy of the buffer
+        values.append(int(frame[0, 0, 0]))
+    assert values == [0, 10, 20, 30]
+    assert not camera.is_device # the end of the stream is final, it is not reconnected
+    camera.release()
+
+def test_camera_pipe_needs_geometry(tmp_path):
+    """Test if a pipe source without the frame size is rejected."""
+    with pytest.raises(ValueError):
+        Camera(f"pipe:{tmp_path / 'frames.raw'}")
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="Named pipes are not available")
+def test_camera_named_pipe(tmp_path):
+    """Test if frames written by another thread to a named pipe are read whole."""
+    path = str(tmp_path / "frames.fifo")
+    os.mkfifo(path)
+    frames = raw_frames(5)
+
+    def producer():
+        with open(path, "wb") as pipe:
+            for frame in frames:
+                data = frame.tobytes()
+                pipe.write(data[:1000]) # split frames, as a pipe may deliver them
+                pipe.flush()
+                pipe.write(data[1000:])
+
+    writer = threading.Thread(target=producer)
+    writer.start()
+    camera = Camera(f"pipe:{path}", width=32, height=24)
+    read = []
+    while True:
+        success, frame = camera.read()
+        if not success:
+            break
+        read.append(frame.copy())
+    writer.join()
+    camera.release()
+    assert len(read) == len(frames) and all(np.array_equal(a, b) for a, b in zip(read, frames))
+
+def test_camera_shared_memory():
+    """Test if the latest frame of a shared memory ring is read, and only once."""
+    ring = SharedMemoryFrameRing(f"theremin_{uuid.uuid4().hex[:8]}", width=32, height=24, slots=3, create=True)
+    try:
+        camera = Camera(f"shm:{ring.shm.name}")
+        assert camera.settings["width"] == 32 and camera.settings["height"] == 24
+        camera.cap.timeout = 0.05
+        assert not camera.read()[0] # nothing written yet
+        for frame in raw_frames(2):
+            ring.write(frame)
+        success, frame = camera.read()
+        assert success and int(frame[0, 0, 0]) == 10 # the latest frame
+        assert not camera.read()[0] # no new frame
+        del frame
+        camera.release()
+    finally:
+        ring.close()
+
+def test_camera_reopen(video_file):
+    """Test if a source is opened again with the same settings."""
+    camera = Camera(video_file)
+    for _ in range(3):
+        camera.read()
+    assert not camera.is_device
+    camera.reopen()
+    assert camera.frame_index == 0 and camera.cap.isOpened()
+    success, frame = camera.read()
+    assert success and frame.shape == (120, 160, 3) and int(frame.mean()) < 10 # first frame again
+    camera.release()
@@ -0,0 +1,120 @@
+import sys
+import os
+import json
+import wave
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # to include ../theremin and ../modules
+from theremin import Theremin, MAPPERS
+from modules.RecorderModule import SessionRecorder
+from helpers import MarkerDetector, square_frame, still_hand
+
+def comparing_theremin(**kwargs):
+    theremin = Theremin(camera_id=None, offline=True, verbose=False, compare=MAPPERS, **kwargs)
+    theremin.hd = MarkerDetector()
+    return theremin
+
+def test_one_detection_feeds_every_mapper():
+    """Test if every mapper maps the hands of each frame, with its cost, and each one drives its own channel."""
+    theremin = comparing_theremin()
+    try:
+        assert theremin.mapper == "crisp" and set(theremin.voices) == {"fuzzy", "depth"}
+        assert [voice.channel for voice in theremin.voices.values()] == [1, 2]
+        for side in (40, 80, 120):
+            result = theremin.process_frame(square_frame(side), draw=False)
+            assert set(result["mappers"]) == set(MAPPERS)
+            assert all(value["frequency"] > 0 and value["ms"] >= 0 for value in result["mappers"].values())
+            assert result["frequency"] == result["mappers"]["crisp"]["frequency"]
+            theremin.apply(result)
+            for name, voice in theremin.voices.items():
+                assert voice.frequency == pytest.approx(result["mappers"][name]["frequency"])
+                assert voice.volume == pytest.approx(result["volume"])
+        report = theremin.mapper_report()
+        assert all(report[name]["frames"] == 3 and report[name]["max_ms"] >= report[name]["mean_ms"] >= 0
+                   for name in MAPPERS)
+        # The fuzzy inference costs far more than the crisp formula
+        assert report["fuzzy"]["mean_ms"] > report["crisp"]["mean_ms"]
+    finally:
+        theremin.stop()
+
+def test_frames_without_right_hand():
+    """Test if the mappers keep their frequency without a right hand and mute without hands."""
+    theremin = comparing_theremin()
+    try:
+        result = theremin.process_frame(np.zeros((240, 320, 3), dtype=np.uint8), draw=False)
+        assert all(value == {"frequency": 0, "ms": 0.0} for value in result["mappers"].values())
+        hands = [still_hand((0, 24))]
+        theremin.map_hands(hands, 320, 240)
+        assert all(value["frequency"] is None for value in theremin.comparison.values())
+        assert theremin.mapper_report()["crisp"]["frames"] == 0
+    finally:
+        theremin.stop()
+
+def test_controls_output(tmp_path):
+    """Test if the compared mappers are archived as a control stream when they have no channel."""
+    theremin = comparing_theremin(compare_output="controls")
+    try:
+        assert theremin.voices == {} and theremin.audio.server.getNchnls() == 1
+        theremin.recorder = SessionRecorder(str(tmp_path / "session.landmarks.jsonl"))
+        theremin.record_start = 0
+        for side in (40, 120):
+            theremin.apply(theremin.process_frame(square_frame(side), draw=False))
+        theremin.stop_recording()
+        with open(tmp_path / "session.landmarks.jsonl") as f:
+            records = [json.loads(line) for line in f]
+        assert len(records) == 2
+        assert all(set(record["mappers"]) == set(MAPPERS) for record in records)
+        assert records[1]["mappers"]["depth"]["frequency"] > records[0]["mappers"]["depth"]["frequency"]
+    finally:
+        theremin.stop()
+
+def test_voices_follow_the_control_delay():
+    """Test if the voices of the compared mappers are played out with the same delay as the main one."""
+    theremin = comparing_theremin(control_delay=0.1)
+    try:
+        assert set(theremin.voice_schedulers) == {"fuzzy", "depth"}
+        theremin.apply(theremin.process_frame(square_frame(40), timestamp=1.0, draw=False))
+        result = theremin.process_frame(square_frame(120), timestamp=1.05, draw=False)
+        theremin.apply(result)
+        schedulers = [theremin.scheduler, *theremin.voice_schedulers.values()]
+        for scheduler in schedulers:
+            scheduler.on_buffer(now=1.14)
+        # Still gliding from the first frame
+        assert all(voice.frequency != pytest.approx(result["mappers"][name]["frequency"])
+                   for name, voice in theremin.voices.items())
+        for scheduler in schedulers:
+            scheduler.on_buffer(now=1.15)
+        assert theremin.audio.frequency == pytest.approx(result["frequency"])
+        for name, voice in theremin.voices.items():
+            assert voice.frequency == pytest.approx(result["mappers"][name]["frequency"])
+            assert voice.volume == pytest.approx(result["volume"])
+    finally:
+        theremin.stop()
+
+def test_invalid_comparisons():
+    with pytest.raises(ValueError):
+        Theremin(camera_id=None, offline=True, verbose=False, compare=("crisp", "spline"))
+    with pytest.raises(ValueError):
+        Theremin(camera_id=None, offline=True, verbose=False, compare=("crisp", "crisp"))
+    with pytest.raises(ValueError):
+        Theremin(camera_id=None, offline=True, verbose=False, compare=MAPPERS, compare_output="speakers")
+
+def test_voices_render_on_their_channels(tmp_path):
+    """Test if an offline render writes each mapper's voice to its own channel."""
+    theremin = comparing_theremin()
+    try:
+        theremin.voices["depth"].update_frequency(880)
+        theremin.voices["depth"].update_volume(30)
+        path = str(tmp_path / "compare.wav")
+        theremin.audio.render(path, [(0, 440, 0.5), (0.2, 440, 0.5)])
+        with wave.open(path) as wav:
+            assert wav.getnchannels() == 3
+            samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2").reshape(-1, 3)
+        peaks = np.abs(samples).max(axis=0) / 32767
+        assert peaks[0] == pytest.approx(0.5, abs=0.02)
+        assert peaks[1] == pytest.approx(0.0, abs=0.02) # the fuzzy voice is still silent
+        assert peaks[2] == pytest.approx(0.3, abs=0.02)
+    finally:
+        theremin.stop()
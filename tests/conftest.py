@@ -2,7 +2,7 @@
 import pytest
 
 def pytest_addoption(parser):
-    """Add a command-line option for the camera."""
+    """Add the command-line options for the camera and the microbenchmarks."""
     parser.addoption(
         "--camera", 
         action="store", 
@@ -10,3 +10,34 @@ def pytest_addoption(parser):
         default=0, 
         help="Camera index or video path for the tests (default: 0)"
     )
+    parser.addoption(
+        "--benchmark",
+        action="store_true",
+        default=False,
+        help="Run the microbenchmarks against the stored baselines (machine dependent, skipped by default)"
+    )
+    parser.addoption(
+        "--benchmark-save",
+        action="store_true",
+        default=False,
+        help="Store the microbenchmark results as the new baselines instead of comparing against them"
+    )
+    parser.addoption(
+        "--benchmark-threshold",
+        action="store",
+        type=float,
+        default=1.0,
+        help="Allowed slowdown over the baseline before a microbenchmark fails (default: 1.0, i.e. 2x slower)"
+    )
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: microbenchmark against the stored baselines (run with --benchmark)")
+
+def pytest_collection_modifyitems(config, items):
+    """Skip the microbenchmarks unless --benchmark or --benchmark-save is given."""
+    if config.getoption("--benchmark") or config.getoption("--benchmark-save"):
+        return
+    skip = pytest.mark.skip(reason="microbenchmark, run with --benchmark")
+    for item in items:
+        if item.get_closest_marker("benchmark"):
+            item.add_marker(skip)
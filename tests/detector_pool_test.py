@@ -0,0 +1,67 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # to include ../modules
+from modules.DetectorPoolModule import HandDetectorPool, ReorderBuffer
+
+def test_reorder_buffer():
+    """Test if results arriving out of order are released in sequence order."""
+    buffer = ReorderBuffer()
+    buffer.push(1, "b", arrival=0.0)
+    buffer.push(2, "c", arrival=0.0)
+    assert buffer.pop(now=1.0) == [] # waiting for 0
+    buffer.push(0, "a", arrival=1.0)
+    assert buffer.pop(now=1.5) == [(0, "a"), (1, "b"), (2, "c")]
+    assert list(buffer.delays) == [0.5, 1.5, 1.5]
+    buffer.push(3, "d")
+    assert buffer.pop() == [(3, "d")]
+
+@pytest.fixture
+def pool():
+    pool = HandDetectorPool(workers=2, modelComplexity=0)
+    yield pool
+    pool.close()
+
+def test_pool_delivers_in_order(pool):
+    """Test if the frames spread over the workers come back in capture order."""
+    img = np.zeros((120, 160, 3), dtype=np.uint8)
+    for _ in range(6):
+        pool.submit(img, (160, 120))
+
+    delivered = []
+    while len(delivered) < 6:
+        delivered += pool.collect(block=True, timeout=30)
+    assert [seq for seq, _ in delivered] == list(range(6))
+    assert all(hands == [] for _, hands in delivered)
+
+    metrics = pool.metrics()
+    assert metrics["delivered"] == 6 and metrics["throughput"] > 0
+
+def test_pool_find_hands_contract(pool):
+    """Test if the pool can replace HandDetector.findHands and bounds the frames in flight."""
+    img = np.zeros((120, 160, 3), dtype=np.uint8)
+    for _ in range(10):
+        hands, out = pool.findHands(img)
+        assert hands == [] and out is img
+        assert pool.inFlight() <= pool.maxInFlight
+
+def test_pool_failed_frame(pool):
+    """Test if a frame the worker cannot process is delivered without hands instead of going missing."""
+    pool.submit(np.zeros((120, 160), dtype=np.float32), (160, 120)) # not an RGB image
+    pool.submit(np.zeros((120, 160, 3), dtype=np.uint8), (160, 120))
+    delivered = []
+    while len(delivered) < 2:
+        delivered += pool.collect(block=True, timeout=30)
+    assert delivered == [(0, []), (1, [])]
+
+def test_pool_dead_worker(pool):
+    """Test if findHands raises instead of waiting forever when one worker dies."""
+    img = np.zeros((120, 160, 3), dtype=np.uint8)
+    pool.processes[1].terminate()
+    pool.processes[1].join(timeout=5)
+    with pytest.raises(RuntimeError, match=r"\[1\]"):
+        for _ in range(2 * pool.maxInFlight):
+            pool.findHands(img)
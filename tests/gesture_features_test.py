@@ -0,0 +1,90 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # to include ../theremin and ../modules
+from modules.GestureFeaturesModule import handFeatures, handOpenness
+from modules.HandTrackingModule import fingersUp
+from modules.AudioModule import Audio
+from modules.AudioAnalysisModule import read_wav
+from theremin import Theremin
+from helpers import synthetic_hand, upright_hand
+
+def reference_openness(lmList):
+    """Openness as computed by the mappers before the features module."""
+    points = [lmList[i][0:2] for i in [4, 8, 12, 16, 20]]
+    distances = [np.sqrt((points[i + 1][0] - points[i][0])**2 + (points[i + 1][1] - points[i][1])**2) for i in range(4)]
+    return np.exp(np.mean(np.log(distances)))
+
+def test_features_match_previous_computations():
+    """Test if the vectorized features match fingersUp and the mappers' openness."""
+    rng = np.random.default_rng(1)
+    for i in range(50):
+        hand = synthetic_hand(rng, "Right" if i % 2 else "Left")
+        features = handFeatures(hand)
+        assert list(features["fingers"]) == fingersUp(hand)
+        assert features["openness"] == pytest.approx(reference_openness(hand["lmList"]))
+        assert handOpenness(hand["lmList"]) == pytest.approx(features["openness"])
+        thumb, index = np.array(hand["lmList"][4][:2]), np.array(hand["lmList"][8][:2])
+        assert features["pinch"][0] == pytest.approx(np.linalg.norm(index - thumb))
+
+def test_orientation():
+    """Test if the roll follows the tilt of the hand and the palm normal faces the camera."""
+    for tilt in (-40, 0, 30):
+        features = handFeatures(upright_hand(tilt=tilt))
+        assert features["roll"] == pytest.approx(tilt, abs=1.0)
+        assert abs(features["palmNormal"][2]) == pytest.approx(1.0)
+    assert list(handFeatures(upright_hand())["fingers"]) == [1, 1, 1, 1, 1]
+
+def test_theremin_modulation(tmp_path):
+    """Test if an expressive theremin maps the features to the modulation targets and renders them."""
+    theremin = Theremin(camera_id=None, offline=True, verbose=False, expressive=True)
+    try:
+        hands = [upright_hand("Right"), upright_hand("Left", tilt=-60)]
+        frequency, volume = theremin.map_hands(hands, 640, 480)
+        assert frequency is not None and set(theremin.features) == {"hands", "Right", "Left"}
+        modulation = theremin.map_modulation(frequency)
+        assert modulation["blend"] == 1.0                           # open hand, saw
+        assert modulation["cutoff"] == pytest.approx(8000)          # palm facing the camera
+        assert modulation["vibrato_rate"] == pytest.approx(8, abs=0.1)
+        assert 0 < modulation["vibrato_depth"] <= 0.03 * frequency
+        assert theremin.detect_gesture(hands) is None # no sampler
+
+        theremin.audio.update_modulation(**modulation)
+        assert theremin.audio.filter.freq == pytest.approx(8000)
+        assert theremin.audio.pitch.value == theremin.audio.frequency
+        wav_path = str(tmp_path / "expressive.wav")
+        theremin.audio.render(wav_path, [(0, frequency, volume, modulation), (0.5, frequency, volume, {"blend": 0})])
+        assert os.path.getsize(wav_path) > 44100 * 2 * 0.4
+    finally:
+        theremin.stop()
+
+def test_plain_audio_has_no_modulation():
+    """Test if the modulation targets require an expressive Audio."""
+    audio = Audio(offline=True)
+    try:
+        with pytest.raises(RuntimeError):
+            audio.update_modulation(blend=0.5)
+    finally:
+        audio.stop()
+
+def test_vibrato_keeps_partials_harmonic(tmp_path):
+    """Test if the vibrato moves the pitch of the saw, so its second harmonic stays at twice the fundamental."""
+    audio = Audio(initial_frequency=400, initial_volume=0.5, offline=True, expressive=True)
+    try:
+        audio.update_modulation(vibrato_depth=80, vibrato_rate=0.5, blend=1)
+        path = str(tmp_path / "vibrato.wav")
+        audio.render(path, [(0, 400, 0.5), (1.0, 400, 0.5)])
+        samples, rate = read_wav(path)
+    finally:
+        audio.stop()
+    # Around the top of the LFO (0.5 s) the pitch is close to 480 Hz
+    window = samples[int(0.4 * rate):int(0.6 * rate)] * np.hanning(int(0.2 * rate))
+    spectrum = np.abs(np.fft.rfft(window, 8 * len(window)))
+    frequencies = np.fft.rfftfreq(8 * len(window), 1 / rate)
+    fundamental = frequencies[np.argmax(spectrum * (frequencies < 700))]
+    harmonic = frequencies[np.argmax(spectrum * (frequencies > 700) * (frequencies < 1300))]
+    assert fundamental == pytest.approx(480, abs=10)
+    assert harmonic == pytest.approx(2 * fundamental, abs=10) # a frequency shift would leave it at 2 * 400 + 80
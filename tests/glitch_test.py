@@ -0,0 +1,80 @@
+import sys
+import os
+import wave
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # to include ../modules
+from modules.AudioModule import Audio
+from modules.AudioAnalysisModule import (discontinuities, silent_gaps, frequency_jumps, frequency_track,
+                                         glitch_report, main, moving_average)
+
+SR = 44100
+
+def write_wav(path, samples):
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SR)
+        wav.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+
+def tone(segments):
+    """Phase-continuous sine from a list of (duration, frequency, amplitude)."""
+    frequencies = np.concatenate([np.full(int(d * SR), f) for d, f, _ in segments])
+    amplitudes = np.concatenate([np.full(int(d * SR), a) for d, _, a in segments])
+    return amplitudes * np.sin(2 * np.pi * np.cumsum(frequencies) / SR)
+
+def test_moving_average():
+    """Test if the cumulative sum moving average matches the direct convolution."""
+    values = np.random.default_rng(0).random(5000)
+    for length in (1, 440, 441):
+        expected = np.convolve(values, np.ones(length) / length, mode="same")
+        assert np.allclose(moving_average(values, length), expected, atol=1e-12)
+
+def test_clean_tone():
+    """Test if a steady tone has no glitches."""
+    samples = tone([(1.0, 440, 0.5)])
+    assert discontinuities(samples, SR) == []
+    assert silent_gaps(samples, SR) == []
+    assert frequency_jumps(*frequency_track(samples, SR)) == []
+
+def test_injected_glitches():
+    """Test if a click, a dropout and a pitch jump are found at their times."""
+    samples = tone([(0.5, 440, 0.5), (0.5, 660, 0.5)])
+    samples[int(0.2 * SR)] += 0.3             # click
+    samples[int(0.7 * SR):int(0.75 * SR)] = 0 # 50 ms dropout
+
+    clicks = discontinuities(samples, SR)
+    # the click, and the hard cuts at both ends of the dropout
+    assert [t for t, _ in clicks] == pytest.approx([0.2, 0.7, 0.75], abs=1e-3)
+    gaps = silent_gaps(samples, SR)
+    assert len(gaps) == 1 and gaps[0][0] == pytest.approx(0.7, abs=0.01) and gaps[0][1] == pytest.approx(0.75, abs=0.01)
+    jumps = frequency_jumps(*frequency_track(samples, SR))
+    assert len(jumps) == 1 and jumps[0][0] == pytest.approx(0.5, abs=0.005)
+    assert jumps[0][1] == pytest.approx(440, rel=0.01) and jumps[0][2] == pytest.approx(660, rel=0.01)
+
+def test_report_lines_up_with_controls(tmp_path):
+    """Test if a volume step rendered by Audio is found as a click at its control update."""
+    records = [{"t": 0.0, "frequency": 440.0, "volume": 0.2},
+               {"t": 0.5, "frequency": 440.0, "volume": 0.8},
+               {"t": 0.8, "frequency": 440.0, "volume": 0.0}]
+    wav_path = str(tmp_path / "session.wav")
+    audio = Audio(offline=True)
+    try:
+        audio.render(wav_path, [(r["t"], r["frequency"], r["volume"]) for r in records], duration=1.0)
+    finally:
+        audio.stop()
+
+    report = glitch_report(wav_path, records)
+    assert report["control_updates"] == 3
+    assert report["summary"]["clicks"] >= 1
+    assert report["summary"]["clicks"] == report["summary"]["clicks_at_updates"] # zipper noise of the updates
+    assert report["summary"]["gaps"] == 1 and report["summary"]["unmuted_gaps"] == 0 # muted by the controls
+
+    write_wav(str(tmp_path / "dropout.wav"), tone([(0.3, 440, 0.5), (0.05, 440, 0.0), (0.3, 440, 0.5)]))
+    reports = main([str(tmp_path / "dropout.wav"), "--report", str(tmp_path / "report.json")])
+    assert reports[0]["summary"]["unmuted_gaps"] == 1
+    assert os.path.exists(tmp_path / "report.json")
+    with pytest.raises(SystemExit):
+        main([str(tmp_path / "dropout.wav"), "--fail"])
@@ -0,0 +1,122 @@
+import sys
+import os
+import threading
+import time
+
+import cv2
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # to include ../theremin and ../modules
+from modules.AudioModule import Audio
+from modules.GovernorModule import ResourceGovernor
+from theremin import Theremin
+
+affinity = pytest.mark.skipif(not hasattr(os, "sched_getaffinity") or len(os.sched_getaffinity(0)) < 2,
+                              reason="Needs CPU affinity support and at least two cores")
+
+class FakeServer:
+    def getBufferSize(self):
+        return 256
+
+    def getSamplingRate(self):
+        return 44100
+
+class FakeAudio:
+    """Stands in for Audio: start() creates an audio thread calling the callbacks."""
+
+    def __init__(self):
+        self.server = FakeServer()
+        self.callbacks = []
+        self.running = threading.Event()
+        self.thread = None
+
+    def add_callback(self, function):
+        self.callbacks.append(function)
+
+    def start(self):
+        def loop():
+            while not self.running.is_set():
+                for function in self.callbacks:
+                    function()
+                time.sleep(0.002)
+        self.thread = threading.Thread(target=loop)
+        self.thread.start()
+        time.sleep(0.05)
+
+    def stop(self):
+        self.running.set()
+        self.thread.join()
+
+@pytest.fixture
+def restore_affinity():
+    cores = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else None
+    threads = cv2.getNumThreads()
+    yield
+    if cores is not None:
+        os.sched_setaffinity(0, cores)
+    cv2.setNumThreads(threads)
+
+@affinity
+def test_governor_splits_cores(restore_affinity):
+    """Test if the vision threads and the audio threads end up on disjoint cores."""
+    governor = ResourceGovernor(cv_threads=1)
+    assert governor.vision_cores and governor.audio_cores and not governor.vision_cores & governor.audio_cores
+    assert governor.apply()
+    assert os.sched_getaffinity(0) == governor.vision_cores
+    assert cv2.getNumThreads() == 1
+
+    audio = FakeAudio()
+    governor.start_audio(audio)
+    try:
+        assert governor.audio_threads
+        assert all(os.sched_getaffinity(tid) == governor.audio_cores for tid in governor.audio_threads)
+        assert governor.callbacks > 0
+    finally:
+        audio.stop()
+    assert os.sched_getaffinity(0) == governor.vision_cores # the calling thread is not moved
+
+@pytest.mark.skipif(not hasattr(os, "sched_getaffinity"), reason="Needs CPU affinity support")
+def test_governor_restores_affinity(restore_affinity):
+    """Test if restore() gives the process back its affinity and OpenCV thread count."""
+    cores, threads = os.sched_getaffinity(0), cv2.getNumThreads()
+    governor = ResourceGovernor(vision_cores=[min(cores)], audio_cores=[max(cores)], cv_threads=1)
+    governor.apply()
+    assert os.sched_getaffinity(0) == {min(cores)} and cv2.getNumThreads() == 1
+    governor.restore()
+    assert os.sched_getaffinity(0) == cores and cv2.getNumThreads() == threads
+
+def test_theremin_restores_affinity(restore_affinity):
+    """Test if stopping the theremin undoes the core split of its governor."""
+    cores = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else None
+    threads = cv2.getNumThreads()
+    theremin = Theremin(camera_id=None, offline=True, verbose=False, governor=dict(cv_threads=1))
+    assert cv2.getNumThreads() == 1
+    theremin.stop()
+    assert cv2.getNumThreads() == threads
+    if cores is not None:
+        assert os.sched_getaffinity(0) == cores
+
+def test_governor_counts_xruns():
+    """Test if a late buffer callback is counted as an xrun."""
+    governor = ResourceGovernor(vision_cores=[0], audio_cores=[0])
+    governor.buffer_duration = 0.01
+    for delay in (0.0, 0.01, 0.01, 0.05, 0.01):
+        time.sleep(delay)
+        governor.on_buffer()
+    governor.frame(0.02)
+    report = governor.report()
+    assert report["callbacks"] == 5
+    assert report["xruns"] >= 1
+    assert report["frame_ms"]["max"] == pytest.approx(20)
+
+def test_audio_callbacks(tmp_path):
+    """Test if several buffer callbacks run with the offline rendering."""
+    audio = Audio(offline=True)
+    calls = []
+    audio.add_callback(lambda: calls.append(audio.frequency))
+    try:
+        audio.render(str(tmp_path / "tone.wav"), [(0, 300, 0.5), (0.5, 500, 0.5)])
+    finally:
+        audio.stop()
+    assert len(calls) > 1 and 300 in calls # called for every buffer, next to the controls
+    assert len(audio.callbacks) == 1 # the rendering callback was removed
@@ -0,0 +1,38 @@
+import sys
+import os
+import time
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # to include ../modules
+from modules.HandLandmarkerModule import HandLandmarkerDetector, MODEL_PATH, MODEL_URL
+
+pytestmark = pytest.mark.skipif(not os.path.isfile(MODEL_PATH), reason=f"Download {MODEL_URL} to {MODEL_PATH}")
+
+@pytest.fixture
+def detector():
+    detector = HandLandmarkerDetector()
+    yield detector
+    detector.close()
+
+def test_find_hands_does_not_block(detector):
+    """Test if findHands returns before the inference and the results arrive through the callback."""
+    img = np.zeros((240, 320, 3), dtype=np.uint8)
+    for i in range(5):
+        hands, out = detector.findHands(img, timestampMs=33 * i)
+        assert hands == [] and out is img
+        time.sleep(0.05)
+
+    deadline = time.time() + 5
+    while detector.received == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    metrics = detector.metrics()
+    assert metrics["submitted"] == 5 and metrics["received"] > 0
+
+def test_timestamps_increase(detector):
+    """Test if repeated or decreasing timestamps are made strictly increasing."""
+    img = np.zeros((120, 160, 3), dtype=np.uint8)
+    assert detector.submit(img, 100) == 100
+    assert detector.submit(img, 100) == 101
+    assert detector.submit(img, 50) == 102
@@ -0,0 +1,84 @@
+# Helpers shared by the tests.
+
+import cv2
+import numpy as np
+
+def synthetic_hand(rng, hand_type="Right"):
+    """Builds a hand dictionary like the ones of HandDetector.findHands with random landmarks."""
+    cx, cy = rng.integers(150, 490), rng.integers(150, 330)
+    lmList = [[int(cx + dx), int(cy + dy), int(dz)]
+              for dx, dy, dz in zip(rng.integers(-100, 100, 21), rng.integers(-120, 80, 21), rng.integers(-30, 30, 21))]
+    xs, ys = [lm[0] for lm in lmList], [lm[1] for lm in lmList]
+    bbox = (min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))
+    return {"lmList": lmList, "bbox": bbox, "center": (bbox[0] + bbox[2] // 2, bbox[1] + bbox[3] // 2),
+            "type": hand_type}
+
+def still_hand(center, hand_type="Left"):
+    """Builds a hand with every landmark at the origin: only its center matters (e.g. the volume hand)."""
+    return {"lmList": [[0, 0, 0]] * 21, "bbox": (0, 0, 1, 1), "center": center, "type": hand_type}
+
+def left_hand(fingers):
+    """Left hand with the given number of fingers up (index first, thumb down)."""
+    lmList = [[300, 300, 0] for _ in range(21)]
+    lmList[4] = [310, 300, 0] # thumb tip to the right of its joint: down for a left hand
+    for finger, tip in enumerate([8, 12, 16, 20]):
+        lmList[tip] = [300, 200 if finger < fingers else 400, 0]
+    return {"lmList": lmList, "bbox": (250, 200, 100, 200), "center": (300, 300), "type": "Left"}
+
+def upright_hand(hand_type="Right", tilt=0.0):
+    """Open hand with the palm facing the camera, rotated by tilt degrees (clockwise in the image)."""
+    points = np.array([[0, 0], [-30, -20], [-50, -45], [-65, -65], [-80, -85],   # wrist, thumb
+                       [-25, -90], [-28, -130], [-30, -155], [-32, -175],          # index
+                       [0, -95], [0, -140], [0, -168], [0, -190],                  # middle
+                       [22, -90], [25, -130], [27, -155], [28, -172],              # ring
+                       [40, -78], [48, -108], [52, -128], [55, -145]], dtype=float) # pinky
+    if hand_type == "Right":
+        points[:, 0] *= -1 # thumb on the right side of the image
+    angle = np.radians(tilt)
+    rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+    points = points @ rotation.T + [320, 400]
+    lmList = [[int(x), int(y), 0] for x, y in points]
+    xs, ys = [lm[0] for lm in lmList], [lm[1] for lm in lmList]
+    bbox = (min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))
+    return {"lmList": lmList, "bbox": bbox, "center": (bbox[0] + bbox[2] // 2, bbox[1] + bbox[3] // 2), "type": hand_type}
+
+def square_frame(side, size=(320, 240)):
+    """Black frame with a white square of the given side in the middle (the hand of MarkerDetector)."""
+    frame = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+    x, y = (size[0] - side) // 2, (size[1] - side) // 2
+    frame[y:y + side, x:x + side] = 255
+    return frame
+
+class CountingDetector:
+    """Stand-in for HandDetector that counts the inferences and returns scripted hands."""
+
+    def __init__(self, hands):
+        self.hands = hands
+        self.calls = 0
+
+    def findHands(self, img, draw=True, flipType=True, inferenceImg=None):
+        self.calls += 1
+        return self.hands, img
+
+    def drawHand(self, img, myHand):
+        return img
+
+class MarkerDetector:
+    """
+    Stand-in for HandDetector on synthetic clips: the bright square is reported as the right hand
+    (with its fingertips spread along the top edge) and a fixed left hand keeps the volume up.
+    """
+
+    def findHands(self, img, draw=True, flipType=True, inferenceImg=None):
+        h, w = img.shape[:2]
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        points = cv2.findNonZero((gray > 128).astype(np.uint8))
+        if points is None:
+            return [], img
+        x, y, bw, bh = cv2.boundingRect(points)
+        lmList = [[x + bw * (i % 5) // 4, y + bh * (i // 5) // 4, 0] for i in range(21)]
+        for finger, tip in enumerate([4, 8, 12, 16, 20]):
+            lmList[tip] = [x + bw * finger // 4, y, 0]
+        right = {"lmList": lmList, "bbox": (x, y, bw, bh), "center": (x + bw // 2, y + bh // 2), "type": "Right"}
+        left = still_hand((0, h // 10))
+        return [right, left], img
@@ -0,0 +1,126 @@
+# End-to-end motion-to-sound latency harness
+# Feeds a video with hand-position steps at known timestamps through Camera, a detector and Theremin,
+# renders the controls with an offline audio sink and measures when the pitch change appears in the audio.
+#
+# pytest runs it on a synthetic clip (a bright square whose size steps, tracked by MarkerDetector).
+# To measure the real mediapipe pipeline on a recorded clip:
+#   python3 tests/latency_test.py --clip steps.mp4 --steps steps.json
+# where steps.json is a list of step timestamps in seconds.
+
+import sys
+import os
+import json
+import argparse
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT) # to include ../theremin and ../modules
+from theremin import Theremin
+from modules.AudioAnalysisModule import read_wav, frequency_track, first_settled_time
+from helpers import MarkerDetector
+
+def make_step_clip(path, steps, duration, fps=30, size=(320, 240)):
+    """
+    Writes a synthetic clip with a white square whose side changes at the given steps.
+
+    :param steps: List of (time, side) with the side of the square in pixels from that time on.
+    """
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for index in range(int(round(duration * fps))):
+        t = index / fps
+        side = [s for step_time, s in steps if step_time <= t][-1]
+        frame = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+        x, y = (size[0] - side) // 2, (size[1] - side) // 2
+        frame[y:y + side, x:x + side] = 255
+        writer.write(frame)
+    writer.release()
+
+def measure_latency(clip_path, step_times, output_dir, detector=None, tolerance=0.02):
+    """
+    Runs a clip through Camera, the detector and Theremin, renders it offline and measures the latencies.
+
+    Each control update is applied to the audio at its capture time plus the measured processing time
+    (preprocessing, detection and mapping), so the result includes processing, frame and audio buffer quantization.
+
+    :param step_times: Timestamps (s) at which the hand position changes in the clip.
+    :param detector: Detector to use instead of the Theremin's HandDetector (e.g. MarkerDetector).
+    :return: Dictionary with the per-step latencies (None if a step was not heard) and their distribution.
+    """
+    theremin = Theremin(camera_id=clip_path, initial_volume=0.0, offline=True, verbose=False)
+    if detector is not None:
+        theremin.hd = detector
+    fps = theremin.camera.cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    updates = [] # (apply time, frequency, volume, capture time) per frame
+    frequency = theremin.audio.frequency
+    index = 0
+    try:
+        while True:
+            success, frame = theremin.camera.read()
+            if not success:
+                break
+            capture_time = index / fps
+            result = theremin.process_frame(frame, capture_time, draw=False)
+            processing = result["timings"]["total"] / 1000
+            if result["frequency"] is not None:
+                frequency = float(result["frequency"])
+            updates.append((capture_time + processing, frequency, float(result["volume"]), capture_time))
+            index += 1
+
+        wav_path = os.path.join(output_dir, "latency.wav")
+        # Rendered at the apply times (a fourth item would be read as modulation by render)
+        timeline = sorted((apply_time, f, volume) for apply_time, f, volume, _ in updates)
+        theremin.audio.render(wav_path, timeline, duration=index / fps)
+    finally:
+        theremin.stop()
+
+    samples, sample_rate = read_wav(wav_path)
+    times, frequencies = frequency_track(samples, sample_rate)
+
+    latencies = []
+    for step_time in step_times:
+        # Expected pitch: the control computed for the first frame captured after the step
+        after = [update for update in updates if update[3] >= step_time]
+        if not after:
+            latencies.append(None)
+            continue
+        heard = first_settled_time(times, frequencies, step_time, after[0][1], tolerance)
+        latencies.append(None if heard is None else heard - step_time)
+
+    measured = np.array([latency for latency in latencies if latency is not None])
+    report = {"latencies": latencies, "missed": latencies.count(None)}
+    if len(measured):
+        report.update({"min": float(measured.min()), "median": float(np.median(measured)),
+                       "p95": float(np.percentile(measured, 95)), "max": float(measured.max())})
+    return report
+
+def test_step_latency_synthetic(tmp_path):
+    """Test if every pitch step of a synthetic clip is heard within a few frames."""
+    fps = 30
+    steps = [(0.0, 60), (0.4, 120), (0.8, 80), (1.2, 160), (1.6, 100)]
+    clip = str(tmp_path / "steps.avi")
+    make_step_clip(clip, steps, duration=2.0, fps=fps)
+
+    # The clip starts at frame boundaries, so a step is captured at the first frame at or after it
+    report = measure_latency(clip, [t for t, _ in steps[1:]], str(tmp_path), detector=MarkerDetector())
+
+    assert report["missed"] == 0, f"Some steps were not heard: {report}"
+    assert report["min"] >= 0, "Pitch changed before the hand moved"
+    assert report["max"] < 3 / fps, f"Step-to-sound latency is too high: {report}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the motion-to-sound latency on a recorded clip.")
+    parser.add_argument("--clip", required=True, help="Video with hand-position steps")
+    parser.add_argument("--steps", required=True, help="JSON list with the step timestamps in seconds")
+    parser.add_argument("--output-dir", default=".", help="Where to write the rendered audio")
+    args = parser.parse_args()
+
+    with open(args.steps) as f:
+        step_times = json.load(f)
+    report = measure_latency(args.clip, step_times, args.output_dir)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
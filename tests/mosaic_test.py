@@ -0,0 +1,155 @@
+# Mosaic batching of several cameras into one hand detection call, and its benchmark against one
+# HandDetector per camera (frames per second served on one core for each approach).
+#   python3 tests/mosaic_test.py --sources 0 1 2 3 --seconds 10
+#   python3 tests/mosaic_test.py --sources a.mp4 b.mp4 c.mp4 d.mp4 --tile 320 240
+
+import sys
+import os
+import json
+import time
+import argparse
+
+import cv2
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT) # to include ../modules
+from modules.MosaicModule import MosaicDetector
+from modules.HandTrackingModule import HandDetector
+from modules.CameraModule import Camera
+from modules.GovernorModule import thread_ids, pin
+
+class SquareDetector:
+    """
+    Stand-in for HandDetector: every bright square of the image is reported as a right hand with its
+    landmarks spread over the square.
+    """
+
+    def findHands(self, img, draw=True, flipType=True, inferenceImg=None):
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        count, _, stats, _ = cv2.connectedComponentsWithStats((gray > 128).astype(np.uint8))
+        hands = []
+        for x, y, w, h, _ in stats[1:count]:
+            lmList = [[int(x + w * (i % 5) / 4), int(y + h * (i // 5) / 4), 0] for i in range(21)]
+            hands.append({"lmList": lmList, "bbox": (x, y, w, h), "center": (x + w // 2, y + h // 2), "type": "Right"})
+        return hands, img
+
+def frame_with_square(x, y, side, size=(640, 480)):
+    frame = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+    frame[y:y + side, x:x + side] = 255
+    return frame
+
+def test_hands_back_to_their_cameras():
+    """Test if the hands found in the mosaic are assigned to their tile and rescaled to their camera."""
+    squares = [(100, 80, 120), (400, 300, 80), (20, 20, 200)]
+    frames = [frame_with_square(*square) for square in squares]
+    mosaic = MosaicDetector(4, tileSize=(320, 240), detector=SquareDetector())
+    assert mosaic.mosaic.shape == (2 * 240 + 16, 2 * 320 + 16, 3)
+
+    allHands = mosaic.findHands(frames, draw=False)
+    assert len(allHands) == 3
+    for hands, (x, y, side) in zip(allHands, squares):
+        assert len(hands) == 1
+        bx, by, bw, bh = hands[0]["bbox"]
+        assert (bx, by) == pytest.approx((x, y), abs=3) and (bw, bh) == pytest.approx((side, side), abs=4)
+
+    # A camera missing from the next call leaves its tile empty
+    allHands = mosaic.findHands(frames[:1], draw=False)
+    assert len(allHands) == 1 and len(allHands[0]) == 1
+
+def test_too_many_frames():
+    """Test if more frames than tiles are rejected."""
+    mosaic = MosaicDetector(2, detector=SquareDetector())
+    with pytest.raises(ValueError):
+        mosaic.findHands([frame_with_square(0, 0, 10)] * 3)
+
+def benchmark(frames, seconds=2.0, tileSize=(320, 240), modelComplexity=0, makeDetector=None):
+    """
+    Runs one HandDetector per camera and one MosaicDetector over the same frames for some time each,
+    on one core: the process is pinned to its first allowed core (where the platform supports it,
+    so the mediapipe threads are confined too) and OpenCV uses one thread. Both are restored afterwards.
+
+    :param frames: List of frame sets, one frame per camera in each set.
+    :param makeDetector: Builds the detectors to compare instead of mediapipe HandDetectors (e.g. a stand-in).
+    :return: Frame sets per second, camera frames per second and hands found by each approach.
+    """
+    cameras = len(frames[0])
+    cvThreads = cv2.getNumThreads()
+    affinity = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else None
+    cv2.setNumThreads(1)
+    if affinity is not None:
+        for tid in thread_ids(): # the mediapipe threads created next inherit it
+            pin(tid, {min(affinity)})
+
+    def run(process):
+        count = hands = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            hands += sum(len(cameraHands) for cameraHands in process(frames[count % len(frames)]))
+            count += 1
+        rate = count / (time.perf_counter() - start)
+        return {"sets_per_s": rate, "camera_frames_per_s": rate * cameras, "hands_per_set": hands / count}
+
+    detectors, mosaic = [], None
+    try:
+        if makeDetector is None:
+            makeDetector = lambda maxHands: HandDetector(maxHands=maxHands, modelComplexity=modelComplexity)
+        detectors = [makeDetector(2) for _ in range(cameras)]
+        separate = run(lambda frameSet: [detector.findHands(frame, draw=False)[0]
+                                         for detector, frame in zip(detectors, frameSet)])
+        mosaic = MosaicDetector(cameras, tileSize=tileSize, detector=makeDetector(2 * cameras))
+        tiled = run(lambda frameSet: mosaic.findHands(frameSet, draw=False))
+    finally:
+        for detector in detectors:
+            if hasattr(detector, "close"):
+                detector.close()
+        if mosaic is not None:
+            mosaic.close()
+        cv2.setNumThreads(cvThreads)
+        if affinity is not None:
+            for tid in thread_ids():
+                pin(tid, affinity)
+    return {"cameras": cameras, "tile": list(tileSize), "separate": separate, "mosaic": tiled,
+            "speedup": tiled["sets_per_s"] / separate["sets_per_s"]}
+
+def test_benchmark_runs():
+    """Test if the benchmark runs and restores the global settings (with the stand-in detector, mediapipe is
+    only measured from the command line)."""
+    frames = [[frame_with_square(100 * i, 80, 60) for i in range(4)]]
+    cvThreads = cv2.getNumThreads()
+    affinity = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else None
+    report = benchmark(frames, seconds=0.3, makeDetector=lambda maxHands: SquareDetector())
+    assert cv2.getNumThreads() == cvThreads # the global settings are restored
+    if affinity is not None:
+        assert os.sched_getaffinity(0) == affinity
+    assert report["cameras"] == 4
+    assert report["separate"]["sets_per_s"] > 0 and report["mosaic"]["sets_per_s"] > 0
+    assert report["separate"]["hands_per_set"] == report["mosaic"]["hands_per_set"] == 4
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare one hand detector per camera with a mosaic of the cameras.")
+    parser.add_argument("--sources", nargs="+", required=True, help="Camera indices or video files")
+    parser.add_argument("--frames", type=int, default=60, help="Frame sets read from the sources (default: 60)")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Time per approach (default: 10)")
+    parser.add_argument("--tile", type=int, nargs=2, default=(320, 240), metavar=("WIDTH", "HEIGHT"))
+    parser.add_argument("--model-complexity", type=int, choices=(0, 1), default=0)
+    args = parser.parse_args()
+
+    cameras = [Camera(int(source) if source.isdigit() else source) for source in args.sources]
+    frames = []
+    for _ in range(args.frames): # read up front, so the capture does not count
+        frameSet = [camera.read()[1] for camera in cameras]
+        if any(frame is None for frame in frameSet):
+            break
+        frames.append(frameSet)
+    for camera in cameras:
+        camera.release()
+    if not frames:
+        parser.error("No frames could be read from the sources")
+
+    report = benchmark(frames, seconds=args.seconds, tileSize=tuple(args.tile), modelComplexity=args.model_complexity)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
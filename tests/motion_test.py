@@ -0,0 +1,78 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # to include ../theremin and ../modules
+from modules.MotionModule import MotionDetector
+from theremin import Theremin
+from helpers import CountingDetector
+
+def frame(value, size=(240, 320)):
+    return np.full((*size, 3), value, dtype=np.uint8)
+
+HAND = {"lmList": [[0, 0, 0]] * 21, "bbox": (10, 10, 50, 50), "center": (35, 35), "type": "Right"}
+
+@pytest.fixture
+def theremin():
+    theremin = Theremin(camera_id=None, offline=True, verbose=False,
+                        standby_after=0.0, standby_fps=1e-3, motion_threshold=3.0, static_threshold=1.0)
+    yield theremin
+    theremin.stop()
+
+def test_motion_score():
+    """Test if identical frames give no motion and different frames do."""
+    motion = MotionDetector()
+    assert motion.update(frame(50)) == float("inf")
+    assert motion.update(frame(50)) == 0
+    assert motion.update(frame(90)) == pytest.approx(40)
+
+def test_motion_keep_reference():
+    """Test if the accumulated change is measured against the kept reference."""
+    motion = MotionDetector()
+    motion.update(frame(50))
+    assert motion.update(frame(52), keep_reference=True) == pytest.approx(2)
+    assert motion.update(frame(54), keep_reference=True) == pytest.approx(4)
+
+def test_standby_skips_inference_until_motion(theremin):
+    """Test if standby stops the inference on a still scene and motion wakes it up."""
+    theremin.hd = CountingDetector([])
+    theremin.detect(frame(50))              # no hands: enters standby
+    assert theremin.standby
+    for _ in range(5):
+        assert theremin.detect(frame(50))[0] == []
+    assert theremin.hd.calls == 1
+
+    theremin.hd.hands = [HAND]
+    hands, _ = theremin.detect(frame(120))  # motion: inference again
+    assert hands == [HAND] and theremin.hd.calls == 2
+    assert not theremin.standby
+
+def test_static_scene_reuses_landmarks(theremin):
+    """Test if the last landmarks are reused while the scene does not change."""
+    theremin.hd = CountingDetector([HAND])
+    theremin.detect(frame(50))
+    for _ in range(5):
+        assert theremin.detect(frame(50))[0] == [HAND]
+    assert theremin.hd.calls == 1
+
+    theremin.detect(frame(60))
+    assert theremin.hd.calls == 2
+
+def test_standby_on_frame_timestamps():
+    """Test if the standby decisions follow the timestamps of the frames, not the wall clock."""
+    theremin = Theremin(camera_id=None, offline=True, verbose=False, standby_after=2.0, standby_fps=1.0)
+    try:
+        theremin.hd = CountingDetector([])
+        theremin.detect(frame(50), timestamp=0.0)
+        theremin.detect(frame(50), timestamp=1.5)
+        assert not theremin.standby
+        theremin.detect(frame(50), timestamp=2.0)
+        assert theremin.standby and theremin.hd.calls == 3
+        theremin.detect(frame(50), timestamp=2.5) # still, and not due at 1 fps
+        assert theremin.hd.calls == 3
+        theremin.detect(frame(50), timestamp=3.0) # due
+        assert theremin.hd.calls == 4
+    finally:
+        theremin.stop()
@@ -0,0 +1,50 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # to include ../modules
+from modules.PreprocessingModule import PreprocessingChain
+
+@pytest.fixture
+def frame():
+    frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+    frame[..., 0] = 255 # blue in BGR
+    return frame
+
+def test_chain_downscales_and_converts(frame):
+    """Test if the chain returns a downscaled RGB copy and leaves the frame untouched."""
+    chain = PreprocessingChain([("resize", {"width": 320}), ("median", {"ksize": 5}), ("rgb", {})])
+    img = chain(frame)
+    assert img.shape == (180, 320, 3)
+    assert img[0, 0].tolist() == [0, 0, 255]
+    assert frame[0, 0].tolist() == [255, 0, 0]
+    assert chain.is_rgb
+
+def test_chain_never_upscales(frame):
+    """Test if resize keeps frames that are already small enough."""
+    chain = PreprocessingChain([("resize", {"width": 1920})])
+    assert chain(frame).shape == frame.shape
+    assert not chain.is_rgb
+
+def test_chain_timings(frame):
+    """Test if the time of every stage is recorded."""
+    chain = PreprocessingChain()
+    for _ in range(3):
+        chain(frame)
+    assert set(chain.timings) == {"0:resize", "1:median", "2:rgb"}
+    assert chain.count == 3
+    assert all(ms >= 0 for ms in chain.report().values())
+
+def test_chain_repeated_stages(frame):
+    """Test if a stage used twice is timed twice and the colour order follows the colour stages."""
+    chain = PreprocessingChain([("rgb", {}), ("median", {"ksize": 3}), ("rgb", {})])
+    img = chain(frame)
+    assert set(chain.report()) == {"0:rgb", "1:median", "2:rgb"}
+    assert not chain.is_rgb and img[0, 0].tolist() == frame[0, 0].tolist() # swapped back to BGR
+
+def test_chain_unknown_stage():
+    """Test if unknown stages are rejected."""
+    with pytest.raises(ValueError):
+        PreprocessingChain([("sharpen", {})])
@@ -0,0 +1,96 @@
+import sys
+import os
+import time
+import threading
+import urllib.request
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # to include ../modules
+from modules.PreviewModule import PreviewServer
+
+@pytest.fixture
+def preview():
+    preview = PreviewServer(0, fps=50, quality=80, width=160) # any free port
+    yield preview
+    preview.close()
+
+def frame(value=128):
+    return np.full((240, 320, 3), value, dtype=np.uint8)
+
+def read_part(stream):
+    """Reads one JPEG part of a multipart MJPEG stream."""
+    headers = {}
+    while True:
+        line = stream.readline().strip()
+        if line.startswith(b"--"):
+            continue
+        if not line:
+            if headers:
+                break
+            continue
+        name, value = line.decode().split(":", 1)
+        headers[name.lower()] = value.strip()
+    data = stream.read(int(headers["content-length"]))
+    return headers, data
+
+def test_drops_without_clients(preview):
+    """Test if frames are dropped, not queued, when nobody is watching."""
+    for _ in range(10):
+        assert not preview.publish(frame())
+    assert preview.metrics()["dropped"] == 10 and preview.sequence == 0
+
+def test_stream(preview):
+    """Test if a client receives the published frames as downscaled JPEGs."""
+    stream = urllib.request.urlopen(f"http://127.0.0.1:{preview.port}/stream", timeout=5)
+    assert stream.headers["Content-Type"].startswith("multipart/x-mixed-replace")
+    deadline = time.perf_counter() + 5
+    while not preview.clients and time.perf_counter() < deadline:
+        time.sleep(0.01)
+
+    parts = []
+    reader = threading.Thread(target=lambda: parts.extend(read_part(stream) for _ in range(2)))
+    reader.start()
+    while reader.is_alive() and time.perf_counter() < deadline:
+        preview.publish(frame(200))
+        time.sleep(0.005)
+    reader.join(timeout=1)
+    stream.close()
+
+    assert len(parts) == 2
+    headers, data = parts[0]
+    assert headers["content-type"] == "image/jpeg"
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert image.shape == (120, 160, 3) and abs(int(image[60, 80, 0]) - 200) < 5
+
+    snapshot = urllib.request.urlopen(f"http://127.0.0.1:{preview.port}/snapshot.jpg", timeout=5).read()
+    assert snapshot[:2] == b"\xff\xd8" # JPEG start of image
+
+def test_snapshot_without_stream(preview):
+    """Test if a snapshot gets a frame encoded for it when no stream client is connected."""
+    running = True
+    def loop():
+        while running:
+            preview.publish(frame(50))
+            time.sleep(0.005)
+    publisher = threading.Thread(target=loop)
+    publisher.start()
+    try:
+        snapshot = urllib.request.urlopen(f"http://127.0.0.1:{preview.port}/snapshot.jpg", timeout=5).read()
+    finally:
+        running = False
+        publisher.join()
+    image = cv2.imdecode(np.frombuffer(snapshot, dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert image.shape == (120, 160, 3) and abs(int(image[60, 80, 0]) - 50) < 5
+    assert preview.clients == 0
+
+def test_publish_rate_cap(preview):
+    """Test if publish caps the preview rate without blocking the caller."""
+    preview.clients = 1 # pretend a client is connected
+    start = time.perf_counter()
+    accepted = sum(preview.publish(frame()) for _ in range(200))
+    elapsed = time.perf_counter() - start
+    assert accepted <= elapsed * preview.fps + 1
+    assert elapsed < 0.5
@@ -0,0 +1,71 @@
+import sys
+import os
+import wave
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # to include ../theremin and ../modules
+from theremin import Theremin
+from helpers import CountingDetector, MarkerDetector, left_hand, square_frame
+
+@pytest.fixture
+def theremin():
+    theremin = Theremin(camera_id=None, offline=True, verbose=False)
+    theremin.hd = MarkerDetector()
+    yield theremin
+    theremin.stop()
+
+def test_process_frame(theremin):
+    """Test if a frame is mapped to controls and timings without touching the audio."""
+    frequency_before = theremin.audio.frequency
+    result = theremin.process_frame(square_frame(60), timestamp=1.5, draw=False)
+    assert result["timestamp"] == 1.5
+    assert len(result["hands"]) == 2 and result["frequency"] > 0 and 0 < result["volume"] <= 1
+    assert set(result["timings"]) == {"detect", "map", "modulation_gestures", "total"}
+    assert result["timings"]["total"] >= result["timings"]["detect"] >= 0
+    assert result["modulation"] is None and result["gesture"] is None
+    assert theremin.audio.frequency == frequency_before # no side effects until apply
+
+    theremin.apply(result)
+    assert theremin.audio.frequency == pytest.approx(result["frequency"])
+    assert theremin.audio.volume == pytest.approx(result["volume"])
+
+def test_state_survives_between_calls(theremin):
+    """Test if the mapping follows the hand across calls and bigger hands give higher pitches."""
+    frequencies = [theremin.process_frame(square_frame(side), timestamp=i / 30, draw=False)["frequency"]
+                   for i, side in enumerate((40, 80, 120))]
+    assert frequencies == sorted(frequencies)
+
+def test_gestures_use_frame_timestamps(tmp_path):
+    """Test if the gesture debouncer runs on the frame timestamps given to process_frame."""
+    sample = str(tmp_path / "click.wav")
+    with wave.open(sample, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(44100)
+        wav.writeframes(np.zeros(441, dtype="<i2").tobytes())
+    theremin = Theremin(camera_id=None, offline=True, verbose=False, samples={2: sample}, gesture_hold=1,
+                        gesture_refractory=1.0)
+    try:
+        theremin.hd = CountingDetector([left_hand(2)])
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        assert theremin.process_frame(frame, timestamp=10.0)["gesture"] == 2
+        theremin.hd.hands = [left_hand(3)]
+        assert theremin.process_frame(frame, timestamp=10.5)["gesture"] is None # within the refractory time
+        assert theremin.process_frame(frame, timestamp=11.0)["gesture"] == 3    # still held once it has passed
+        theremin.hd.hands = [left_hand(2)]
+        assert theremin.process_frame(frame, timestamp=12.5)["gesture"] == 2
+    finally:
+        theremin.stop()
+
+def test_quiet_unless_verbose(capsys):
+    """Test if process_frame prints nothing unless the theremin is verbose."""
+    theremin = Theremin(camera_id=None, offline=True, verbose=False, standby_after=0.0)
+    try:
+        theremin.hd = MarkerDetector()
+        theremin.process_frame(np.zeros((240, 320, 3), dtype=np.uint8), timestamp=1.0) # no hands, standby
+        theremin.process_frame(square_frame(60), timestamp=2.0)
+        assert capsys.readouterr().out == ""
+    finally:
+        theremin.stop()
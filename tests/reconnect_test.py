@@ -0,0 +1,86 @@
+import sys
+import os
+import time
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # to include ../theremin and ../modules
+from theremin import Theremin
+
+class FlakyCamera:
+    """Stands in for Camera: the device is unavailable for the first reopen attempts."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.reopens = 0
+        self.is_file = False
+        self.is_device = True
+
+    def reopen(self):
+        self.reopens += 1
+        if self.reopens <= self.failures:
+            raise ValueError("Cannot open camera or video source: 0")
+
+    def read(self):
+        return True, np.zeros((48, 64, 3), dtype=np.uint8)
+
+    def release(self):
+        pass
+
+@pytest.fixture
+def theremin():
+    theremin = Theremin(camera_id=None, offline=True, verbose=False)
+    yield theremin
+    theremin.stop()
+
+def test_reconnect_quiet(theremin, capsys):
+    """Test if the recovery only prints when the theremin is verbose."""
+    theremin.camera = FlakyCamera(failures=1)
+    assert theremin.reconnect(delay=0.01) is not None
+    assert capsys.readouterr().out == ""
+
+def test_reconnect_with_backoff(theremin):
+    """Test if the camera is reopened with backoff while the audio and the detector stay alive."""
+    theremin.camera = FlakyCamera(failures=3)
+    audio, detector = theremin.audio, theremin.hd
+    theremin.last_hands = [{"type": "Right"}]
+
+    start = time.perf_counter()
+    frame = theremin.reconnect(delay=0.01, max_delay=0.02)
+    elapsed = time.perf_counter() - start
+
+    assert frame is not None and theremin.camera.reopens == 4
+    assert 0.01 + 0.02 + 0.02 <= elapsed < 1.0 # 10 ms, then 20 ms (capped) between attempts
+    assert theremin.recoveries == [pytest.approx(elapsed, abs=0.01)]
+    assert theremin.audio is audio and theremin.hd is detector
+    assert theremin.audio.fader.value == 1 # faded back in
+    assert theremin.last_hands is None     # stale landmarks dropped
+
+def test_reconnect_timeout(theremin):
+    """Test if the recovery gives up after the timeout, with the tone faded out."""
+    theremin.camera = FlakyCamera(failures=1000)
+    theremin.reconnect_timeout = 0.1
+    assert theremin.reconnect(delay=0.01, max_delay=0.02) is None
+    assert theremin.audio.fader.value == 0 and not theremin.recoveries
+
+class EndedStream:
+    """Stands in for a Camera on a pipe or shared memory stream that has ended."""
+    is_file = False
+    is_device = False
+
+    def read(self):
+        return False, None
+
+    def reopen(self):
+        raise AssertionError("an ended stream must not be reopened")
+
+    def release(self):
+        pass
+
+def test_stream_end_stops():
+    """Test if the end of a non-device stream ends the loop as the end of a video file does."""
+    theremin = Theremin(camera_id=None, offline=True, verbose=False)
+    theremin.camera = EndedStream()
+    theremin.start() # stops the theremin when the loop ends
+    assert not theremin.running and not theremin.recoveries
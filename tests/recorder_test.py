@@ -0,0 +1,148 @@
+import sys
+import os
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # to include ../theremin and ../modules
+from modules.RecorderModule import SessionRecorder
+from theremin import Theremin
+
+class BlockingFile:
+    """Stands in for the trace file: write() waits until released, like a stalled disk."""
+
+    def __init__(self):
+        self.released = threading.Event()
+        self.chunks = []
+
+    def write(self, data):
+        self.released.wait()
+        self.chunks.append(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+def test_records_in_chunks(tmp_path):
+    """Test if all the records are written, in fewer writes than records."""
+    path = str(tmp_path / "session.landmarks.jsonl")
+    recorder = SessionRecorder(path, max_queue=10000, chunk_size=100)
+    for i in range(1000):
+        assert recorder.record({"frame": i})
+    recorder.close()
+    with open(path) as f:
+        frames = [json.loads(line)["frame"] for line in f]
+    assert frames == list(range(1000))
+    metrics = recorder.metrics()
+    assert metrics["written"] == 1000 and metrics["dropped"] == 0 and metrics["chunks"] < 1000
+    assert not recorder.record({"frame": 1000}) # closed
+
+def test_drops_under_backpressure(tmp_path):
+    """Test if record() never waits for a stalled writer and counts the dropped records."""
+    recorder = SessionRecorder(str(tmp_path / "unused.jsonl"), max_queue=8, chunk_size=4)
+    recorder.file.close()
+    stalled = recorder.file = BlockingFile()
+    recorder.record({"frame": 0})
+    deadline = time.perf_counter() + 2
+    while recorder.queue.qsize() and time.perf_counter() < deadline: # the writer takes it and stalls
+        time.sleep(0.001)
+
+    start = time.perf_counter()
+    accepted = sum(recorder.record({"frame": i}) for i in range(1, 101))
+    assert time.perf_counter() - start < 0.1
+    assert accepted == 8 and recorder.dropped == 92
+
+    stalled.released.set()
+    recorder.close()
+    frames = [json.loads(line)["frame"] for chunk in stalled.chunks for line in chunk.splitlines()]
+    assert frames == list(range(9))
+
+def test_close_after_writer_error(tmp_path):
+    """Test if close() returns when the writer has died on a record it cannot serialize."""
+    path = str(tmp_path / "session.landmarks.jsonl")
+    recorder = SessionRecorder(path, max_queue=4, chunk_size=1)
+    recorder.record({"frame": 0})
+    recorder.record({"frame": object()}) # not JSON serializable
+    recorder.thread.join(timeout=2)
+    assert not recorder.thread.is_alive() and recorder.error is not None
+    assert not recorder.record({"frame": 2}) # refused, nothing would write it
+    while not recorder.queue.full():
+        recorder.queue.put_nowait({"frame": -1}) # a full queue nobody drains
+    start = time.perf_counter()
+    recorder.close()
+    assert time.perf_counter() - start < 1.0
+    assert recorder.metrics()["error"] is not None
+    with open(path) as f:
+        assert [json.loads(line)["frame"] for line in f] == [0]
+
+def test_close_timeout_on_stalled_writer(tmp_path):
+    """Test if close() gives up after its timeout when the writer is stalled on a full queue."""
+    recorder = SessionRecorder(str(tmp_path / "unused.jsonl"), max_queue=2, chunk_size=1)
+    recorder.file.close()
+    stalled = recorder.file = BlockingFile()
+    for i in range(4):
+        recorder.record({"frame": i})
+    start = time.perf_counter()
+    recorder.close(timeout=0.3)
+    assert 0.3 <= time.perf_counter() - start < 1.0
+    stalled.released.set()
+    recorder.thread.join(timeout=2)
+
+def test_theremin_records_trace(tmp_path):
+    """Test if the frames played are archived in the landmark trace format."""
+    theremin = Theremin(camera_id=None, offline=True, verbose=False)
+    with pytest.raises(RuntimeError):
+        theremin.audio.start_recording(str(tmp_path / "session.wav")) # offline audio renders instead
+
+    path = str(tmp_path / "sessions" / "session")
+    os.makedirs(os.path.dirname(path))
+    theremin.recorder = SessionRecorder(path + ".landmarks.jsonl")
+    theremin.record_start = time.perf_counter()
+    theremin.record_frequency = theremin.audio.frequency
+    hand = {"lmList": [[1, 2, 3]] * 21, "bbox": (0, 0, 10, 10), "center": (5, 5), "type": "Left"}
+    for _ in range(3):
+        frequency, volume = theremin.map_hands([hand], 640, 480)
+        theremin.record([hand], 640, 480, frequency, volume, time.perf_counter())
+    theremin.recorder.close()
+    theremin.recorder = None
+    theremin.stop()
+
+    with open(path + ".landmarks.jsonl") as f:
+        records = [json.loads(line) for line in f]
+    assert [record["frame"] for record in records] == [0, 1, 2]
+    assert records[0]["hands"][0]["type"] == "Left" and records[0]["width"] == 640
+    assert records[-1]["volume"] == pytest.approx(volume)
+    assert records[-1]["frequency"] == pytest.approx(theremin.audio.frequency) # no right hand, frequency kept
+    assert records[0]["t"] <= records[1]["t"] <= records[2]["t"]
+
+def test_trace_records_frame_controls(tmp_path):
+    """Test if the archive keeps the controls and capture time of each frame, not what the jitter buffer is playing."""
+    theremin = Theremin(camera_id=None, offline=True, verbose=False, control_delay=10.0)
+    path = str(tmp_path / "session.landmarks.jsonl")
+    theremin.recorder = SessionRecorder(path)
+    theremin.record_start = 100.0
+    theremin.record_frequency = theremin.audio.frequency
+    right = {"lmList": [[10 * i, 5 * i, 0] for i in range(21)], "bbox": (0, 0, 200, 100), "center": (100, 50),
+             "type": "Right"}
+    left = {"lmList": [[0, 0, 0]] * 21, "bbox": (0, 0, 10, 10), "center": (5, 60), "type": "Left"}
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    results = []
+    for i, hands in enumerate(([right, left], [left])):
+        theremin.hd.findHands = lambda img, draw=True, flipType=True, inferenceImg=None, hands=hands: (hands, img)
+        results.append(theremin.process_frame(frame, timestamp=100.5 + i, draw=False))
+        theremin.apply(results[-1])
+    theremin.recorder.close()
+    theremin.recorder = None
+    theremin.stop()
+
+    with open(path) as f:
+        records = [json.loads(line) for line in f]
+    assert [record["t"] for record in records] == [0.5, 1.5]
+    assert records[0]["frequency"] == pytest.approx(results[0]["frequency"]) != theremin.audio.frequency
+    assert records[1]["frequency"] == records[0]["frequency"] # None keeps the last frequency
+    assert [record["volume"] for record in records] == pytest.approx([results[0]["volume"], results[1]["volume"]])
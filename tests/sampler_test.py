@@ -0,0 +1,75 @@
+import sys
+import os
+import time
+import wave
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # to include ../theremin and ../modules
+from modules.SamplerModule import GestureDebouncer
+from theremin import Theremin
+from helpers import CountingDetector, left_hand
+
+@pytest.fixture
+def sample(tmp_path):
+    path = str(tmp_path / "click.wav")
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(44100)
+        wav.writeframes((np.sin(np.arange(4410) * 0.3) * 10000).astype("<i2").tobytes())
+    return path
+
+def test_debouncer_fires_once_per_gesture():
+    """Test if a held gesture fires once, after hold_frames, and again only after a release."""
+    debouncer = GestureDebouncer(hold_frames=3, refractory=0.0)
+    events = [debouncer.update(gesture, now=i) for i, gesture in enumerate([2, 2, 2, 2, 2, None, None, None, 2, 2, 2])]
+    assert events == [None, None, 2, None, None, None, None, None, None, None, 2]
+
+def test_debouncer_ignores_flicker():
+    """Test if a gesture seen in fewer than hold_frames frames does not fire."""
+    debouncer = GestureDebouncer(hold_frames=3, refractory=0.0)
+    events = [debouncer.update(gesture, now=i) for i, gesture in enumerate([1, 1, 3, 1, 1, 3])]
+    assert events == [None] * 6
+
+def test_debouncer_refractory():
+    """Test if gestures closer than the refractory time do not fire."""
+    debouncer = GestureDebouncer(hold_frames=1, refractory=1.0)
+    assert debouncer.update(1, now=0.0) == 1
+    assert debouncer.update(2, now=0.5) is None
+    assert debouncer.update(3, now=1.5) == 3
+
+def test_debouncer_fires_after_refractory():
+    """Test if a gesture that became stable during the refractory time fires once it has passed."""
+    debouncer = GestureDebouncer(hold_frames=2, refractory=1.0)
+    events = [debouncer.update(gesture, now=t) for t, gesture in [(0.0, 1), (0.1, 1), (0.5, 2), (0.6, 2), (0.9, 2),
+                                                                   (1.1, 2), (1.2, 2)]]
+    assert events == [None, 1, None, None, None, 2, None]
+
+def test_theremin_triggers_samples(sample):
+    """Test if the finger count of the left hand triggers the mapped sample."""
+    theremin = Theremin(camera_id=None, offline=True, verbose=False, samples={2: sample}, gesture_hold=2)
+    try:
+        assert theremin.sampler.tables[2].getDur() == pytest.approx(0.1, abs=1e-3)
+        played = []
+        trigger = theremin.sampler.trigger
+        theremin.sampler.trigger = lambda key: played.append(key) or trigger(key)
+        theremin.hd = CountingDetector([left_hand(2)])
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        fired = []
+        for _ in range(3):
+            result = theremin.process_frame(frame, draw=False)
+            theremin.apply(result)
+            fired.append(result["gesture"])
+        assert fired == [None, 2, None] and played == [2]
+        later = time.perf_counter() + 1.0 # after the refractory time
+        assert [theremin.detect_gesture([left_hand(4)], now=later + t) for t in (0.0, 0.1)] == [None, 4]
+        assert not theremin.sampler.trigger(4) # the gesture fires, but there is no sample for 4 to play
+    finally:
+        theremin.stop()
+
+def test_missing_sample():
+    """Test if a missing sample file is reported when the theremin is created."""
+    with pytest.raises(FileNotFoundError):
+        Theremin(camera_id=None, offline=True, verbose=False, samples={1: "missing.wav"})
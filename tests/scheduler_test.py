@@ -0,0 +1,107 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # to include ../modules
+from modules.SchedulerModule import ControlScheduler
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class RecordingAudio:
+    """Stands in for Audio: keeps the controls applied by the scheduler."""
+
+    def __init__(self):
+        self.frequency = 440.0
+        self.volume = 0.0
+        self.modulation = {}
+        self.callbacks = []
+
+    def add_callback(self, function):
+        self.callbacks.append(function)
+
+    def remove_callback(self, function):
+        self.callbacks.remove(function)
+
+    def update_frequency(self, value):
+        self.frequency = float(value)
+
+    def update_volume(self, value):
+        self.volume = float(value) / 100
+
+    def update_modulation(self, **targets):
+        self.modulation.update(targets)
+
+def test_constant_latency_despite_jitter():
+    """Test if points arriving with variable processing times are played at capture time + delay."""
+    clock, audio = FakeClock(), RecordingAudio()
+    scheduler = ControlScheduler(audio, delay=0.1, clock=clock)
+    scheduler.attach()
+    assert audio.callbacks == [scheduler.on_buffer]
+
+    rng = np.random.default_rng(0)
+    frame_period, buffer_period = 1 / 30, 256 / 44100
+    # A linear glide from 300 Hz: frame i is captured at i / 30 and its processing ends 10 to 60 ms
+    # later (frames are processed in order, so never before the previous one)
+    arrivals, done = [], 0.0
+    for i in range(30):
+        done = max(done, i * frame_period + rng.uniform(0.01, 0.06))
+        arrivals.append((done, i * frame_period, 300 + 10 * i))
+    errors = []
+    for step in range(int(1.0 / buffer_period)):
+        clock.now = step * buffer_period
+        while arrivals and arrivals[0][0] <= clock.now:
+            _, capture, frequency = arrivals.pop(0)
+            assert scheduler.push(capture, frequency, 0.5)
+        for callback in audio.callbacks:
+            callback()
+        playout = clock.now - 0.1
+        if 0 <= playout <= 29 * frame_period:
+            errors.append(abs(audio.frequency - (300 + 10 * playout / frame_period)))
+    assert max(errors) < 1e-6 # exactly on the glide, no steps from the jitter
+    assert scheduler.metrics()["late"] == 0 and audio.volume == pytest.approx(0.5)
+    scheduler.detach()
+    assert audio.callbacks == []
+
+def test_late_points_are_counted():
+    """Test if points arriving after their playout time are reported."""
+    clock, audio = FakeClock(), RecordingAudio()
+    scheduler = ControlScheduler(audio, delay=0.05, clock=clock)
+    clock.now = 0.2
+    assert scheduler.push(0.18, 500, 1.0)       # due at 0.23: in time
+    assert not scheduler.push(0.10, 600, 1.0)   # older than the previous point
+    clock.now = 0.4
+    assert not scheduler.push(0.30, 700, 1.0)   # due at 0.35: late, still the latest value
+    scheduler.on_buffer()
+    assert audio.frequency == 700
+    assert not scheduler.push(0.31, None, 0.0)  # keeps the frequency
+    scheduler.on_buffer(now=0.5)
+    metrics = scheduler.metrics()
+    assert audio.frequency == 700 and audio.volume == 0
+    assert metrics["pushed"] == 3 and metrics["late"] == 2 and metrics["dropped"] == 1
+    assert metrics["late_ratio"] == pytest.approx(2 / 3)
+    assert metrics["underruns"] >= 1 # nothing newer to glide to
+
+def test_modulation_follows_the_delay():
+    """Test if the modulation of a point is applied at its playout time, like its pitch."""
+    clock, audio = FakeClock(), RecordingAudio()
+    scheduler = ControlScheduler(audio, delay=0.1, clock=clock)
+    scheduler.push(0.0, 300, 0.5, dict(cutoff=1000.0, blend=0.0))
+    scheduler.push(0.02, 320, 0.5, dict(cutoff=2000.0))
+    scheduler.push(0.04, 340, 0.5, dict(cutoff=3000.0, blend=1.0))
+    scheduler.on_buffer(now=0.05)
+    assert audio.modulation == {} # nothing due yet
+    scheduler.on_buffer(now=0.1)
+    assert audio.modulation == dict(cutoff=1000.0, blend=0.0)
+    audio.modulation = {}
+    scheduler.on_buffer(now=0.11)
+    assert audio.modulation == {} # applied once
+    scheduler.on_buffer(now=0.15) # both later points became due in the same buffer
+    assert audio.modulation == dict(cutoff=3000.0, blend=1.0)
+    assert audio.frequency == 340
@@ -0,0 +1,44 @@
+import sys
+import os
+import json
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # to include ../soak
+import soak
+
+HAND = {"lmList": [[100 + 5 * i, 200 - 4 * i, 0] for i in range(21)], "bbox": (100, 120, 100, 80),
+        "center": (150, 160), "type": "Right"}
+
+@pytest.fixture
+def trace(tmp_path):
+    path = str(tmp_path / "clip.landmarks.jsonl")
+    with open(path, "w") as f:
+        for i in range(30):
+            hands = [HAND] if i % 3 else []
+            f.write(json.dumps({"frame": i, "t": i / 30, "width": 640, "height": 480, "hands": hands}) + "\n")
+    return path
+
+def test_soak_trace_report(trace):
+    """Test if a short soak run over a landmark trace samples the resources and analyzes them."""
+    report = soak.soak(1.0, trace=trace, interval=0.25)
+    assert len(report["samples"]) >= 3
+    sample = report["samples"][-1]
+    assert sample["rss_mb"] > 0 and sample["frames"] > 0
+    assert set(sample["frame_ms"]) == {"p50", "p95", "p99", "max"}
+    assert "top_allocators" in sample
+    assert set(report["trends"]) == {"rss_mb_per_hour", "frame_p95_ms_per_hour", "traced_mb_per_hour"}
+
+def test_analyze_flags_growth():
+    """Test if a steady memory growth is flagged and a flat one is not."""
+    def samples(growth):
+        return [{"t": 60.0 * i, "rss_mb": 100 + growth * i, "frame_ms": {"p95": 5.0}} for i in range(60)]
+
+    assert soak.analyze(samples(0.0))["flags"] == []
+    flags = soak.analyze(samples(1.0))["flags"] # 60 MB/hour
+    assert len(flags) == 1 and flags[0].startswith("rss_mb_per_hour")
+
+def test_soak_needs_one_source(trace):
+    """Test if exactly one of clip and trace is required."""
+    with pytest.raises(ValueError):
+        soak.soak(1.0)
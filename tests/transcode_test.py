@@ -0,0 +1,100 @@
+import sys
+import os
+import json
+import wave
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # to include ../transcode
+import transcode
+
+def write_video(path, frames=15, fps=30, size=(320, 240)):
+    """Writes a short synthetic video (no hands in it)."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for i in range(frames):
+        frame = np.full((size[1], size[0], 3), 8 * i, dtype=np.uint8)
+        writer.write(frame)
+    writer.release()
+
+@pytest.fixture
+def video(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    write_video(path)
+    return path
+
+def test_transcode_outputs(video, tmp_path):
+    """Test if a video is transcoded to a WAV file and a landmark trace with one record per frame."""
+    result = transcode.transcode(video, str(tmp_path), mapper="crisp")
+    assert result["frames"] == 15
+
+    with wave.open(result["wav"]) as wav:
+        assert wav.getnframes() / wav.getframerate() == pytest.approx(0.5, abs=0.01)
+
+    with open(result["trace"]) as trace:
+        records = [json.loads(line) for line in trace]
+    assert [record["frame"] for record in records] == list(range(15))
+    assert all(record["hands"] == [] and record["volume"] == 0 for record in records)
+
+def test_transcode_unknown_mapper(video, tmp_path):
+    """Test if an unknown mapper is rejected."""
+    with pytest.raises(ValueError):
+        transcode.transcode(video, str(tmp_path), mapper="magic")
+
+def test_transcode_main_parallel(tmp_path):
+    """Test if several videos are transcoded by the process pool."""
+    videos = []
+    for name in ("a", "b"):
+        path = str(tmp_path / f"{name}.avi")
+        write_video(path)
+        videos.append(path)
+    output_dir = str(tmp_path / "renders")
+
+    results = transcode.main(videos + ["--output-dir", output_dir, "--workers", "2"])
+    assert sorted(os.path.basename(result["wav"]) for result in results) == ["a.wav", "b.wav"]
+
+def test_transcode_landmark_cache(video, tmp_path, monkeypatch):
+    """Test if a rerun over the same video reuses the cached landmarks without decoding it."""
+    cache_dir = str(tmp_path / "cache")
+    for name in ("first", "second", "third"):
+        os.makedirs(tmp_path / name)
+    first = transcode.transcode(video, str(tmp_path / "first"), mapper="crisp", cache_dir=cache_dir)
+    assert not first["cached"]
+
+    def no_decoding(*args, **kwargs):
+        raise AssertionError("The video was decoded on a cache hit")
+    monkeypatch.setattr(transcode, "Camera", no_decoding)
+
+    def no_inference(*args, **kwargs):
+        raise AssertionError("A hand detector was built on a cache hit")
+    monkeypatch.setattr("theremin.HandDetector", no_inference)
+    second = transcode.transcode(video, str(tmp_path / "second"), mapper="fuzzy", cache_dir=cache_dir) # other mapper
+    assert second["cached"] and second["frames"] == first["frames"]
+    with open(first["trace"]) as a, open(second["trace"]) as b:
+        assert [json.loads(line)["hands"] for line in a] == [json.loads(line)["hands"] for line in b]
+
+    with pytest.raises(AssertionError): # other detector parameters miss the cache
+        transcode.transcode(video, str(tmp_path / "third"), modelComplexity=0, cache_dir=cache_dir)
+
+def test_landmark_cache_eviction(tmp_path):
+    """Test if the least recently used entries are evicted above the size limit."""
+    from modules.LandmarkCacheModule import LandmarkCache
+    cache = LandmarkCache(str(tmp_path / "cache"), maxBytes=2500)
+    entry = {"fps": 30, "width": 320, "height": 240, "frames": [[]] * 300} # about 1 kB
+    for name in ("a", "b"):
+        cache.put(name, {}, entry)
+    os.utime(cache.path(cache.key("a", {})), (1, 1)) # 'a' used long ago
+    os.utime(cache.path(cache.key("b", {})), (2, 2))
+    assert cache.get("a", {}) is not None # now 'a' is the most recently used
+    cache.put("c", {}, entry)
+    assert cache.get("b", {}) is None and cache.get("a", {}) is not None and cache.get("c", {}) is not None
+    assert cache.size() <= 2500
+
+def test_landmark_cache_failed_put(tmp_path):
+    """Test if a failed write leaves neither an entry nor a temporary file behind."""
+    from modules.LandmarkCacheModule import LandmarkCache
+    cache = LandmarkCache(str(tmp_path / "cache"), maxBytes=2500)
+    with pytest.raises(TypeError):
+        cache.put("a", {}, {"frames": [object()]}) # not serializable
+    assert os.listdir(cache.directory) == [] and cache.get("a", {}) is None
@@ -1,7 +1,20 @@
 from modules.AudioModule import Audio
 from modules.CameraModule import Camera
-from modules.HandTrackingModule import HandDetector
+from modules.HandTrackingModule import HandDetector, fingersUp
+from modules.DetectorPoolModule import HandDetectorPool
+from modules.HandLandmarkerModule import HandLandmarkerDetector
 from modules.DepthThereminModule import DepthTheremin  
+from modules.MotionModule import MotionDetector
+from modules.PreprocessingModule import PreprocessingChain, rgb
+from modules.SamplerModule import Sampler, GestureDebouncer
+from modules.GovernorModule import ResourceGovernor
+from modules.PreviewModule import PreviewServer
+from modules.GestureFeaturesModule import handFeatures, handOpenness
+from modules.RecorderModule import SessionRecorder
+from modules.SchedulerModule import ControlScheduler
+
+import os
+import time
 
 import cv2
 import numpy as np
@@ -9,29 +22,127 @@ import numpy as np
 import skfuzzy as fuzz
 from skfuzzy import control as ctrl
 
+MAPPERS = ("crisp", "fuzzy", "depth") # frequency mappings of the right hand
+
 class Theremin:
     def __init__(self, 
                  use_fuzzy = False,
                  use_depth = False,
                  min_frequency=200, max_frequency=600,
                  initial_frequency=440, initial_volume=0.0, 
-                 camera_id=0,
-                 staticMode=False, maxHands=2, modelComplexity=1, detectionCon=0.5, minTrackCon=0.5):
+                 camera_id=0, camera_config=None,
+                 staticMode=False, maxHands=2, modelComplexity=1, detectionCon=0.5, minTrackCon=0.5,
+                 offline=False, verbose=True,
+                 standby_after=None, standby_fps=2, motion_threshold=3.0, static_threshold=None,
+                 preprocessing=None, detector_workers=1, backend="solutions", model_path=None,
+                 samples=None, gesture_hold=3, gesture_refractory=0.3, governor=None,
+                 preview_port=None, preview_config=None, expressive=False, record_path=None,
+                 reconnect=True, reconnect_timeout=None, control_delay=None, compare=None,
+                 compare_output="channels"):
+        # CPU split between vision and audio, e.g. governor=dict(audio_cores=[3], cv_threads=2)
+        # (see ResourceGovernor, {} for the defaults). Applied first so the threads created next inherit it
+        self.governor = ResourceGovernor(**governor) if governor is not None else None
+        if self.governor is not None:
+            self.governor.apply()
         self.min_frequency = min_frequency
         self.max_frequency = max_frequency
-        self.audio = Audio(initial_frequency=initial_frequency, initial_volume=initial_volume)
-        self.camera = Camera(camera_id)
-        self.hd = HandDetector(staticMode=staticMode, maxHands=maxHands, modelComplexity=modelComplexity, 
-                               detectionCon=detectionCon, minTrackCon=minTrackCon)
+        self.verbose = verbose # print the per-frame mapping values, the state changes and the reports on exit
+        # Expressive mode: the gesture features also drive vibrato, waveform blend and filter cutoff (see map_modulation)
+        self.expressive = expressive
+        self.features = {} # gesture features of the hands of the last map_hands call, by hand type
+        # A/B mode: compare=("crisp", "fuzzy", "depth") feeds the hands of each detection to every mapper.
+        # The first one drives the audio as usual (use_fuzzy and use_depth are then ignored) and the others
+        # their own output channel (compare_output="channels") or just the control stream of the results
+        # and the session archive ("controls"). The cost of each mapper is measured on every frame
+        self.mapper = "depth" if use_depth else "fuzzy" if use_fuzzy else "crisp"
+        self.mappers = tuple(compare) if compare else (self.mapper,)
+        unknown = [name for name in self.mappers if name not in MAPPERS]
+        if unknown or len(set(self.mappers)) != len(self.mappers):
+            raise ValueError(f"Invalid mappers to compare {self.mappers}, expected distinct names among {MAPPERS}")
+        if compare_output not in ("channels", "controls"):
+            raise ValueError(f"Unknown compare output '{compare_output}', expected 'channels' or 'controls'")
+        self.mapper = self.mappers[0]
+        channels = len(self.mappers) > 1 and compare_output == "channels"
+        self.audio = Audio(initial_frequency=initial_frequency, initial_volume=initial_volume, offline=offline,
+                           expressive=expressive, nchnls=len(self.mappers) if channels else None)
+        # Voices of the other mappers, mapper i on output channel i
+        self.voices = {name: self.audio.add_voice(channel) for channel, name in enumerate(self.mappers) if channel} \
+            if channels else {}
+        self.comparison = {} # frequency and cost (ms) of each mapper in the last map_hands call
+        self.mapper_costs = {name: {"frames": 0, "total_ms": 0.0, "max_ms": 0.0} for name in self.mappers}
+        # Samples triggered by the number of fingers up on the left hand, e.g. {1: "kick.wav", 2: "snare.wav"}
+        self.sampler = Sampler(samples) if samples else None
+        self.gestures = GestureDebouncer(hold_frames=gesture_hold, refractory=gesture_refractory)
+        # Without a camera, frames are supplied by the caller (e.g. the batch transcoder)
+        # camera_config holds the capture settings of Camera (fourcc, buffer_size, fps, width, height, realtime)
+        self.camera = Camera(camera_id, **(camera_config or {})) if camera_id is not None else None
+        if backend is None:
+            # No detector: the hands are supplied by the caller (e.g. from a landmark cache) to map_hands
+            self.hd = None
+        elif backend == "tasks":
+            # Asynchronous Tasks HandLandmarker (LIVE_STREAM): inference runs while the loop continues
+            self.hd = HandLandmarkerDetector(modelPath=model_path, maxHands=maxHands, detectionCon=detectionCon,
+                                             minTrackCon=minTrackCon)
+        elif backend != "solutions":
+            raise ValueError(f"Unknown hand detection backend '{backend}', expected 'solutions', 'tasks' or None")
+        elif detector_workers > 1:
+            # Frame-parallel detection for high fps cameras (results lag a few frames behind)
+            self.hd = HandDetectorPool(workers=detector_workers, staticMode=staticMode, maxHands=maxHands,
+                                       modelComplexity=modelComplexity, detectionCon=detectionCon,
+                                       minTrackCon=minTrackCon)
+        else:
+            self.hd = HandDetector(staticMode=staticMode, maxHands=maxHands, modelComplexity=modelComplexity, 
+                                   detectionCon=detectionCon, minTrackCon=minTrackCon)
+        # Preprocessing of the inference copy of the frames (see PreprocessingChain for the stages)
+        self.preprocessing = PreprocessingChain(preprocessing) if preprocessing is not None else PreprocessingChain()
         self.running = True # ensure it can start the loop
         self.use_fuzzy = use_fuzzy
         self.use_depth = use_depth
-        # Prevalece la profundidad sobre la lógica difusa
-        if self.use_depth:
+        # Prevalece la profundidad sobre la lógica difusa (ver self.mapper)
+        if "depth" in self.mappers:
             self.depth_module = DepthTheremin(min_frequency=min_frequency, max_frequency=max_frequency)
-        elif self.use_fuzzy:
+        if "fuzzy" in self.mappers:
             self.initialize_production_rules()
 
+        # Standby: after standby_after seconds without hands, inference drops to standby_fps and
+        # frame differencing (motion score above motion_threshold) wakes it up.
+        # While playing, a motion score below static_threshold reuses the last landmarks.
+        self.standby_after = standby_after
+        self.standby_fps = standby_fps
+        self.motion_threshold = motion_threshold
+        self.static_threshold = static_threshold
+        self.motion = MotionDetector()
+        self.standby = False
+        self.last_hands = None           # landmarks of the last inference
+        self.last_inference_time = None
+        self.last_hands_time = None      # set by the first frame, in the clock of its timestamps
+
+        # Headless monitoring: MJPEG preview on http://localhost:<preview_port>/ instead of a window
+        # preview_config holds the settings of PreviewServer (host, fps, quality, width)
+        self.preview = PreviewServer(preview_port, **(preview_config or {})) if preview_port is not None else None
+        if self.preview is not None and self.verbose:
+            print(f"Preview on http://localhost:{self.preview.port}/")
+
+        # Jitter buffer: with a control_delay (s), the controls are played out by the audio server at the
+        # capture time of their frame plus this delay, interpolated, instead of when inference ends
+        self.scheduler = ControlScheduler(self.audio, delay=control_delay) if control_delay is not None else None
+        # The voices of the compared mappers get their own buffer, so every mapper is heard with the same delay
+        self.voice_schedulers = {name: ControlScheduler(self.audio, delay=control_delay, target=voice)
+                                 for name, voice in self.voices.items()} if control_delay is not None else {}
+
+        # Hot reconnect of a lost camera device, keeping the audio and the detector alive (see reconnect)
+        # reconnect_timeout=None keeps trying until stopped. Video files still end the loop at their end
+        self.reconnect_enabled = reconnect
+        self.reconnect_timeout = reconnect_timeout
+        self.recoveries = [] # recovery times (s)
+
+        # Session archive written while playing (see start_recording)
+        self.record_path = record_path
+        self.recorder = None
+        self.record_start = None
+        self.record_frame = 0
+        self.record_frequency = None
+
     def calculate_fuzzy_sets(self, variable, min_val, max_val, use_gaussian):
         """
         Generates fuzzy sets (low, medium, high) for a variable using min and max values.
@@ -131,21 +242,12 @@ class Theremin:
         ])
         self.frequency_simulator = ctrl.ControlSystemSimulation(frequency_ctrl)
 
-    def compute_tone_crisp(self, width, height, right_hand) -> float:
+    def compute_tone_crisp(self, width, height, right_hand, features=None) -> float:
         # Right hand controls frequency
         area = right_hand["bbox"][2] * right_hand["bbox"][3] # bounding box area
 
-        # Compute hand "openess" or spread using distances between key points
-        lmList2 = right_hand["lmList"]
-        geom_mean = 0
-        if len(lmList2) > 0:
-            points = [lmList2[i][0:2] for i in [4, 8, 12, 16, 20]]
-            distances = []
-            for i in range(len(points) - 1):
-                dist = np.sqrt((points[i + 1][0] - points[i][0])**2 + (points[i + 1][1] - points[i][1])**2)
-                distances.append(dist)
-            if distances:
-                geom_mean = np.exp(np.mean(np.log(distances))) 
+        # Hand "openess" or spread using distances between fingertips (from the features when already computed)
+        geom_mean = features["openness"] if features is not None else handOpenness(right_hand["lmList"])
 
         # Normalize the area and geom_mean to a range that fits the theremin frequency (100-800 Hz)
         max_area = 0.25 * height * width          # heuristic maximum possible area for normalization
@@ -160,11 +262,12 @@ class Theremin:
         # Combine both factors for final frequency
         new_frequency = 0.75 * frequency_from_area + 0.25 * frequency_from_geom 
         
-        print(f"Area: {area:.2f}, Geom Mean: {geom_mean:.2f}, Frequency: {new_frequency:.2f} Hz", end=" ")
+        if self.verbose:
+            print(f"Area: {area:.2f}, Geom Mean: {geom_mean:.2f}, Frequency: {new_frequency:.2f} Hz", end=" ")
 
         return new_frequency
 
-    def compute_tone_fuzzy(self, width, height, right_hand) -> float:
+    def compute_tone_fuzzy(self, width, height, right_hand, features=None) -> float:
         # Compute distance
         distance = right_hand['center'][0]
 
@@ -172,25 +275,17 @@ class Theremin:
         proximity = right_hand["bbox"][2] * right_hand["bbox"][3] # Bounding box area
         proximity = 100 * proximity / (width * height)
 
-        # Compute openness 
-        lmList2 = right_hand["lmList"]
-        openness = 0
-        if len(lmList2) > 0:
-            points = [lmList2[i][0:2] for i in [4, 8, 12, 16, 20]]
-            distances = []
-            for i in range(len(points) - 1):
-                dist = np.sqrt((points[i + 1][0] - points[i][0])**2 + (points[i + 1][1] - points[i][1])**2)
-                distances.append(dist)
-            if distances:
-                openness = np.exp(np.mean(np.log(distances))) 
+        # Compute openness (from the features when already computed)
+        openness = features["openness"] if features is not None else handOpenness(right_hand["lmList"])
 
         proximity = int(np.clip(proximity, self.min_proximity, self.max_proximity))
         distance = int(np.clip(distance, self.min_distance, self.max_distance))
         openness = int(np.clip(openness, self.min_openness, self.max_openness))
 
-        print(f"Proximity: {proximity}", end=" ")
-        print(f"Distance: {distance}", end=" ")
-        print(f"Openness: {openness}", end=" ")
+        if self.verbose:
+            print(f"Proximity: {proximity}", end=" ")
+            print(f"Distance: {distance}", end=" ")
+            print(f"Openness: {openness}", end=" ")
 
         # Assign values to the antecedents (input variables)
         self.frequency_simulator.input['openness'] = openness
@@ -206,82 +301,429 @@ class Theremin:
             new_frequency = 0
         return new_frequency
 
+    def compute_frequency(self, mapper, width, height, right_hand, features=None) -> float:
+        """
+        Maps the right hand to a frequency with one of the MAPPERS.
+        """
+        label = f" ({mapper})" if len(self.mappers) > 1 else ""
+        if mapper == "depth":
+            new_frequency, depth = self.depth_module.compute_tone_depth(right_hand["bbox"])
+            if self.verbose:
+                print(f"Depth{label}: {depth:.2f} cm, Frequency{label}: {new_frequency:.2f} Hz", end=" ")
+            return new_frequency
+        if mapper == "fuzzy":
+            new_frequency = self.compute_tone_fuzzy(width, height, right_hand, features)
+        else:
+            new_frequency = self.compute_tone_crisp(width, height, right_hand, features)
+        if self.verbose:
+            print(f"Frequency{label}: {new_frequency:.2f}", end=" ")
+        return new_frequency
+
     def compute_volume(self, height, left_hand) -> float:
         center2y = height - left_hand['center'][1]
         new_volume = min(max(center2y / height, 0), 1) # map Y to volume range [0, 1]
         return new_volume
 
+    def map_hands(self, hands, width, height):
+        """
+        Maps the detected hands to the theremin controls with the configured method. In the A/B mode
+        every mapper maps the right hand, see self.comparison for their frequencies and costs.
+
+        :param hands: Hands as returned by HandDetector.findHands.
+        :param width: Width of the frame the hands were detected in.
+        :param height: Height of the frame the hands were detected in.
+        :return: (frequency, volume) with volume in [0, 1]; frequency is None when it must be kept.
+        """
+        # Gesture features, one pass per hand shared by the mappers, the modulations and the gestures
+        self.features = {"hands": hands}
+        self.comparison = {name: {"frequency": 0 if not hands else None, "ms": 0.0} for name in self.mappers}
+        if not hands:
+            if self.verbose:
+                print("No hands detected, Frequency: 0, Volume: 0")
+            return 0, 0 # no hands detected, mute frequency and volume
+
+        right_hand = None
+        left_hand = None
+
+        # Identify right and left hands based on the "type" field
+        for hand in hands:
+            if hand["type"] == "Right":
+                right_hand = hand
+            elif hand["type"] == "Left":
+                left_hand = hand
+
+        if self.expressive:
+            for hand in (right_hand, left_hand):
+                if hand:
+                    self.features[hand["type"]] = handFeatures(hand)
+        right_features = self.features.get("Right")
+
+        # Frequency for right hand, from every mapper on the same hands (only the configured one outside the A/B mode)
+        new_frequency = None
+        if right_hand:
+            for name in self.mappers:
+                start = time.perf_counter()
+                frequency = self.compute_frequency(name, width, height, right_hand, right_features)
+                ms = (time.perf_counter() - start) * 1000
+                self.comparison[name] = {"frequency": frequency, "ms": ms}
+                cost = self.mapper_costs[name]
+                cost["frames"] += 1
+                cost["total_ms"] += ms
+                cost["max_ms"] = max(cost["max_ms"], ms)
+            new_frequency = self.comparison[self.mapper]["frequency"]
+
+        # Volume for left hand
+        if left_hand:
+            new_volume = self.compute_volume(height, left_hand)
+        else:
+            new_volume = 0 # no left hand detected, mute volume
+        if self.verbose:
+            print(f"Volume: {new_volume * 100:.2f}")
+
+        return new_frequency, new_volume
+
+    def mapper_report(self) -> dict:
+        """
+        :return: Mean and maximum cost (ms) of each mapper over the frames with a right hand.
+        """
+        return {name: {"frames": cost["frames"],
+                       "mean_ms": cost["total_ms"] / cost["frames"] if cost["frames"] else 0.0,
+                       "max_ms": cost["max_ms"]}
+                for name, cost in self.mapper_costs.items()}
+
+    def map_modulation(self, frequency=None):
+        """
+        Maps the gesture features of the last map_hands call to the modulation targets of Audio:
+        left hand pinch (thumb to index) -> vibrato depth, left hand roll -> vibrato rate,
+        right hand fingers up -> waveform blend, right palm facing the camera -> filter cutoff.
+
+        :param frequency: Current frequency in Hz, the vibrato depth is relative to it (default is the audio's).
+        :return: Arguments for Audio.update_modulation (targets of a missing hand are kept).
+        """
+        modulation = {}
+        left, right = self.features.get("Left"), self.features.get("Right")
+        if left is not None:
+            frequency = self.audio.frequency if frequency is None else frequency
+            depth = min(max(left["pinchNorm"][0] - 0.2, 0), 1)                 # closed pinch, no vibrato
+            modulation["vibrato_depth"] = 0.03 * frequency * depth             # up to about half a semitone
+            modulation["vibrato_rate"] = 3 + 5 * min(abs(left["roll"]) / 60, 1) # 3 Hz upright to 8 Hz tilted
+        if right is not None:
+            modulation["blend"] = right["fingers"][1:].sum() / 4                # sine with a fist, saw with an open hand
+            facing = min(abs(right["palmNormal"][2]), 1)
+            modulation["cutoff"] = 400 * 20 ** facing                            # 400 Hz edge-on to 8 kHz facing
+        return modulation
+
+    def preprocess(self, frame):
+        """
+        Builds the RGB copy of a frame used for hand inference.
+        """
+        img = self.preprocessing(frame)
+        return img if self.preprocessing.is_rgb else rgb(img)
+
+    def detect_gesture(self, hands, now=None):
+        """
+        Debounces the number of fingers up on the left hand (see GestureDebouncer).
+
+        :param hands: Hands as returned by HandDetector.findHands.
+        :param now: Time of the frame in seconds (default is the current time).
+        :return: The gesture (finger count) that fired in this frame, or None.
+        """
+        if self.sampler is None:
+            return None
+        left_hand = next((hand for hand in hands if hand["type"] == "Left"), None)
+        if left_hand and self.features.get("hands") is hands and "Left" in self.features:
+            gesture = int(self.features["Left"]["fingers"].sum()) # already extracted by map_hands
+        else:
+            gesture = sum(fingersUp(left_hand)) if left_hand else None
+        return self.gestures.update(gesture, now)
+
+    def play_gesture(self, fired):
+        """
+        Plays the sample mapped to a gesture that fired (see detect_gesture).
+        """
+        if fired is not None and self.sampler.trigger(fired) and self.verbose:
+            print(f"Gesture: {fired} fingers, sample triggered")
+
+    def process_frame(self, frame, timestamp=None, draw=True):
+        """
+        Runs one frame through detection, mapping, modulation and gestures, without any I/O: no camera,
+        window, audio or disk access, and no output unless verbose, so it can be embedded in another
+        capture host or test framework. The detector, mapper, standby and gesture states are kept
+        between calls, on the clock of the timestamps.
+
+        :param frame: BGR frame.
+        :param timestamp: Capture time of the frame in seconds (default is the current time.perf_counter()).
+        :param draw: Draw the hands on the frame.
+        :return: Dictionary with the "frequency" (None when it must be kept), "volume" in [0, 1], "hands",
+                 annotated "frame", "timestamp", "modulation" (expressive mode), fired "gesture" and the
+                 per-stage "timings" in ms (see apply to send the result to the audio), and the "mappers"
+                 dictionary with the frequency and cost in ms of each compared mapper.
+        """
+        start = time.perf_counter()
+        timestamp = start if timestamp is None else timestamp
+
+        # Hand detection (the frame is preprocessed for inference only, see preprocess)
+        hands, frame = self.detect(frame, draw=draw, timestamp=timestamp)
+        detected = time.perf_counter()
+
+        height, width = frame.shape[:2]
+        frequency, volume = self.map_hands(hands, width, height)
+        mapped = time.perf_counter()
+
+        modulation = self.map_modulation(frequency) if self.expressive else None
+        gesture = self.detect_gesture(hands, timestamp)
+        end = time.perf_counter()
+
+        return {"frequency": frequency, "volume": volume, "hands": hands, "frame": frame, "timestamp": timestamp,
+                "modulation": modulation, "gesture": gesture, "mappers": self.comparison,
+                "timings": {"detect": (detected - start) * 1000, "map": (mapped - detected) * 1000,
+                            "modulation_gestures": (end - mapped) * 1000, "total": (end - start) * 1000}}
+
+    def apply(self, result):
+        """
+        Sends the result of process_frame to the audio (directly or through the jitter buffer), the
+        voices of the compared mappers, the sampler and the session archive.
+        """
+        frequency, volume = result["frequency"], result["volume"]
+        if self.scheduler is not None:
+            # Played out at capture + delay, with the modulation of the same frame
+            self.scheduler.push(result["timestamp"], frequency, volume, result["modulation"])
+        else:
+            if frequency is not None:
+                self.audio.update_frequency(frequency)
+            self.audio.update_volume(volume * 100)
+        for name, voice in self.voices.items():
+            # The left hand drives the volume of every mapper
+            if name in self.voice_schedulers:
+                self.voice_schedulers[name].push(result["timestamp"], result["mappers"][name]["frequency"], volume)
+                continue
+            if result["mappers"][name]["frequency"] is not None:
+                voice.update_frequency(result["mappers"][name]["frequency"])
+            voice.update_volume(volume * 100)
+        if self.scheduler is None and result["modulation"] is not None:
+            self.audio.update_modulation(**result["modulation"])
+        self.play_gesture(result["gesture"])
+        height, width = result["frame"].shape[:2]
+        self.record(result["hands"], width, height, frequency, volume, result["timestamp"],
+                    result["mappers"] if len(self.mappers) > 1 else None)
+
+    def start_recording(self, path):
+        """
+        Archives the session being played: the audio to <path>.wav, through the pyo server, and the
+        controls and landmarks to <path>.landmarks.jsonl (trace format of transcode.py), through a
+        background writer. Neither adds work to the control loop beyond queuing one record per frame.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.recorder = SessionRecorder(path + ".landmarks.jsonl")
+        self.audio.start_recording(path + ".wav")
+        self.record_start = time.perf_counter() # trace times are relative to the start of the WAV
+        self.record_frame = 0
+        self.record_frequency = self.audio.frequency # last frequency archived
+
+    def record(self, hands, width, height, frequency, volume, timestamp, mappers=None):
+        """
+        Queues the controls and landmarks of a frame to the session archive (no-op when not recording).
+        The controls are those the frame produced, not those the audio is playing at the time (they
+        differ with a control_delay).
+
+        :param frequency: Frequency of the frame in Hz, None keeps the previous one.
+        :param volume: Volume of the frame in [0, 1].
+        :param timestamp: Capture time of the frame (time.perf_counter clock).
+        :param mappers: Frequency and cost of each compared mapper, archived as the control stream of the A/B mode.
+        """
+        if self.recorder is None:
+            return
+        if frequency is not None:
+            self.record_frequency = float(frequency)
+        record = {"frame": self.record_frame, "t": timestamp - self.record_start,
+                  "width": width, "height": height,
+                  "frequency": self.record_frequency, "volume": float(volume), "hands": hands}
+        if mappers is not None:
+            record["mappers"] = {name: dict(value) for name, value in mappers.items()}
+        self.recorder.record(record)
+        self.record_frame += 1
+
+    def stop_recording(self):
+        if self.recorder is None:
+            return
+        self.audio.stop_recording()
+        self.recorder.close()
+        if self.verbose:
+            print(f"Recorder: {self.recorder.metrics()}")
+        self.recorder = None
+
+    def reconnect(self, delay=0.1, max_delay=2.0):
+        """
+        Recovers from a failed camera read without a cold restart: the tone fades out while the
+        capture device is reopened with exponential backoff; the audio server and the hand detector
+        stay alive and tracking resumes from the first good frame.
+
+        :param delay: Wait before the first retry (s), doubled after every failed attempt.
+        :param max_delay: Longest wait between attempts (s).
+        :return: The first good frame, or None if the timeout expired or the theremin was stopped.
+        """
+        start = time.perf_counter()
+        self.audio.fade_out()
+        if self.verbose:
+            print("Camera lost, reconnecting...")
+        attempts = 0
+        while self.running:
+            attempts += 1
+            try:
+                self.camera.reopen()
+                success, frame = self.camera.read()
+            except ValueError:
+                success, frame = False, None # the device is not back yet
+            if success:
+                elapsed = time.perf_counter() - start
+                self.recoveries.append(elapsed)
+                if self.verbose:
+                    print(f"Camera recovered after {attempts} attempts in {elapsed:.2f} s")
+                # The last frames and landmarks are stale, start tracking again from this frame
+                self.motion.reset()
+                self.last_hands = None
+                self.last_hands_time = None
+                self.audio.fade_in()
+                return frame
+            if self.reconnect_timeout is not None and time.perf_counter() - start + delay > self.reconnect_timeout:
+                if self.verbose:
+                    print(f"Camera not recovered after {attempts} attempts")
+                return None
+            time.sleep(delay)
+            delay = min(2 * delay, max_delay)
+        return None
+
+    def find_hands(self, frame, draw, timestamp):
+        """
+        Runs the hand detector on a frame, with its capture timestamp for the Tasks backend.
+        """
+        if isinstance(self.hd, HandLandmarkerDetector):
+            return self.hd.findHands(frame, draw=draw, inferenceImg=self.preprocess(frame),
+                                     timestampMs=timestamp * 1000)
+        return self.hd.findHands(frame, draw=draw, inferenceImg=self.preprocess(frame))
+
+    def detect(self, frame, draw=True, timestamp=None):
+        """
+        Detects the hands in a frame, skipping the inference in standby or when the scene is static.
+
+        :param frame: BGR frame.
+        :param draw: Draw the hands on the frame.
+        :param timestamp: Capture time of the frame in seconds (default is the current time), the clock
+                          of the standby decisions.
+        :return: Detected hands and the processed frame, as HandDetector.findHands.
+        """
+        now = time.perf_counter() if timestamp is None else timestamp
+        if self.last_hands_time is None:
+            self.last_hands_time = now
+        if self.standby_after is None and self.static_threshold is None:
+            return self.find_hands(frame, draw, now)
+
+        if self.standby:
+            score = self.motion.update(frame) # consecutive frames
+            due = now - self.last_inference_time >= 1 / self.standby_fps
+            if score <= self.motion_threshold and not due:
+                return [], frame
+        else:
+            # Accumulated change since the last inference, so slow movements are not missed
+            score = self.motion.update(frame, keep_reference=True)
+            if self.static_threshold is not None and self.last_hands and score < self.static_threshold:
+                self.last_hands_time = now
+                if draw:
+                    for hand in self.last_hands:
+                        self.hd.drawHand(frame, hand)
+                return self.last_hands, frame
+
+        self.motion.set_reference()
+        hands, frame = self.find_hands(frame, draw, now)
+        self.last_hands = hands
+        self.last_inference_time = now
+
+        if hands:
+            self.last_hands_time = now
+            if self.standby:
+                self.standby = False
+                if self.verbose:
+                    print("Hands detected, leaving standby")
+        elif (not self.standby and self.standby_after is not None
+              and now - self.last_hands_time >= self.standby_after):
+            self.standby = True
+            if self.verbose:
+                print(f"No hands for {self.standby_after} s, entering standby")
+        return hands, frame
+
     def start(self):
-        self.audio.start()
+        if self.governor is not None:
+            self.governor.start_audio(self.audio) # pins the audio server threads
+        else:
+            self.audio.start()
+        if self.scheduler is not None:
+            self.scheduler.attach()
+        for scheduler in self.voice_schedulers.values():
+            scheduler.attach()
         self.running = True
 
         try:
+            if self.record_path is not None:
+                self.start_recording(self.record_path)
             while self.running:
                 success, frame = self.camera.read()
+                if not success and self.reconnect_enabled and self.camera.is_device:
+                    frame = self.reconnect()
+                    success = frame is not None
                 if not success:
                     print("Cannot read frame from camera.")
                     break
-
-                frame = cv2.medianBlur(frame, 5)
-                # frame = cv2.bilateralFilter(frame, 15, 75, 75) 
-
-                # Flip the frame and process for hand detection
-                hands, frame = self.hd.findHands(frame)
-
-                height, width = frame.shape[:2]
-
-                if hands:
-                    right_hand = None
-                    left_hand = None
-
-                    # Identify right and left hands based on the "type" field
-                    for hand in hands:
-                        if hand["type"] == "Right":
-                            right_hand = hand
-                        elif hand["type"] == "Left":
-                            left_hand = hand
-                    
-                    # Frequency for right hand
-                    if right_hand:
-                        if self.use_depth:
-                            new_frequency, depth = self.depth_module.compute_tone_depth(right_hand["bbox"])
-                            self.audio.update_frequency(new_frequency)
-                            print(f"Depth: {depth:.2f} cm, Frequency: {new_frequency:.2f} Hz", end=" ")
-                        else:
-                            if not self.use_fuzzy:
-                                new_frequency = self.compute_tone_crisp(width, height, right_hand)
-                            else:
-                                new_frequency = self.compute_tone_fuzzy(width, height, right_hand)
-                            self.audio.update_frequency(new_frequency)
-                            print(f"Frequency: {new_frequency:.2f}", end=" ")
-
-                    # Volume for left hand
-                    if left_hand:
-                        new_volume = self.compute_volume(height, left_hand)
-                        self.audio.update_volume(new_volume * 100)
-                        print(f"Volume: {new_volume * 100:.2f}", end=" ")
-                    else:
-                        self.audio.update_volume(0) # no left hand detected, mute volume
-                        print("Volume: 0", end=" ")
-
-                    print() 
-
-                else:
-                    self.audio.update_frequency(0) # no hands detected, mute frequency
-                    self.audio.update_volume(0)    # mute volume as well
-                    print("No hands detected, Frequency: 0, Volume: 0")
-
+                # Timestamp of the frame once read: the time it waited in the camera buffers is not included
+                capture_time = time.perf_counter()
+                result = self.process_frame(frame, capture_time)
+                self.apply(result)
+                frame = result["frame"]
+                if self.governor is not None:
+                    self.governor.frame(result["timings"]["total"] / 1000)
+
+                if self.preview is not None:
+                    self.preview.publish(frame) # never waits, stop with Ctrl+C
+                    continue
                 cv2.imshow("Theremin View", frame)
 
                 # Exit the loop if 'q' is pressed
                 if cv2.waitKey(1) & 0xFF == ord('q'):
                     break
 
+        except KeyboardInterrupt:
+            pass
         finally:
             self.stop()
 
     def stop(self):
+        if self.verbose and self.preprocessing.count:
+            timings = ", ".join(f"{name} {ms:.2f}" for name, ms in self.preprocessing.report().items())
+            print(f"Preprocessing (ms/frame): {timings}")
+        if self.verbose and hasattr(self.hd, "metrics"):
+            print(f"Hand detector: {self.hd.metrics()}")
+        if self.verbose and self.governor is not None:
+            print(f"Resource governor: {self.governor.report()}")
+        if self.verbose and len(self.mappers) > 1:
+            costs = ", ".join(f"{name} {cost['mean_ms']:.3f} (max {cost['max_ms']:.3f})"
+                              for name, cost in self.mapper_report().items())
+            print(f"Mappers (ms/frame): {costs}")
+        if self.verbose and self.recoveries:
+            print(f"Camera recoveries: {len(self.recoveries)}, longest {max(self.recoveries):.2f} s")
+        if self.verbose and self.scheduler is not None:
+            print(f"Control scheduler: {self.scheduler.metrics()}")
+        if self.preview is not None:
+            if self.verbose:
+                print(f"Preview: {self.preview.metrics()}")
+            self.preview.close()
+        if hasattr(self.hd, "close"):
+            self.hd.close()
         self.running = False
+        self.stop_recording()
         self.audio.stop()
-        self.camera.release()
+        if self.governor is not None:
+            self.governor.restore() # the process affinity set when the theremin was created
+        if self.camera is not None:
+            self.camera.release()
         cv2.destroyAllWindows()
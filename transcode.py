@@ -0,0 +1,166 @@
+"""
+Batch transcoder
+Renders archived performance videos to audio offline, faster than realtime and using all cores.
+Each video is decoded with Camera, tracked with HandDetector and mapped with the chosen method
+(crisp, fuzzy or depth) in its own worker process, producing a WAV file and a landmark trace.
+
+Usage: python3 transcode.py clips/*.mp4 --mapper fuzzy --output-dir renders
+       python3 transcode.py clips/*.mp4 --mapper crisp --cache-dir renders/.landmarks  # reuse the detections
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from modules.CameraModule import Camera
+from modules.LandmarkCacheModule import LandmarkCache, videoHash
+from modules.PreprocessingModule import PreprocessingChain
+from theremin import Theremin, MAPPERS
+
+def transcode(video_path, output_dir, mapper="crisp", min_frequency=200, max_frequency=600,
+              initial_frequency=440, modelComplexity=1, detectionCon=0.5, minTrackCon=0.5,
+              cache_dir=None, cache_size=512 * 2**20) -> dict:
+    """
+    Transcodes one video to a WAV file and a landmark trace (one JSON record per frame).
+
+    :param video_path: Path of the video to transcode.
+    :param output_dir: Directory where '<name>.wav' and '<name>.landmarks.jsonl' are written.
+    :param mapper: Tone mapping method: 'crisp', 'fuzzy' or 'depth'.
+    :param cache_dir: Directory of the landmark cache (default is no cache). A rerun over the same video
+                      with the same detector parameters skips the decoding and the inference.
+    :param cache_size: Maximum size of the landmark cache in bytes.
+    :return: Summary of the transcoding (paths, number of frames, durations and speed).
+    """
+    if mapper not in MAPPERS:
+        raise ValueError(f"Unknown mapper '{mapper}', expected one of {MAPPERS}")
+
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    wav_path = os.path.join(output_dir, f"{name}.wav")
+    trace_path = os.path.join(output_dir, f"{name}.landmarks.jsonl")
+
+    start = time.perf_counter()
+    detector = dict(staticMode=False, maxHands=2, modelComplexity=modelComplexity,
+                    detectionCon=detectionCon, minTrackCon=minTrackCon)
+
+    # The landmarks only depend on the video contents and the detector, not on the mapper
+    cache = LandmarkCache(cache_dir, cache_size) if cache_dir is not None else None
+    entry = None
+    if cache is not None:
+        digest = videoHash(video_path)
+        params = dict(detector, preprocessing=PreprocessingChain().stages) # the default preprocessing of Theremin
+        entry = cache.get(digest, params)
+
+    # On a full hit no detector is built, the cached hands go straight to the mappers
+    theremin = Theremin(use_fuzzy=(mapper == "fuzzy"), use_depth=(mapper == "depth"),
+                        min_frequency=min_frequency, max_frequency=max_frequency,
+                        initial_frequency=initial_frequency, initial_volume=0.0,
+                        camera_id=None, backend="solutions" if entry is None else None,
+                        offline=True, verbose=False, **detector)
+
+    camera = None
+    if entry is None:
+        camera = Camera(video_path)
+        fps = camera.cap.get(cv2.CAP_PROP_FPS) or 30.0 # some containers do not report it
+        entry = {"fps": fps, "width": None, "height": None, "frames": []}
+        cached = False
+    else:
+        fps = entry["fps"]
+        cached = True # full hit: no decoding nor inference, straight to the mapping
+
+    def detections():
+        """Yields (width, height, hands) per frame, from the cache or from the video."""
+        if cached:
+            for hands in entry["frames"]:
+                yield entry["width"], entry["height"], hands
+            return
+        while True:
+            success, frame = camera.read()
+            if not success:
+                return # end of the video
+            hands, _ = theremin.detect(frame, draw=False) # same preprocessing as the live loop
+            height, width = frame.shape[:2]
+            entry["width"], entry["height"] = width, height
+            entry["frames"].append(hands)
+            yield width, height, hands
+
+    timeline = []
+    frequency = initial_frequency
+    frame_index = 0
+    try:
+        with open(trace_path, "w") as trace:
+            for width, height, hands in detections():
+                timestamp = frame_index / fps
+                new_frequency, volume = theremin.map_hands(hands, width, height)
+                if new_frequency is not None:
+                    frequency = float(new_frequency)
+                timeline.append((timestamp, frequency, float(volume)))
+
+                trace.write(json.dumps({"frame": frame_index, "t": timestamp,
+                                        "width": width, "height": height,
+                                        "frequency": frequency, "volume": float(volume),
+                                        "hands": hands}) + "\n")
+                frame_index += 1
+
+        if cache is not None and not cached:
+            cache.put(digest, params, entry)
+        duration = frame_index / fps
+        if timeline:
+            theremin.audio.render(wav_path, timeline, duration=duration)
+    finally:
+        theremin.stop()
+        if camera is not None:
+            camera.release()
+
+    elapsed = time.perf_counter() - start
+    return {"video": video_path, "wav": wav_path if timeline else None, "trace": trace_path,
+            "frames": frame_index, "cached": cached, "duration": duration, "elapsed": elapsed,
+            "speed": duration / elapsed if elapsed > 0 else 0}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render performance videos to audio with the theremin mappers.")
+    parser.add_argument("videos", nargs="+", help="Video files to transcode")
+    parser.add_argument("--mapper", choices=MAPPERS, default="crisp", help="Tone mapping method (default: crisp)")
+    parser.add_argument("--output-dir", default="renders", help="Output directory (default: renders)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: all cores)")
+    parser.add_argument("--min-frequency", type=float, default=200)
+    parser.add_argument("--max-frequency", type=float, default=600)
+    parser.add_argument("--model-complexity", type=int, choices=(0, 1), default=1)
+    parser.add_argument("--cache-dir", default=None, help="Landmark cache to reuse the detections of previous runs")
+    parser.add_argument("--cache-size", type=float, default=512, help="Maximum size of the landmark cache in MB (default: 512)")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    options = dict(mapper=args.mapper, min_frequency=args.min_frequency, max_frequency=args.max_frequency,
+                   modelComplexity=args.model_complexity, cache_dir=args.cache_dir,
+                   cache_size=int(args.cache_size * 2**20))
+
+    # Each worker owns its mediapipe graph and pyo server, 'spawn' avoids inheriting them through fork
+    context = multiprocessing.get_context("spawn")
+    workers = max(1, min(args.workers, len(args.videos)))
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = {executor.submit(transcode, video, args.output_dir, **options): video for video in args.videos}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"{futures[future]}: FAILED ({e})")
+                continue
+            results.append(result)
+            print(f"{result['video']}: {result['frames']} frames{' (cached landmarks)' if result['cached'] else ''}, "
+                  f"{result['duration']:.1f} s of audio in {result['elapsed']:.1f} s ({result['speed']:.1f}x realtime)")
+
+    total = sum(result["duration"] for result in results)
+    elapsed = time.perf_counter() - start
+    print(f"Transcoded {len(results)}/{len(args.videos)} videos, {total:.1f} s of audio in {elapsed:.1f} s "
+          f"with {workers} workers")
+    return results
+
+if __name__ == "__main__":
+    main()